@@ -0,0 +1,109 @@
+"""
+Reader/writer load test for DataStore.
+
+A separate process bulk-loads new tickers (like the nightly update) while
+reader threads in this process (like dashboard sessions) keep querying price
+panels. Runs once with SQLite's default rollback journal on one engine and
+once in concurrency mode (WAL, read-only connection pool, serialized writer),
+reporting read throughput, latency and "database is locked" failures:
+
+    python -m benchmarks.bench_concurrency [--readers 8] [--seconds 10]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.bench_store import synthetic_frame
+from src.data.store import DataStore
+
+
+def seed_db(path, concurrent, tickers, years):
+    store = DataStore(path, cache_bytes=0, concurrent=concurrent)
+    frames = [(t, synthetic_frame(years, seed=i)) for i, t in enumerate(tickers)]
+    store.store_prices_many(frames)
+
+
+def writer(path, concurrent, years, batch, stop_at, counter):
+    store = DataStore(path, cache_bytes=0, concurrent=concurrent)
+    frame = synthetic_frame(years, seed=99)
+    i = 0
+    while time.time() < stop_at:
+        # One commit per batch of full histories, like a first-time universe load
+        items = [(f'NEW{i + k}', frame) for k in range(batch)]
+        store.store_prices_many(items, commit_rows=len(frame) * batch)
+        i += batch
+        counter.value = i
+
+
+def reader(store, tickers, stop_at, seed, stats):
+    rng = np.random.default_rng(seed)
+    latencies = []
+    errors = 0
+    while time.time() < stop_at:
+        subset = list(rng.choice(tickers, size=5, replace=False))
+        start = f"{rng.integers(1998, 2020)}-01-01"
+        t0 = time.perf_counter()
+        try:
+            store.load_price_matrix(subset, 'adj_close', start_date=start)
+            latencies.append(time.perf_counter() - t0)
+        except Exception as e:
+            errors += 1
+            if 'locked' not in str(e):
+                raise
+    stats.append((latencies, errors))
+
+
+def run(mode, concurrent, readers, seconds, tickers, years, batch):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f'{mode}.db')
+        seed_db(path, concurrent, tickers, years)
+
+        counter = multiprocessing.Value('i', 0)
+        stop_at = time.time() + seconds
+        proc = multiprocessing.Process(target=writer, args=(path, concurrent, years, batch, stop_at, counter))
+        proc.start()
+
+        store = DataStore(path, cache_bytes=0, concurrent=concurrent)
+        stats = []
+        threads = [threading.Thread(target=reader, args=(store, tickers, stop_at, i, stats))
+                   for i in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        proc.join()
+
+        latencies = np.concatenate([np.asarray(l) for l, _ in stats]) if stats else np.array([])
+        errors = sum(e for _, e in stats)
+        reads = len(latencies)
+        p50, p99, worst = (np.percentile(latencies, [50, 99, 100]) * 1000) if reads else (float('nan'),) * 3
+        print(f"{mode:>10}: {reads / seconds:8.1f} reads/s  p50 {p50:7.1f}ms  p99 {p99:8.1f}ms  "
+              f"max {worst:8.1f}ms  {errors:4d} locked errors  writer stored {counter.value} tickers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent reader/writer load test")
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--tickers', type=int, default=40)
+    parser.add_argument('--years', type=int, default=25)
+    parser.add_argument('--batch', type=int, default=20, help="Tickers per writer commit")
+    args = parser.parse_args()
+
+    tickers = [f'T{i:03d}' for i in range(args.tickers)]
+    print(f"{args.readers} reader threads, 1 writer process, {args.seconds:.0f}s, "
+          f"{args.tickers} tickers x {args.years}y")
+    for mode, concurrent in [('rollback', False), ('wal', True)]:
+        run(mode, concurrent, args.readers, args.seconds, tickers, args.years, args.batch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Write-path benchmark for DataStore.store_prices.
+
+Compares the old row-by-row ORM insert (one SELECT per row) against the bulk
+INSERT OR IGNORE path, then refreshes the whole universe into an empty DB.
+Runs offline against synthetic prices:
+
+    python -m benchmarks.bench_store
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.data.store import DataStore, PriceData
+from src.engine import universe
+
+
+def synthetic_frame(years=30, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp('2024-12-31'), periods=int(years * 252))
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, len(index))))
+    return pd.DataFrame({
+        'Open': close * 0.999,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(1e5, 1e7, len(index)),
+    }, index=index)
+
+
+def store_prices_rowwise(store, ticker, df):
+    """The pre-bulk implementation, kept here only as the 'before' baseline."""
+    session = store.Session()
+    try:
+        for index, row in df.iterrows():
+            existing = session.query(PriceData).filter_by(ticker=ticker, date=index.date()).first()
+            if not existing:
+                session.add(PriceData(
+                    ticker=ticker,
+                    date=index.date(),
+                    open=row.get('Open'),
+                    high=row.get('High'),
+                    low=row.get('Low'),
+                    close=row.get('Close'),
+                    adj_close=row.get('Adj Close', row.get('Close')),
+                    volume=int(float(row.get('Volume', 0)))
+                ))
+        session.commit()
+    finally:
+        session.close()
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main(years=30, rowwise_years=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Row-wise is slow enough that a shorter history gives a fair rate
+        df_small = synthetic_frame(rowwise_years)
+        before = DataStore(os.path.join(tmp, 'before.db'))
+        t_before = timed(lambda: store_prices_rowwise(before, 'TEST', df_small))
+
+        after = DataStore(os.path.join(tmp, 'after.db'))
+        t_after = timed(lambda: after.store_prices('TEST', df_small))
+
+        print(f"Single ticker, {len(df_small)} rows")
+        print(f"  row-wise ORM : {len(df_small) / t_before:12,.0f} rows/s ({t_before:.2f}s)")
+        print(f"  bulk insert  : {len(df_small) / t_after:12,.0f} rows/s ({t_after:.2f}s)")
+
+        # Second write of the same frame is all skips
+        t_skip = timed(lambda: after.store_prices('TEST', df_small))
+        print(f"  re-insert    : {len(df_small) / t_skip:12,.0f} rows/s ({t_skip:.2f}s, all skipped)")
+
+        tickers = universe.get_all_tickers()
+        full = DataStore(os.path.join(tmp, 'universe.db'))
+        frames = {t: synthetic_frame(years, seed=i) for i, t in enumerate(tickers)}
+        total_rows = sum(len(f) for f in frames.values())
+        t_universe = timed(lambda: [full.store_prices(t, f) for t, f in frames.items()])
+        print(f"Universe refresh: {len(tickers)} tickers x {years}y = {total_rows:,} rows "
+              f"in {t_universe:.2f}s ({total_rows / t_universe:,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
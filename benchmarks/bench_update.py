@@ -0,0 +1,59 @@
+"""
+Offline throughput benchmark for DataFetcher.update_universe.
+
+A fake provider sleeps to mimic network latency (per call, plus a little per
+ticker), so sequential vs concurrent/batched updates can be compared without
+touching Yahoo:
+
+    python -m benchmarks.bench_update
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.data.store import DataStore
+from src.data.fetcher import DataFetcher
+
+
+class LatencyProvider:
+    def __init__(self, call_latency=0.2, ticker_latency=0.01, years=10):
+        self.call_latency = call_latency
+        self.ticker_latency = ticker_latency
+        self.index = pd.bdate_range(end='2024-12-31', periods=years * 252)
+
+    def __call__(self, tickers, start=None, period=None, progress=False, auto_adjust=True):
+        batch = [tickers] if isinstance(tickers, str) else list(tickers)
+        time.sleep(self.call_latency + self.ticker_latency * len(batch))
+        index = self.index if start is None else self.index[self.index >= pd.Timestamp(start)]
+        frames = {}
+        for i, t in enumerate(batch):
+            close = 100 * np.exp(np.cumsum(np.full(len(index), 0.0002 * (i + 1))))
+            for field in ['Open', 'High', 'Low', 'Close']:
+                frames[(field, t)] = close
+            frames[('Volume', t)] = np.full(len(index), 1000)
+        return pd.DataFrame(frames, index=index)
+
+
+def main(n_tickers=60):
+    tickers = [f"SYN{i:03d}" for i in range(n_tickers)]
+    provider = LatencyProvider()
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, kwargs in [
+            ('sequential', dict(workers=1)),
+            ('4 workers, batch 1', dict(workers=4, batch_size=1, rate=0)),
+            ('4 workers, batch 20', dict(workers=4, batch_size=20, rate=0)),
+        ]:
+            store = DataStore(os.path.join(tmp, f"{label.replace(' ', '_').replace(',', '')}.db"))
+            fetcher = DataFetcher(store, download=provider, info=False)
+            summary = fetcher.update_universe(tickers, **kwargs)
+            print(f"{label:22s}: {summary['seconds']:6.2f}s, {summary['rows'] / summary['seconds']:10,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+Reproducible performance benchmark suite.
+
+Times the main code paths against deterministic synthetic prices (see
+benchmarks/synthetic.py) at several universe sizes, fully offline:
+
+  store.store_prices       bulk writes of every ticker into an empty DB
+  store.load_prices        single-ticker reads (cache off)
+  store.load_price_matrix  one date x ticker panel
+  optimize.<method>        optimize_portfolio on the full history
+  optimize.frontier        30-point efficient frontier (warm-started QPs, cache off)
+  covariance.<estimator>   estimate + min-volatility solve on one lookback window,
+                           with peak traced memory (sample vs low-rank estimators)
+  analytics.metrics        performance_metrics of every asset's price curve at once
+  backtest.<strategy>      Backtester.run_backtest end to end
+  risk.get_market_regime   from the indicator table
+  risk.get_regime_series   full point-in-time regime series
+
+Results (plus commit, library versions and machine info) go to a JSON file,
+and --compare prints the change against an earlier run:
+
+    python -m benchmarks.run [--sizes 3,10,50,200,500,2000] [--output results.json]
+    python -m benchmarks.run --compare old.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import scipy
+import sqlalchemy
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.synthetic import synthetic_prices, ohlcv_frame, populate_store
+from src.data.store import DataStore
+from src.engine.analytics import performance_metrics
+from src.engine.backtest import Backtester
+from src.engine.covariance import ESTIMATORS, estimate_moments
+from src.engine.frontier import efficient_frontier
+from src.engine.optimization import optimize_portfolio
+from src.risk.indicators import update_indicators
+from src.risk.signals import RiskManager
+
+SIZES = (3, 10, 50, 200, 500, 2000)
+METHODS = ('max_sharpe', 'min_volatility', 'risk_parity', 'erc', 'hrp')
+STRATEGIES = ('max_sharpe', 'min_volatility')
+# Single-ticker reads are timed on at most this many tickers per size
+LOAD_PRICES_TICKERS = 50
+
+
+def measure(fn, repeat, setup=None):
+    """
+    Seconds of `repeat` calls of fn (setup() runs untimed before each, and
+    its result is passed to fn).
+    """
+    seconds = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn(arg) if setup else fn()
+        seconds.append(time.perf_counter() - t0)
+    return seconds
+
+
+def peak_memory(fn):
+    """
+    Peak memory (bytes) allocated through Python/NumPy during one call of fn.
+    """
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def environment(args):
+    def git(*cmd):
+        try:
+            return subprocess.run(['git', *cmd], capture_output=True, text=True, check=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except Exception:
+            return None
+
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'scipy': scipy.__version__,
+        'sqlalchemy': sqlalchemy.__version__,
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'args': vars(args),
+    }
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.results = []
+        # Slowest median per benchmark so far; larger sizes are skipped once it exceeds the budget
+        self.slowest = {}
+
+    def record(self, name, n, fn, setup=None, repeat=None, skip=None, memory=False, **extra):
+        if skip is None and self.slowest.get(name, 0) > self.args.budget:
+            skip = f"previous size took over {self.args.budget:g}s"
+        entry = {'name': name, 'assets': n}
+        if skip:
+            entry['skipped'] = skip
+            print(f"  {name:28s} skipped ({skip})")
+        else:
+            try:
+                seconds = measure(fn, repeat or self.args.repeat, setup)
+            except Exception as e:
+                entry['error'] = str(e)
+                print(f"  {name:28s} failed: {e}")
+            else:
+                entry.update(seconds=seconds, min=min(seconds), median=float(np.median(seconds)), **extra)
+                self.slowest[name] = max(self.slowest.get(name, 0), entry['median'])
+                if memory:
+                    entry['peak_bytes'] = peak_memory(fn)
+                print(f"  {name:28s} {entry['median'] * 1000:10.1f}ms (min {entry['min'] * 1000:.1f}ms)"
+                      + (f"  peak {entry['peak_bytes'] / 2**20:.1f}MB" if memory else ''))
+        self.results.append(entry)
+
+    def run_size(self, n, tmp):
+        args = self.args
+        print(f"{n} assets x {args.years}y")
+        prices, market = synthetic_prices(n, args.years, args.market_corr, args.sector_corr, seed=args.seed)
+        frames = [(t, ohlcv_frame(prices[t], seed=args.seed + i)) for i, t in enumerate(prices.columns)]
+        rows = sum(len(f) for _, f in frames)
+        runs = iter(range(10 ** 6))
+
+        def fresh_store():
+            return DataStore(os.path.join(tmp, f'store_{n}_{next(runs)}.db'), cache_bytes=0)
+
+        self.record('store.store_prices', n, lambda store: [store.store_prices(t, f) for t, f in frames],
+                    setup=fresh_store, rows=rows)
+
+        store = DataStore(os.path.join(tmp, f'bench_{n}.db'), cache_bytes=0)
+        populate_store(store, prices, market, seed=args.seed)
+        update_indicators(store)
+        tickers = list(prices.columns)
+
+        sample = tickers[:LOAD_PRICES_TICKERS]
+        self.record('store.load_prices', n, lambda: [store.load_prices(t) for t in sample], tickers=len(sample))
+        self.record('store.load_price_matrix', n, lambda: store.load_price_matrix(tickers), rows=rows)
+
+        for method in METHODS:
+            self.record(f'optimize.{method}', n, lambda: optimize_portfolio(prices, method=method))
+        self.record('optimize.frontier', n, lambda: efficient_frontier(prices, n_points=30, use_cache=False),
+                    points=30)
+        window = prices.pct_change().iloc[1:].tail(int(252 * args.lookback))
+        for estimator in ESTIMATORS:
+            self.record(f'covariance.{estimator}', n,
+                        lambda: optimize_portfolio(method='min_volatility', moments=estimate_moments(window, estimator)),
+                        memory=True, days=len(window))
+        self.record('analytics.metrics', n, lambda: performance_metrics(prices), curves=n)
+
+        end = prices.index[-1]
+        start = end - pd.DateOffset(years=args.backtest_years)
+        for strategy in STRATEGIES:
+            self.record(f'backtest.{strategy}', n,
+                        lambda: Backtester(store).run_backtest(tickers, start, end, rebalance_freq=args.rebalance,
+                                                               strategy=strategy, lookback_years=args.lookback),
+                        rebalance_freq=args.rebalance, years=args.backtest_years)
+
+        risk = RiskManager(store)
+        self.record('risk.get_market_regime', n, risk.get_market_regime)
+        self.record('risk.get_regime_series', n, risk.get_regime_series)
+
+    def run(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for n in self.args.sizes:
+                self.run_size(n, tmp)
+        return self.results
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the median change of every benchmark present in both runs.
+    Returns the number of regressions (slower by more than `threshold`, e.g. 0.2 = 20%).
+    """
+    old = {(r['name'], r['assets']): r['median'] for r in baseline['results'] if 'median' in r}
+    regressions = 0
+    print(f"Compared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for r in results:
+        key = (r['name'], r['assets'])
+        if 'median' not in r or key not in old:
+            continue
+        ratio = r['median'] / old[key] if old[key] > 0 else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif ratio < 1 / (1 + threshold):
+            flag = '  faster'
+        print(f"  {r['name']:28s} {r['assets']:5d}  {old[key] * 1000:10.1f}ms -> {r['median'] * 1000:10.1f}ms"
+              f"  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline performance benchmark suite")
+    parser.add_argument('--sizes', type=lambda s: [int(x) for x in s.split(',')], default=list(SIZES),
+                        help="Comma-separated universe sizes")
+    parser.add_argument('--years', type=int, default=10, help="Years of synthetic history")
+    parser.add_argument('--market-corr', type=float, default=0.3)
+    parser.add_argument('--sector-corr', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--backtest-years', type=int, default=3)
+    parser.add_argument('--lookback', type=float, default=1, help="Backtest lookback (years)")
+    parser.add_argument('--rebalance', default='M')
+    parser.add_argument('--budget', type=float, default=60,
+                        help="Skip larger sizes of a benchmark once its median exceeds this many seconds")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="Earlier results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Relative slowdown counted as a regression")
+    args = parser.parse_args(argv)
+
+    meta = environment(args)
+    started = time.perf_counter()
+    results = Suite(args).run()
+    meta['seconds'] = time.perf_counter() - started
+
+    with open(args.output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output} ({meta['seconds']:.0f}s)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"{regressions} regression(s) over {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
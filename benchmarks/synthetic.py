@@ -0,0 +1,97 @@
+"""
+Deterministic synthetic market data for offline benchmarks.
+
+Daily log returns follow a one-market / many-sector factor model, so the
+correlation structure is set directly:
+
+    corr(i, j) = market_corr                  (different sectors)
+               = market_corr + sector_corr    (same sector)
+
+Volatilities and drifts are drawn per asset. The same seed always gives the
+same prices.
+"""
+import numpy as np
+import pandas as pd
+
+END_DATE = '2024-12-31'
+
+
+def synthetic_prices(n_assets, years=10, market_corr=0.3, sector_corr=0.2, n_sectors=10,
+                     vol=(0.05, 0.35), drift=(-0.02, 0.12), seed=0, end=END_DATE, prefix='S'):
+    """
+    date x ticker close panel (business days ending at `end`), plus the daily
+    market factor return Series used to build it.
+    vol / drift: ranges of annualized volatility and drift, drawn uniformly per asset.
+    """
+    if market_corr + sector_corr > 1:
+        raise ValueError("market_corr + sector_corr must be <= 1")
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp(end), periods=int(years * 252))
+    T = len(index)
+    sectors = np.arange(n_assets) % max(n_sectors, 1)
+
+    market = rng.standard_normal(T)
+    sector = rng.standard_normal((T, max(n_sectors, 1)))
+    z = rng.standard_normal((T, n_assets))
+    z *= np.sqrt(1 - market_corr - sector_corr)
+    z += np.sqrt(market_corr) * market[:, None]
+    z += np.sqrt(sector_corr) * sector[:, sectors]
+
+    sigma = rng.uniform(*vol, n_assets) / np.sqrt(252)
+    mu = rng.uniform(*drift, n_assets) / 252 - sigma ** 2 / 2
+    log_returns = z * sigma + mu
+    close = 100 * np.exp(np.cumsum(log_returns, axis=0))
+    tickers = [f'{prefix}{i:04d}' for i in range(n_assets)]
+    return pd.DataFrame(close, index=index, columns=tickers), pd.Series(market, index=index)
+
+
+def ohlcv_frame(close, seed=0):
+    """
+    yfinance-style Open/High/Low/Close/Adj Close/Volume frame around a close Series.
+    """
+    rng = np.random.default_rng(seed)
+    index = close.index
+    close = close.to_numpy(dtype='float64')
+    spread = np.abs(rng.normal(0, 0.005, len(close)))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.002, len(close))),
+        'High': close * (1 + spread),
+        'Low': close * (1 - spread),
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, len(close)),
+    }, index=index)
+
+
+def regime_closes(market, market_vol=0.16, seed=0):
+    """
+    Synthetic VOO and ^VIX closes driven by the market factor: VOO follows it,
+    VIX tracks its trailing realized volatility (with noise), so the regime
+    signals switch between risk on and risk off over the history.
+    """
+    rng = np.random.default_rng(seed)
+    r = market.to_numpy() * market_vol / np.sqrt(252) + 0.0003
+    # Volatility clustering: scale returns by a slowly varying level
+    level = np.exp(np.convolve(rng.standard_normal(len(r)), np.full(60, 1 / np.sqrt(60)), mode='same') * 0.5)
+    r = r * level
+    voo = pd.Series(300 * np.exp(np.cumsum(r)), index=market.index)
+    realized = pd.Series(r, index=market.index).rolling(20, min_periods=1).std().bfill() * np.sqrt(252)
+    vix = 100 * realized * np.exp(rng.normal(0, 0.05, len(r))) + 5
+    return voo, vix
+
+
+def populate_store(store, prices, market=None, seed=0):
+    """
+    Stores every column of a close panel (and VOO / ^VIX built from `market`)
+    as OHLCV rows. Returns the number of rows written.
+    """
+    items = [(t, ohlcv_frame(prices[t], seed=seed + i)) for i, t in enumerate(prices.columns)]
+    if market is not None:
+        voo, vix = regime_closes(market, seed=seed)
+        items += [('VOO', ohlcv_frame(voo, seed=seed + len(items))),
+                  ('^VIX', ohlcv_frame(vix, seed=seed + len(items) + 1))]
+    results = store.store_prices_many(items)
+    errors = {t: r['error'] for t, r in results.items() if 'error' in r}
+    if errors:
+        raise RuntimeError(f"Failed to store synthetic prices: {errors}")
+    return sum(r['inserted'] for r in results.values())
@@ -0,0 +1,106 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# One cache per database, shared by every DataStore in the process
+# (Streamlit reruns rebuild DataStore, the cache should survive that).
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+def frame_nbytes(frame):
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+class PriceCache:
+    """
+    Memory-bounded LRU cache for price frames and matrices.
+    Every entry remembers the data versions of the tickers it was built from
+    and is dropped on lookup if any of those versions has moved since.
+    """
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        # ticker -> (latest_date, row_count); None until loaded from the DB
+        self.versions = None
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry_versions, value, size = entry
+            if entry_versions != versions:
+                del self._entries[key]
+                self.nbytes -= size
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, versions, value):
+        size = frame_nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            self._entries[key] = (versions, value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes and self._entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def get_version(self, ticker):
+        return self.versions.get(ticker) if self.versions is not None else None
+
+    def set_version(self, ticker, version):
+        with self._lock:
+            # Nothing loaded yet: a dict holding only this ticker would hide
+            # every other ticker's version until the next full refresh
+            if self.versions is None:
+                return
+            if version is None:
+                self.versions.pop(ticker, None)
+            else:
+                self.versions[ticker] = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+            }
+
+def get_shared_cache(name, max_bytes=DEFAULT_CACHE_BYTES):
+    """
+    Returns the process-wide cache for a database, creating it on first use.
+    """
+    with _shared_lock:
+        cache = _shared_caches.get(name)
+        if cache is None:
+            cache = PriceCache(max_bytes)
+            _shared_caches[name] = cache
+        else:
+            cache.max_bytes = max_bytes
+        return cache
@@ -0,0 +1,189 @@
+import os
+import numpy as np
+import pandas as pd
+
+# On-disk dtype per column. Dates are stored as days since the epoch.
+COLUMN_DTYPES = {
+    'date': '<i8',
+    'open': '<f8',
+    'high': '<f8',
+    'low': '<f8',
+    'close': '<f8',
+    'adj_close': '<f8',
+    'volume': '<i8',
+}
+VALUE_FIELDS = [c for c in COLUMN_DTYPES if c != 'date']
+
+class ColumnarPriceStore:
+    """
+    Price backend that keeps one append-only binary file per field per ticker:
+
+        <root>/<ticker>/date.bin, open.bin, ..., volume.bin
+
+    All files of a ticker are row-aligned on date.bin and read back through
+    read-only numpy memmaps, so whole-column scans never copy or parse rows.
+    Appends write the value columns first and the date column last; readers
+    size everything off date.bin, so a torn append is simply not visible.
+    """
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _ticker_dir(self, ticker):
+        if not ticker or '/' in ticker or '\\' in ticker or ticker in ('.', '..'):
+            raise ValueError(f"Invalid ticker for columnar store: {ticker!r}")
+        return os.path.join(self.root, ticker)
+
+    def _path(self, ticker, field):
+        return os.path.join(self._ticker_dir(ticker), f'{field}.bin')
+
+    def _open(self, ticker, field, length=None):
+        path = self._path(ticker, field)
+        dtype = np.dtype(COLUMN_DTYPES[field])
+        if not os.path.exists(path):
+            return np.empty(0, dtype=dtype)
+        size = os.path.getsize(path) // dtype.itemsize
+        if length is not None:
+            size = min(size, length)
+        if size == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(size,))
+
+    def tickers(self):
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, 'date.bin'))
+        )
+
+    def _dates(self, ticker):
+        return self._open(ticker, 'date')
+
+    def dates(self, ticker):
+        """
+        Stored dates of a ticker as day numbers (days since 1970-01-01), ascending.
+        """
+        return np.asarray(self._dates(ticker), dtype='int64')
+
+    def get_latest_date(self, ticker):
+        dates = self._dates(ticker)
+        if len(dates) == 0:
+            return None
+        return _to_date(dates[-1])
+
+    def get_data_version(self, ticker):
+        dates = self._dates(ticker)
+        if len(dates) == 0:
+            return None
+        return (_to_date(dates[-1]), len(dates))
+
+    def data_versions(self):
+        versions = {}
+        for ticker in self.tickers():
+            version = self.get_data_version(ticker)
+            if version:
+                versions[ticker] = version
+        return versions
+
+    def store_prices(self, ticker, frame):
+        """
+        Writes a frame already normalized to price_data columns (see
+        store.normalize_price_frame). New dates after the last stored one are
+        appended; dates already present are skipped. Older missing dates
+        (a backfill) force a one-off rewrite of the ticker's files.
+        """
+        stats = {'inserted': 0, 'skipped': 0}
+        if frame.empty:
+            return stats
+        new_days = _to_days(frame.index)
+        order = np.argsort(new_days, kind='stable')
+        new_days = new_days[order]
+        frame = frame.iloc[order]
+
+        existing = self._dates(ticker)
+        present = np.isin(new_days, existing) if len(existing) else np.zeros(len(new_days), dtype=bool)
+        stats['skipped'] = int(present.sum())
+        new_days = new_days[~present]
+        frame = frame[~present]
+        if len(new_days) == 0:
+            return stats
+
+        os.makedirs(self._ticker_dir(ticker), exist_ok=True)
+        if len(existing) == 0 or new_days[0] > existing[-1]:
+            self._append(ticker, new_days, frame, len(existing))
+        else:
+            self._rewrite(ticker, existing, new_days, frame)
+        stats['inserted'] = len(new_days)
+        return stats
+
+    def _append(self, ticker, days, frame, committed):
+        for field in VALUE_FIELDS:
+            dtype = np.dtype(COLUMN_DTYPES[field])
+            path = self._path(ticker, field)
+            with open(path, 'ab') as f:
+                # Drop any tail left behind by an interrupted append
+                f.truncate(committed * dtype.itemsize)
+                f.write(_column_values(frame, field, dtype).tobytes())
+        with open(self._path(ticker, 'date'), 'ab') as f:
+            f.write(days.astype(COLUMN_DTYPES['date']).tobytes())
+
+    def _rewrite(self, ticker, existing, days, frame):
+        n = len(existing)
+        merged_days = np.concatenate([np.asarray(existing), days])
+        order = np.argsort(merged_days, kind='stable')
+        for field in VALUE_FIELDS + ['date']:
+            dtype = np.dtype(COLUMN_DTYPES[field])
+            if field == 'date':
+                merged = merged_days[order].astype(dtype)
+            else:
+                old = np.asarray(self._open(ticker, field, n))
+                merged = np.concatenate([old, _column_values(frame, field, dtype)])[order]
+            path = self._path(ticker, field)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(merged.tobytes())
+            os.replace(tmp, path)
+
+    def load_prices(self, ticker):
+        dates = self._dates(ticker)
+        n = len(dates)
+        if n == 0:
+            return pd.DataFrame(columns=['ticker'] + VALUE_FIELDS)
+        data = {'ticker': np.full(n, ticker, dtype=object)}
+        for field in VALUE_FIELDS:
+            data[field] = self._open(ticker, field, n)
+        df = pd.DataFrame(data, index=_to_index(dates), copy=False)
+        df.index.name = 'date'
+        return df
+
+    def load_price_matrix(self, tickers, field, start_date=None, end_date=None, dtype='float32'):
+        lo = _to_days([pd.Timestamp(start_date)])[0] if start_date is not None else None
+        hi = _to_days([pd.Timestamp(end_date)])[0] if end_date is not None else None
+        series = {}
+        for t in tickers:
+            dates = self._dates(t)
+            if len(dates) == 0:
+                continue
+            i = np.searchsorted(dates, lo, side='left') if lo is not None else 0
+            j = np.searchsorted(dates, hi, side='right') if hi is not None else len(dates)
+            if j <= i:
+                continue
+            values = self._open(t, field, len(dates))[i:j]
+            series[t] = pd.Series(values, index=_to_index(dates[i:j]), copy=False)
+        matrix = pd.DataFrame(series).reindex(columns=list(tickers)).astype(dtype)
+        matrix.index = pd.DatetimeIndex(matrix.index, name='date')
+        return matrix
+
+def _to_days(index):
+    return pd.DatetimeIndex(pd.to_datetime(index)).to_numpy().astype('datetime64[D]').astype('int64')
+
+def _to_index(days):
+    return pd.DatetimeIndex(np.asarray(days, dtype='int64').astype('datetime64[D]').astype('datetime64[ns]'))
+
+def _to_date(day):
+    return np.datetime64(int(day), 'D').astype(object)
+
+def _column_values(frame, field, dtype):
+    values = frame[field].to_numpy(dtype='float64')
+    if dtype.kind == 'i':
+        values = np.nan_to_num(values)
+    return values.astype(dtype)
@@ -1,78 +1,318 @@
 import yfinance as yf
 import pandas as pd
 import datetime
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from .store import DataStore
+from ..engine import profiling
+from ..engine.profiling import RunStats
+
+def yf_info(ticker):
+    return yf.Ticker(ticker).info
+
+class RateLimiter:
+    """
+    Token bucket shared by all download workers.
+    `rate` tokens are added per second up to `capacity`; each provider call takes one.
+    """
+    def __init__(self, rate=2.0, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
 
 class DataFetcher:
-    def __init__(self, store: DataStore):
+    def __init__(self, store: DataStore, download=None, info=None):
+        """
+        download: callable with the yf.download signature (tickers, start=, period=, ...).
+        info: callable returning the yf.Ticker(t).info dict, or False to skip metadata.
+        Both default to yfinance; pass fakes to run updates offline.
+        """
         self.store = store
+        self.download = download or yf.download
+        self.info = info if info is not None else yf_info
+        # Latest stored date per ticker, read from the coverage catalog in one
+        # query when planning an update_universe run
+        self.latest_dates = None
 
-    def update_ticker(self, ticker):
+    def _start_date(self, ticker):
         """
-        Updates data for a single ticker. 
-        Fetches only missing data since the last record in DB.
+        Returns (start_date, up_to_date). start_date is None when the DB has no data.
         """
-        print(f"Updating {ticker}...")
         try:
-            latest_date = self.store.get_latest_date(ticker)
+            if self.latest_dates is not None:
+                latest_date = self.latest_dates.get(ticker)
+            else:
+                latest_date = self.store.get_latest_date(ticker)
         except Exception as e:
             print(f"Error accessing DB for {ticker}: {e}")
             latest_date = None
 
-        start_date = None
         if latest_date:
             # Fetch from next day
             start_date = latest_date + datetime.timedelta(days=1)
             # If start_date is in future (today is the latest), skip
-            if start_date > datetime.date.today():
-                print(f"  {ticker} is up to date.")
-                return
-        
+            return start_date, start_date > datetime.date.today()
+        return None, False
+
+    def _download(self, tickers, start_date):
+        profiling.count('download_calls')
+        with profiling.stage('fetch.download'):
+            if start_date:
+                return self.download(tickers, start=start_date, progress=False, auto_adjust=True)
+            return self.download(tickers, period="max", progress=False, auto_adjust=True)
+
+    def _clean(self, data, start_date):
+        if data.empty:
+            return data
+        # Standardize columns
+        if 'Adj Close' not in data.columns and 'Close' in data.columns:
+            # yfinance auto_adjust=True makes Close = Adj Close
+            data = data.copy()
+            data['Adj Close'] = data['Close']
+        # Filter out rows that might duplicate the start_date if yfinance behaves oddly
+        if start_date:
+            data = data[data.index.date >= start_date]
+        return data
+
+    def _store_info(self, ticker):
+        if not self.info:
+            return
+        try:
+            info = self.info(ticker)
+            self.store.store_asset_details(
+                ticker,
+                name=info.get('longName', info.get('shortName')),
+                sector=info.get('sector'),
+                asset_class=info.get('quoteType')
+            )
+        except:
+            pass # Info fetch is often flaky
+
+    def update_ticker(self, ticker):
+        """
+        Updates data for a single ticker.
+        Fetches only missing data since the last record in DB.
+        Returns a dict with 'status' ('updated', 'up_to_date', 'no_data', 'failed') and 'rows'.
+        """
+        print(f"Updating {ticker}...")
+        start_date, up_to_date = self._start_date(ticker)
+        if up_to_date:
+            print(f"  {ticker} is up to date.")
+            return {'status': 'up_to_date', 'rows': 0}
+
         # If no data exists, fetch max history
         # If data exists, fetch from start_date
-        
-        data = pd.DataFrame()
         try:
             if start_date:
                 print(f"  Fetching from {start_date}...")
-                data = yf.download(ticker, start=start_date, progress=False, auto_adjust=True)
             else:
                 print(f"  Fetching max history...")
-                data = yf.download(ticker, period="max", progress=False, auto_adjust=True)
-            
+            data = self._clean(self._download(ticker, start_date), start_date)
+
             if not data.empty:
-                # Standardize columns
-                if 'Adj Close' not in data.columns and 'Close' in data.columns:
-                    # yfinance auto_adjust=True makes Close = Adj Close
-                    data['Adj Close'] = data['Close']
-                
-                # Filter out rows that might duplicate the start_date if yfinance behaves oddly
-                if start_date:
-                    data = data[data.index.date >= start_date]
-                
-                if not data.empty:
-                    print(f"  Saving {len(data)} records...")
-                    self.store.store_prices(ticker, data)
-                    
-                    # Also try to update asset details if possible
-                    try:
-                        info = yf.Ticker(ticker).info
-                        self.store.store_asset_details(
-                            ticker, 
-                            name=info.get('longName', info.get('shortName')), 
-                            sector=info.get('sector'),
-                            asset_class=info.get('quoteType')
-                        )
-                    except:
-                        pass # Info fetch is often flaky
-                else:
-                    print("  No new data found.")
+                print(f"  Saving {len(data)} records...")
+                result = self.store.store_prices(ticker, data)
+                if 'error' in result:
+                    print(f"  Failed to save {ticker}: {result['error']}")
+                    return {'status': 'failed', 'rows': 0, 'error': result['error']}
+                print(f"  Inserted {result['inserted']}, skipped {result['skipped']} existing.")
+
+                # Also try to update asset details if possible
+                self._store_info(ticker)
+                return {'status': 'updated', 'rows': result['inserted']}
+            print("  No new data found.")
+            return {'status': 'no_data', 'rows': 0}
         except Exception as e:
             print(f"  Failed to update {ticker}: {e}")
+            return {'status': 'failed', 'rows': 0, 'error': str(e)}
 
-    def update_universe(self, tickers):
+    def update_universe(self, tickers, workers=1, batch_size=20, rate=2.0, retries=3, backoff=1.0):
         """
-        Updates a list of tickers.
+        Updates a list of tickers and prints a summary.
+        workers=1 runs the original one-ticker-at-a-time loop. With more workers,
+        tickers sharing a start date are downloaded in multi-ticker batches on a
+        bounded thread pool, throttled by a token bucket (`rate` calls/s) and
+        retried with exponential backoff. A failed batch is retried ticker by
+        ticker so one bad symbol doesn't sink the rest. All DB writes go
+        through a single writer thread.
+        Returns the summary dict; summary['stats'] holds the run's stage timings and
+        counters (downloads, retries, rows written), see engine.profiling.RunStats.
         """
+        started = time.perf_counter()
+        tickers = list(dict.fromkeys(tickers))
+        stats = RunStats('update_universe', tickers=len(tickers), workers=workers, batch_size=batch_size)
+        with profiling.collect(stats), stats.stage('total'):
+            coverage = self.store.get_coverage(tickers)['last_date'].dropna()
+            self.latest_dates = coverage.to_dict()
+            try:
+                if workers <= 1:
+                    results = {t: self.update_ticker(t) for t in tickers}
+                else:
+                    results = self._update_concurrent(tickers, workers, batch_size, rate, retries, backoff)
+            finally:
+                self.latest_dates = None
+        stats.emit()
+
+        summary = {
+            'updated': sorted(t for t, r in results.items() if r['status'] == 'updated'),
+            'up_to_date': sorted(t for t, r in results.items() if r['status'] in ('up_to_date', 'no_data')),
+            'failed': {t: r.get('error', '') for t, r in results.items() if r['status'] == 'failed'},
+            'rows': sum(r['rows'] for r in results.values()),
+            'seconds': time.perf_counter() - started,
+            'stats': stats.to_dict(),
+        }
+        print(f"Updated {len(summary['updated'])} tickers, {len(summary['up_to_date'])} up to date, "
+              f"{len(summary['failed'])} failed; {summary['rows']} rows written in {summary['seconds']:.1f}s.")
+        for t, err in summary['failed'].items():
+            print(f"  {t} failed: {err}")
+        return summary
+
+    def _update_concurrent(self, tickers, workers, batch_size, rate, retries, backoff):
+        results = {}
+        groups = {}
         for t in tickers:
-            self.update_ticker(t)
+            start_date, up_to_date = self._start_date(t)
+            if up_to_date:
+                results[t] = {'status': 'up_to_date', 'rows': 0}
+            else:
+                groups.setdefault(start_date, []).append(t)
+
+        batches = []
+        for start_date, group in groups.items():
+            size = max(1, batch_size)
+            for i in range(0, len(group), size):
+                batches.append((start_date, group[i:i + size]))
+
+        limiter = RateLimiter(rate)
+        writes = queue.Queue(maxsize=workers * 2)
+        lock = threading.Lock()
+
+        def record(ticker, result):
+            with lock:
+                results[ticker] = result
+
+        def writer():
+            # The only thread that touches the DB while downloads run. Whatever
+            # has queued up meanwhile is written together in batched commits.
+            done = False
+            while not done:
+                items = [writes.get()]
+                while items[-1] is not None:
+                    try:
+                        items.append(writes.get_nowait())
+                    except queue.Empty:
+                        break
+                if items[-1] is None:
+                    done = True
+                    items.pop()
+                if not items:
+                    continue
+                try:
+                    stored = self.store.store_prices_many(items)
+                    for ticker, result in stored.items():
+                        if 'error' in result:
+                            record(ticker, {'status': 'failed', 'rows': 0, 'error': result['error']})
+                        else:
+                            record(ticker, {'status': 'updated', 'rows': result['inserted']})
+                except Exception as e:
+                    for ticker, _ in items:
+                        record(ticker, {'status': 'failed', 'rows': 0, 'error': str(e)})
+
+        def call(fn, *args):
+            for attempt in range(retries + 1):
+                limiter.acquire()
+                try:
+                    return fn(*args)
+                except Exception:
+                    if attempt == retries:
+                        raise
+                    profiling.count('download_retries')
+                    time.sleep(backoff * (2 ** attempt) * (1 + random.random() * 0.1))
+
+        def fetch(start_date, batch):
+            try:
+                frames = split_batch(call(self._download, batch if len(batch) > 1 else batch[0], start_date), batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    record(batch[0], {'status': 'failed', 'rows': 0, 'error': str(e)})
+                    return []
+                # Isolate the bad symbol(s) by falling back to single-ticker calls
+                for t in batch:
+                    fetch(start_date, [t])
+                return []
+            saved = []
+            for t in batch:
+                data = self._clean(frames.get(t, pd.DataFrame()), start_date)
+                if data.empty:
+                    record(t, {'status': 'no_data', 'rows': 0})
+                else:
+                    writes.put((t, data))
+                    saved.append(t)
+            return saved
+
+        # Threads don't inherit the caller's RunStats; hand it over explicitly
+        writer_thread = threading.Thread(target=profiling.propagate(writer), daemon=True)
+        writer_thread.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                saved = [t for batch in pool.map(profiling.propagate(lambda b: fetch(*b)), batches) for t in batch]
+                info = {}
+                if self.info:
+                    info = dict(zip(saved, pool.map(profiling.propagate(lambda t: self._safe_info(call, t)), saved)))
+        finally:
+            writes.put(None)
+            writer_thread.join()
+
+        for t, details in info.items():
+            if details:
+                self.store.store_asset_details(
+                    t,
+                    name=details.get('longName', details.get('shortName')),
+                    sector=details.get('sector'),
+                    asset_class=details.get('quoteType')
+                )
+        return results
+
+    def _safe_info(self, call, ticker):
+        try:
+            return call(self.info, ticker)
+        except Exception:
+            return None # Info fetch is often flaky
+
+def split_batch(data, tickers):
+    """
+    Splits a (possibly multi-ticker) download into one frame per ticker.
+    Handles both yfinance column layouts: (Price, Ticker) and group_by='ticker'.
+    """
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        return {tickers[0]: data} if len(tickers) == 1 else {}
+    frames = {}
+    for level in range(data.columns.nlevels):
+        present = set(data.columns.get_level_values(level))
+        if any(t in present for t in tickers):
+            for t in tickers:
+                if t in present:
+                    frames[t] = data.xs(t, axis=1, level=level).dropna(how='all')
+            return frames
+    return frames
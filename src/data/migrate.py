@@ -0,0 +1,59 @@
+"""
+Copies price history from the SQLite price_data table into the columnar backend.
+
+    python -m src.data.migrate [--db portfolio.db] [--out portfolio_columns]
+
+Then select the backend with PORTFOLIO_PRICE_BACKEND=columnar. Preferences and
+asset metadata stay in the SQLite file and are not touched.
+"""
+import argparse
+import time
+from sqlalchemy import select
+from .store import DataStore, PriceData, PRICE_FIELDS, default_columns_path
+
+def migrate(db_path='portfolio.db', columns_path=None):
+    source = DataStore(db_path, cache_bytes=0, backend='sqlite')
+    target = DataStore(db_path, cache_bytes=0, backend='columnar',
+                       columns_path=columns_path or default_columns_path(db_path))
+
+    with source.engine.connect() as conn:
+        tickers = conn.execute(select(PriceData.ticker).distinct()).scalars().all()
+
+    totals = {'tickers': 0, 'inserted': 0, 'skipped': 0, 'failed': {}}
+    start = time.perf_counter()
+    for ticker in sorted(tickers):
+        df = source.load_prices(ticker)
+        if df.empty:
+            continue
+        # load_prices returns price_data column names; map back to the fetcher's
+        df = df[PRICE_FIELDS].rename(columns={
+            'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close',
+            'adj_close': 'Adj Close', 'volume': 'Volume',
+        })
+        result = target.store_prices(ticker, df)
+        if 'error' in result:
+            totals['failed'][ticker] = result['error']
+            print(f"  {ticker}: failed: {result['error']}")
+            continue
+        totals['tickers'] += 1
+        totals['inserted'] += result['inserted']
+        totals['skipped'] += result['skipped']
+        print(f"  {ticker}: {result['inserted']} rows")
+    totals['seconds'] = time.perf_counter() - start
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate SQLite prices to the columnar backend")
+    parser.add_argument('--db', default='portfolio.db')
+    parser.add_argument('--out', default=None, help="Column directory (default: <db>_columns)")
+    args = parser.parse_args()
+
+    print(f"Migrating prices from {args.db}...")
+    totals = migrate(args.db, args.out)
+    print(f"Migrated {totals['tickers']} tickers, {totals['inserted']} rows "
+          f"({totals['skipped']} already present) in {totals['seconds']:.1f}s.")
+    for ticker, err in totals['failed'].items():
+        print(f"  {ticker} failed: {err}")
+
+if __name__ == "__main__":
+    main()
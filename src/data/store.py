@@ -1,8 +1,16 @@
 import os
 import datetime
-from sqlalchemy import create_engine, Column, String, Float, Date, Integer, UniqueConstraint, inspect
+import threading
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func, text, event, create_engine, Column, String, Float, Date, DateTime, Integer, LargeBinary, UniqueConstraint, Index, inspect, delete, update
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .cache import DEFAULT_CACHE_BYTES, get_shared_cache
+from .columnar import ColumnarPriceStore
+from ..engine import profiling
 
 Base = declarative_base()
 
@@ -28,19 +36,238 @@ class PriceData(Base):
     volume = Column(Integer)
     
 
-    __table_args__ = (UniqueConstraint('ticker', 'date', name='uix_ticker_date'),)
+    __table_args__ = (
+        UniqueConstraint('ticker', 'date', name='uix_ticker_date'),
+        # Covering index for the hot range scans (adj_close / close panels):
+        # answered from the index alone, rows in (ticker, date) order
+        Index('ix_price_data_ticker_date_close', 'ticker', 'date', 'adj_close', 'close'),
+    )
+
+class PriceCoverage(Base):
+    """
+    Per-ticker summary of the stored prices, kept in step with price_data by
+    store_prices (same transaction). A gap is more than GAP_DAYS calendar days
+    between consecutive rows, i.e. longer than any weekend plus market holiday.
+    Rows are per price backend: a SQLite and a columnar store can share the file.
+    """
+    __tablename__ = 'price_coverage'
+    backend = Column(String, primary_key=True)
+    ticker = Column(String, primary_key=True)
+    first_date = Column(Date)
+    last_date = Column(Date)
+    row_count = Column(Integer)
+    gap_count = Column(Integer)
+    max_gap_days = Column(Integer)
+
+GAP_DAYS = 5
+
+class IndicatorData(Base):
+    """
+    Materialized indicator values (see src/risk/indicators.py), one row per
+    ticker, indicator and date. Extended incrementally after each price update.
+    """
+    __tablename__ = 'indicator_data'
+    id = Column(Integer, primary_key=True)
+    ticker = Column(String, nullable=False)
+    indicator = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    value = Column(Float)
+
+    __table_args__ = (UniqueConstraint('ticker', 'indicator', 'date', name='uix_ticker_indicator_date'),)
 
 class UserPreferences(Base):
     __tablename__ = 'user_preferences'
     key = Column(String, primary_key=True)
     value = Column(String)
 
+class BacktestCache(Base):
+    """
+    Finished backtests keyed by a fingerprint of their configuration and input
+    data versions (see src/engine/result_cache.py). payload is a compressed
+    npz blob; least recently used entries are evicted past the size limit.
+    """
+    __tablename__ = 'backtest_cache'
+    key = Column(String, primary_key=True)
+    config = Column(String)  # JSON, for inspection only
+    payload = Column(LargeBinary, nullable=False)
+    nbytes = Column(Integer, nullable=False)
+    created = Column(DateTime, nullable=False)
+    last_used = Column(DateTime, nullable=False, index=True)
+
+class SavedBacktest(Base):
+    """
+    Named backtests kept up to date as new bars arrive (see
+    Backtester.extend_backtest). payload is a serialized BacktestState.
+    """
+    __tablename__ = 'saved_backtests'
+    name = Column(String, primary_key=True)
+    config = Column(String)  # JSON, for inspection only
+    payload = Column(LargeBinary, nullable=False)
+    updated = Column(DateTime, nullable=False)
+
+DEFAULT_BACKTEST_CACHE_BYTES = 64 * 1024 * 1024
+
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'adj_close', 'volume']
+
+# yfinance column name -> price_data column
+SOURCE_COLUMNS = {
+    'Open': 'open',
+    'High': 'high',
+    'Low': 'low',
+    'Close': 'close',
+    'Adj Close': 'adj_close',
+    'Volume': 'volume',
+}
+
+def normalize_price_frame(ticker, df):
+    """
+    Converts a yfinance-style frame into price_data columns in one vectorized step.
+    Returns a DataFrame indexed by datetime.date with PRICE_FIELDS columns.
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        # Newer yfinance returns (Price, Ticker) columns even for a single ticker
+        if ticker in df.columns.get_level_values(-1):
+            df = df.xs(ticker, axis=1, level=-1)
+        else:
+            df = df.droplevel(-1, axis=1)
+
+    out = pd.DataFrame(index=pd.DatetimeIndex(df.index).normalize())
+    for src, dst in SOURCE_COLUMNS.items():
+        if src in df.columns:
+            out[dst] = pd.to_numeric(df[src], errors='coerce').to_numpy()
+        else:
+            out[dst] = np.nan
+    out['adj_close'] = out['adj_close'].fillna(out['close'])
+    out['volume'] = out['volume'].fillna(0).astype('int64')
+    out = out[~out.index.duplicated(keep='last')]
+    out.index = out.index.date
+    return out
+
+def price_records(ticker, df):
+    """
+    Builds the list of row mappings for a bulk insert (NaN -> NULL).
+    """
+    frame = normalize_price_frame(ticker, df)
+    if frame.empty:
+        return []
+    cols = {'ticker': [ticker] * len(frame), 'date': list(frame.index)}
+    for f in PRICE_FIELDS:
+        values = frame[f].to_numpy()
+        if f == 'volume':
+            cols[f] = values.tolist()
+        else:
+            cols[f] = [None if v != v else v for v in values.tolist()]
+    keys = list(cols)
+    return [dict(zip(keys, row)) for row in zip(*cols.values())]
+
+def coverage_from_days(days):
+    """
+    Coverage row values from sorted day numbers (days since 1970-01-01).
+    """
+    days = np.asarray(days, dtype='int64')
+    spacing = np.diff(days)
+    return {
+        'first_date': np.datetime64(int(days[0]), 'D').astype(object),
+        'last_date': np.datetime64(int(days[-1]), 'D').astype(object),
+        'row_count': len(days),
+        'gap_count': int((spacing > GAP_DAYS).sum()),
+        'max_gap_days': int(spacing.max()) if len(spacing) else 0,
+    }
+
+def _day_numbers(dates):
+    return pd.to_datetime(pd.Index(dates)).to_numpy().astype('datetime64[D]').astype('int64')
+
+# Price backend: 'sqlite' (price_data table) or 'columnar' (memory-mapped column files).
+# Preferences, asset metadata and indicators always live in SQLite.
+PRICE_BACKEND = os.environ.get('PORTFOLIO_PRICE_BACKEND', 'sqlite')
+
+def default_columns_path(db_path):
+    return os.path.splitext(db_path)[0] + '_columns'
+
+# Concurrency mode: WAL journal so readers never block the writer (or each
+# other), tuned pragmas, a pool of read-only connections for queries and one
+# serialized writer per database file. PORTFOLIO_DB_CONCURRENT=0 falls back to
+# SQLite's default rollback journal on a single engine.
+CONCURRENT = os.environ.get('PORTFOLIO_DB_CONCURRENT', '1') != '0'
+
+WRITE_PRAGMAS = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',  # fsync at checkpoints only; safe with WAL
+    'PRAGMA busy_timeout=30000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',  # 64 MB
+]
+READ_PRAGMAS = [
+    'PRAGMA busy_timeout=30000',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',  # 256 MB
+    'PRAGMA query_only=1',
+]
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+def get_write_lock(db_path):
+    """
+    One lock per database file shared by every DataStore in the process, so
+    bulk writers queue up here instead of spinning on SQLITE_BUSY.
+    """
+    with _write_locks_guard:
+        return _write_locks.setdefault(os.path.abspath(db_path), threading.RLock())
+
+def _write_error(e):
+    return {'inserted': 0, 'skipped': 0, 'error': str(e)}
+
+def _pragma_listener(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return on_connect
+
 class DataStore:
-    def __init__(self, db_path='portfolio.db'):
+    def __init__(self, db_path='portfolio.db', cache_bytes=DEFAULT_CACHE_BYTES, backend=None, columns_path=None,
+                 concurrent=None, read_pool_size=8, backtest_cache_bytes=DEFAULT_BACKTEST_CACHE_BYTES):
         db_url = f'sqlite:///{db_path}'
-        self.engine = create_engine(db_url)
+        self.concurrent = CONCURRENT if concurrent is None else concurrent
+        if self.concurrent:
+            self.engine = create_engine(db_url, connect_args={'timeout': 30})
+            event.listen(self.engine, 'connect', _pragma_listener(WRITE_PRAGMAS))
+        else:
+            self.engine = create_engine(db_url)
         Base.metadata.create_all(self.engine)
+        # create_all skips indexes added to tables that already exist
+        for index in PriceData.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
+        # Coverage from before it was kept per backend: it is derived data, so
+        # recreate the table and let _ensure_coverage rebuild it
+        if 'backend' not in {c['name'] for c in inspect(self.engine).get_columns('price_coverage')}:
+            PriceCoverage.__table__.drop(self.engine)
+            PriceCoverage.__table__.create(self.engine)
+        if self.concurrent:
+            # Queries go through a pool of read-only connections; in WAL mode they
+            # read the last committed snapshot while the writer keeps going.
+            read_url = f'sqlite:///file:{quote(os.path.abspath(db_path))}?mode=ro&uri=true'
+            self.read_engine = create_engine(read_url, pool_size=read_pool_size, max_overflow=read_pool_size,
+                                             connect_args={'check_same_thread': False, 'timeout': 30})
+            event.listen(self.read_engine, 'connect', _pragma_listener(READ_PRAGMAS))
+        else:
+            self.read_engine = self.engine
+        self.write_lock = get_write_lock(db_path)
+        self.backtest_cache_bytes = backtest_cache_bytes
         self.Session = sessionmaker(bind=self.engine)
+        self.backend = backend or PRICE_BACKEND
+        if self.backend == 'columnar':
+            self.columns = ColumnarPriceStore(columns_path or default_columns_path(db_path))
+        elif self.backend == 'sqlite':
+            self.columns = None
+        else:
+            raise ValueError(f"Unknown price backend: {self.backend}")
+        # Price frames are cached per database across DataStore instances;
+        # cache_bytes=0 turns caching off.
+        self.cache = get_shared_cache((os.path.abspath(db_path), self.backend), cache_bytes) if cache_bytes else None
+        self._ensure_coverage()
         
     def get_session(self):
         return self.Session()
@@ -63,66 +290,403 @@ class DataStore:
         finally:
             session.close()
 
-    def store_prices(self, ticker, df):
+    def store_prices(self, ticker, df, batch_size=5000):
         """
         Expects a pandas DataFrame with datetime index and columns: Open, High, Low, Close, Adj Close, Volume
+        Writes with a set-based INSERT OR IGNORE per batch, keyed on uix_ticker_date,
+        so dates already in the DB are skipped instead of queried one by one.
+        Returns a dict with 'inserted' and 'skipped' row counts, plus 'error' (the
+        message) if the write failed and nothing was stored.
         """
-        session = self.Session()
-        try:
-            # Check existing dates to avoid constraint errors or excessive overwrites
-            # For simplicity in bulk/df, we can use merge or "ignore" logic, 
-            # but usually it's better to fetch only what we need. 
-            # Here we will attempt to add new records.
-            
-            # A more robust way is to query existing max date.
-            pass # Actually implemented in fetcher logic usually to filter, but here we insert.
-            
-            for index, row in df.iterrows():
-                # Check exist
-                # Optimization: For bulk, this is slow. Better to filter DF before loop or use bulk_insert_mappings
-                # We will trust the fetcher to give us *new* data mostly, or handle Upsert.
-                # SQLite INSERT OR IGNORE is easiest via raw sql or core, but via ORM:
-                
-                existing = session.query(PriceData).filter_by(ticker=ticker, date=index.date()).first()
-                if not existing:
-                    price = PriceData(
-                        ticker=ticker,
-                        date=index.date(),
-                        open=row.get('Open'),
-                        high=row.get('High'),
-                        low=row.get('Low'),
-                        close=row.get('Close'),
-                        adj_close=row.get('Adj Close', row.get('Close')),
-                        volume=int(float(row.get('Volume', 0)))
-                    )
-                    session.add(price)
-            session.commit()
-        except Exception as e:
-            session.rollback()
-            print(f"Error storing prices for {ticker}: {e}")
-        finally:
-            session.close()
+        return self.store_prices_many([(ticker, df)], batch_size=batch_size)[ticker]
+
+    def store_prices_many(self, items, commit_rows=50000, batch_size=5000):
+        """
+        Writes (ticker, df) pairs through the database's single writer, committing
+        once per ~commit_rows rows instead of once per ticker. Each ticker's
+        coverage row is updated in the transaction that inserts its prices.
+        Returns {ticker: {'inserted', 'skipped'}}; tickers whose write failed get
+        {'inserted': 0, 'skipped': 0, 'error': message} (a failed commit rolls
+        back every ticker in it).
+        """
+        with profiling.stage('store.write'):
+            results = self._store_prices_many(items, commit_rows, batch_size)
+        profiling.count('rows_written', sum(r['inserted'] for r in results.values()))
+        profiling.count('rows_skipped', sum(r['skipped'] for r in results.values()))
+        profiling.count('write_errors', sum('error' in r for r in results.values()))
+        return results
+
+    def _store_prices_many(self, items, commit_rows, batch_size):
+        results = {}
+        if self.columns is not None:
+            for ticker, df in items:
+                frame = normalize_price_frame(ticker, df)
+                try:
+                    # One writer at a time: the append and its coverage row land together
+                    with self.write_lock:
+                        stats = self.columns.store_prices(ticker, frame)
+                        if stats['inserted']:
+                            with self.engine.begin() as conn:
+                                self._write_coverage(conn, ticker, coverage_from_days(self.columns.dates(ticker)))
+                            if self.cache is not None:
+                                self.cache.set_version(ticker, self.columns.get_data_version(ticker))
+                except Exception as e:
+                    stats = _write_error(e)
+                results[ticker] = stats
+            return results
+
+        # Group tickers into transactions of about commit_rows rows
+        chunks = [[]]
+        rows = 0
+        for ticker, df in items:
+            records = price_records(ticker, df)
+            results[ticker] = {'inserted': 0, 'skipped': len(records)}
+            if not records:
+                continue
+            if rows and rows + len(records) > commit_rows:
+                chunks.append([])
+                rows = 0
+            chunks[-1].append((ticker, records))
+            rows += len(records)
+
+        stmt = sqlite_insert(PriceData).on_conflict_do_nothing(index_elements=['ticker', 'date'])
+        for chunk in chunks:
+            if not chunk:
+                continue
+            inserted = {}
+            try:
+                with self.write_lock, self.engine.begin() as conn:
+                    for ticker, records in chunk:
+                        inserted[ticker] = 0
+                        for i in range(0, len(records), batch_size):
+                            result = conn.execute(stmt, records[i:i + batch_size])
+                            inserted[ticker] += result.rowcount
+                        if inserted[ticker]:
+                            self._update_coverage(conn, ticker, sorted(r['date'] for r in records))
+            except Exception as e:
+                # The whole transaction rolled back: nothing in the chunk was stored
+                for ticker, _ in chunk:
+                    results[ticker] = _write_error(e)
+                continue
+            for ticker, records in chunk:
+                results[ticker] = {'inserted': inserted[ticker], 'skipped': len(records) - inserted[ticker]}
+                if inserted[ticker] and self.cache is not None:
+                    # Bump the data version so cached frames for this ticker go stale
+                    self.cache.set_version(ticker, self._query_version(ticker))
+        return results
+
+    def _update_coverage(self, conn, ticker, new_dates):
+        """
+        Brings the ticker's coverage row up to date after an insert, inside the
+        insert's transaction. Appends after the last stored date extend the row
+        from the new dates alone; anything else (first load, backfill) is
+        recomputed from the ticker's dates.
+        """
+        row = conn.execute(
+            select(PriceCoverage.first_date, PriceCoverage.last_date, PriceCoverage.row_count,
+                   PriceCoverage.gap_count, PriceCoverage.max_gap_days)
+            .where(PriceCoverage.backend == self.backend, PriceCoverage.ticker == ticker)
+        ).first()
+        if row is not None and new_dates[0] > row.last_date:
+            # Every date is new, so all of them were inserted
+            tail = coverage_from_days(_day_numbers([row.last_date] + list(new_dates)))
+            coverage = {
+                'first_date': row.first_date,
+                'last_date': tail['last_date'],
+                'row_count': row.row_count + len(new_dates),
+                'gap_count': row.gap_count + tail['gap_count'],
+                'max_gap_days': max(row.max_gap_days, tail['max_gap_days']),
+            }
+        else:
+            dates = conn.execute(
+                select(PriceData.date).where(PriceData.ticker == ticker).order_by(PriceData.date)
+            ).scalars().all()
+            coverage = coverage_from_days(_day_numbers(dates))
+        self._write_coverage(conn, ticker, coverage)
+
+    def _write_coverage(self, conn, ticker, coverage):
+        stmt = sqlite_insert(PriceCoverage).values(backend=self.backend, ticker=ticker, **coverage)
+        conn.execute(stmt.on_conflict_do_update(index_elements=['backend', 'ticker'], set_=coverage))
+
+    def _ensure_coverage(self):
+        """
+        Builds the coverage catalog once for databases created before it existed.
+        """
+        with self.engine.connect() as conn:
+            if conn.execute(select(PriceCoverage.ticker).where(PriceCoverage.backend == self.backend)
+                            .limit(1)).first() is not None:
+                return
+            if self.columns is None and conn.execute(select(PriceData.id).limit(1)).first() is None:
+                return
+        if self.columns is None or self.columns.tickers():
+            self.rebuild_coverage()
+
+    def rebuild_coverage(self):
+        """
+        Recomputes the whole coverage catalog from the stored prices
+        (one windowed query for SQLite). Only needed if prices were written
+        without going through store_prices.
+        """
+        with self.write_lock, self.engine.begin() as conn:
+            conn.execute(delete(PriceCoverage).where(PriceCoverage.backend == self.backend))
+            if self.columns is not None:
+                for ticker in self.columns.tickers():
+                    self._write_coverage(conn, ticker, coverage_from_days(self.columns.dates(ticker)))
+                return
+            conn.execute(text(f"""
+                INSERT INTO price_coverage (backend, ticker, first_date, last_date, row_count, gap_count, max_gap_days)
+                SELECT 'sqlite', ticker, MIN(date), MAX(date), COUNT(*),
+                       COALESCE(SUM(spacing > {GAP_DAYS}), 0), CAST(COALESCE(MAX(spacing), 0) AS INTEGER)
+                FROM (
+                    SELECT ticker, date,
+                           julianday(date) - julianday(LAG(date) OVER (PARTITION BY ticker ORDER BY date)) AS spacing
+                    FROM price_data
+                )
+                GROUP BY ticker
+            """))
+
+    def get_coverage(self, tickers=None):
+        """
+        Coverage catalog in one query: DataFrame indexed by ticker with
+        first_date, last_date, row_count, gap_count, max_gap_days.
+        Requested tickers without prices come back as rows of NaN.
+        """
+        query = select(PriceCoverage.ticker, PriceCoverage.first_date, PriceCoverage.last_date,
+                       PriceCoverage.row_count, PriceCoverage.gap_count, PriceCoverage.max_gap_days)
+        query = query.where(PriceCoverage.backend == self.backend)
+        if tickers is not None:
+            tickers = list(tickers)
+            query = query.where(PriceCoverage.ticker.in_(tickers))
+        with self.read_engine.connect() as conn:
+            rows = conn.execute(query.order_by(PriceCoverage.ticker)).all()
+        coverage = pd.DataFrame(rows, columns=['ticker', 'first_date', 'last_date', 'row_count',
+                                               'gap_count', 'max_gap_days']).set_index('ticker')
+        if tickers is not None:
+            coverage = coverage.reindex(tickers)
+        return coverage
+
+    def _query_version(self, ticker):
+        if self.columns is not None:
+            return self.columns.get_data_version(ticker)
+        with self.read_engine.connect() as conn:
+            row = conn.execute(
+                select(PriceCoverage.last_date, PriceCoverage.row_count)
+                .where(PriceCoverage.backend == self.backend, PriceCoverage.ticker == ticker)
+            ).first()
+        return (row[0], row[1]) if row is not None else None
+
+    def refresh_data_versions(self):
+        """
+        Reloads every ticker's data version (latest date, row count) in one query.
+        Writes made through this process bump versions automatically; call this
+        to pick up writes from another process such as the nightly update.
+        """
+        if self.cache is None:
+            return {}
+        if self.columns is not None:
+            self.cache.versions = self.columns.data_versions()
+            return self.cache.versions
+        # From the coverage catalog: one row per ticker instead of a scan of price_data
+        with self.read_engine.connect() as conn:
+            rows = conn.execute(select(PriceCoverage.ticker, PriceCoverage.last_date, PriceCoverage.row_count)
+                                .where(PriceCoverage.backend == self.backend)).all()
+        versions = {ticker: (latest, count) for ticker, latest, count in rows}
+        self.cache.versions = versions
+        return versions
+
+    def get_data_version(self, ticker):
+        """
+        Returns (latest_date, row_count) for a ticker, or None if it has no prices.
+        """
+        if self.cache is None:
+            return self._query_version(ticker)
+        if self.cache.versions is None:
+            self.refresh_data_versions()
+        return self.cache.get_version(ticker)
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else {}
 
     def get_latest_date(self, ticker):
-        session = self.Session()
-        try:
-            last = session.query(PriceData.date).filter_by(ticker=ticker).order_by(PriceData.date.desc()).first()
-            return last[0] if last else None
-        finally:
-            session.close()
+        if self.cache is not None:
+            version = self.get_data_version(ticker)
+            return version[0] if version else None
+        if self.columns is not None:
+            return self.columns.get_latest_date(ticker)
+        version = self._query_version(ticker)
+        return version[0] if version else None
 
     def load_prices(self, ticker):
-        import pandas as pd
-        session = self.Session()
+        with profiling.stage('store.load_prices'):
+            if self.columns is not None:
+                # Memory-mapped and read-only already, nothing to gain from caching
+                df = self.columns.load_prices(ticker)
+                profiling.count('rows_read', len(df))
+                return df
+            if self.cache is None:
+                return self._load_prices(ticker)
+            key = ('prices', ticker)
+            versions = (self.get_data_version(ticker),)
+            df = self.cache.get(key, versions)
+            if df is None:
+                profiling.count('cache_misses')
+                df = self._load_prices(ticker)
+                self.cache.put(key, versions, df)
+            else:
+                profiling.count('cache_hits')
+            # Hand out copies so callers can't mutate the cached frame
+            return df.copy()
+
+    def _load_prices(self, ticker):
+        query = select(PriceData).where(PriceData.ticker == ticker).order_by(PriceData.date.asc())
+        with self.read_engine.connect() as conn:
+            df = pd.read_sql(query, conn)
+        profiling.count('rows_read', len(df))
+        if not df.empty:
+            df['date'] = pd.to_datetime(df['date'])
+            df.set_index('date', inplace=True)
+        return df
+
+    def load_price_matrix(self, tickers, field='adj_close', start_date=None, end_date=None, dtype='float32'):
+        """
+        Returns a date x ticker DataFrame of a single price field in one query.
+        The date range and column choice are applied in SQL, so only the
+        requested rows and field are read. Tickers with no data come back as
+        all-NaN columns; dates missing for a ticker are NaN.
+        """
+        if field not in PRICE_FIELDS:
+            raise ValueError(f"Unknown price field: {field}")
+        tickers = list(tickers)
+        if not tickers:
+            return pd.DataFrame(dtype=dtype)
+        with profiling.stage('store.load_price_matrix'):
+            if self.cache is None:
+                return self._load_price_matrix(tickers, field, start_date, end_date, dtype)
+
+            start = pd.Timestamp(start_date).date() if start_date is not None else None
+            end = pd.Timestamp(end_date).date() if end_date is not None else None
+            key = ('matrix', tuple(tickers), field, start, end, str(dtype))
+            versions = tuple(self.get_data_version(t) for t in tickers)
+            matrix = self.cache.get(key, versions)
+            if matrix is None:
+                profiling.count('cache_misses')
+                matrix = self._load_price_matrix(tickers, field, start_date, end_date, dtype)
+                self.cache.put(key, versions, matrix)
+            else:
+                profiling.count('cache_hits')
+            return matrix.copy()
+
+    def _load_price_matrix(self, tickers, field, start_date, end_date, dtype):
+        if self.columns is not None:
+            matrix = self.columns.load_price_matrix(tickers, field, start_date, end_date, dtype)
+            profiling.count('rows_read', int(matrix.notna().to_numpy().sum()))
+            return matrix
+        column = getattr(PriceData, field)
+        query = select(PriceData.date, PriceData.ticker, column).where(PriceData.ticker.in_(tickers))
+        if start_date is not None:
+            query = query.where(PriceData.date >= pd.Timestamp(start_date).date())
+        if end_date is not None:
+            query = query.where(PriceData.date <= pd.Timestamp(end_date).date())
+        # No ORDER BY: rows come back in covering-index (ticker, date) order and
+        # the pivot below sorts the dates anyway
+
+        with self.read_engine.connect() as conn:
+            rows = conn.execute(query).all()
+        profiling.count('rows_read', len(rows))
+
+        if not rows:
+            matrix = pd.DataFrame(columns=tickers, dtype=dtype)
+            matrix.index = pd.DatetimeIndex([], name='date')
+            return matrix
+
+        dates, syms, values = zip(*rows)
+        long = pd.DataFrame({
+            'date': pd.to_datetime(pd.Index(dates)),
+            'ticker': syms,
+            'value': np.asarray(values, dtype='float64'),
+        })
+        matrix = long.pivot(index='date', columns='ticker', values='value')
+        matrix = matrix.reindex(columns=tickers).astype(dtype)
+        matrix.columns.name = None
+        return matrix
+
+    def store_indicators(self, ticker, frame, batch_size=5000):
+        """
+        Upserts a date x indicator DataFrame for a ticker (NaN values are skipped).
+        Returns the number of rows written.
+        """
+        long = frame.stack().dropna() if not frame.empty else pd.Series(dtype=float)
+        if long.empty:
+            return 0
+        records = [
+            {'ticker': ticker, 'indicator': name, 'date': pd.Timestamp(date).date(), 'value': float(value)}
+            for (date, name), value in long.items()
+        ]
+        stmt = sqlite_insert(IndicatorData)
+        stmt = stmt.on_conflict_do_update(index_elements=['ticker', 'indicator', 'date'],
+                                          set_={'value': stmt.excluded.value})
         try:
-            query = session.query(PriceData).filter_by(ticker=ticker).order_by(PriceData.date.asc())
-            df = pd.read_sql(query.statement, session.bind)
-            if not df.empty:
-                df['date'] = pd.to_datetime(df['date'])
-                df.set_index('date', inplace=True)
-            return df
-        finally:
-            session.close()
+            with self.write_lock, self.engine.begin() as conn:
+                for i in range(0, len(records), batch_size):
+                    conn.execute(stmt, records[i:i + batch_size])
+        except Exception as e:
+            print(f"Error storing indicators for {ticker}: {e}")
+            return 0
+        return len(records)
+
+    def delete_indicators(self, ticker):
+        with self.write_lock, self.engine.begin() as conn:
+            conn.execute(IndicatorData.__table__.delete().where(IndicatorData.ticker == ticker))
+
+    def get_indicator_latest_date(self, ticker):
+        with self.read_engine.connect() as conn:
+            return conn.execute(
+                select(func.max(IndicatorData.date)).where(IndicatorData.ticker == ticker)
+            ).scalar()
+
+    def get_latest_indicators(self, ticker, names=None):
+        """
+        Latest value of each indicator for a ticker: {indicator: (date, value)}.
+        One ORDER BY date DESC LIMIT 1 per indicator, answered from the
+        (ticker, indicator, date) unique index without scanning the history.
+        """
+        latest = {}
+        with self.read_engine.connect() as conn:
+            if names is None:
+                names = conn.execute(
+                    select(IndicatorData.indicator).where(IndicatorData.ticker == ticker).distinct()
+                ).scalars().all()
+            for name in names:
+                row = conn.execute(
+                    select(IndicatorData.date, IndicatorData.value)
+                    .where(IndicatorData.ticker == ticker, IndicatorData.indicator == name)
+                    .order_by(IndicatorData.date.desc()).limit(1)
+                ).first()
+                if row is not None:
+                    latest[name] = (row[0], row[1])
+        return latest
+
+    def load_indicators(self, ticker, names=None, start_date=None, end_date=None):
+        """
+        Stored indicator history as a date x indicator DataFrame.
+        """
+        query = select(IndicatorData.date, IndicatorData.indicator, IndicatorData.value).where(
+            IndicatorData.ticker == ticker)
+        if names is not None:
+            query = query.where(IndicatorData.indicator.in_(list(names)))
+        if start_date is not None:
+            query = query.where(IndicatorData.date >= pd.Timestamp(start_date).date())
+        if end_date is not None:
+            query = query.where(IndicatorData.date <= pd.Timestamp(end_date).date())
+        with self.read_engine.connect() as conn:
+            rows = conn.execute(query).all()
+        if not rows:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='date'))
+        long = pd.DataFrame(rows, columns=['date', 'indicator', 'value'])
+        long['date'] = pd.to_datetime(long['date'])
+        frame = long.pivot(index='date', columns='indicator', values='value').sort_index()
+        frame.columns.name = None
+        return frame
 
     def set_preference(self, key, value):
         session = self.Session()
@@ -148,6 +712,101 @@ class DataStore:
         finally:
             session.close()
 
+    def get_backtest_result(self, key):
+        """
+        Cached backtest payload for a fingerprint (bytes), or None. Marks the entry as used.
+        """
+        with self.read_engine.connect() as conn:
+            payload = conn.execute(select(BacktestCache.payload).where(BacktestCache.key == key)).scalar()
+        if payload is not None:
+            try:
+                with self.write_lock, self.engine.begin() as conn:
+                    conn.execute(update(BacktestCache).where(BacktestCache.key == key)
+                                 .values(last_used=datetime.datetime.now()))
+            except Exception as e:
+                print(f"Error touching backtest cache entry: {e}")
+        return payload
+
+    def put_backtest_result(self, key, payload, config=None):
+        """
+        Stores a backtest payload under its fingerprint, then evicts the least
+        recently used entries until the cache fits in backtest_cache_bytes.
+        Payloads larger than the whole budget are not stored.
+        """
+        if not self.backtest_cache_bytes or len(payload) > self.backtest_cache_bytes:
+            return False
+        now = datetime.datetime.now()
+        values = dict(key=key, config=config, payload=payload, nbytes=len(payload), created=now, last_used=now)
+        stmt = sqlite_insert(BacktestCache).values(**values)
+        stmt = stmt.on_conflict_do_update(index_elements=['key'],
+                                          set_={k: stmt.excluded[k] for k in values if k != 'key'})
+        try:
+            with self.write_lock, self.engine.begin() as conn:
+                conn.execute(stmt)
+                self._evict_backtest_results(conn)
+            return True
+        except Exception as e:
+            print(f"Error caching backtest result: {e}")
+            return False
+
+    def _evict_backtest_results(self, conn):
+        total = conn.execute(select(func.coalesce(func.sum(BacktestCache.nbytes), 0))).scalar()
+        if total <= self.backtest_cache_bytes:
+            return
+        rows = conn.execute(select(BacktestCache.key, BacktestCache.nbytes)
+                            .order_by(BacktestCache.last_used.asc())).all()
+        evict = []
+        for key, nbytes in rows:
+            if total <= self.backtest_cache_bytes:
+                break
+            evict.append(key)
+            total -= nbytes
+        conn.execute(delete(BacktestCache).where(BacktestCache.key.in_(evict)))
+
+    def backtest_cache_stats(self):
+        """
+        {'entries', 'bytes', 'max_bytes'} of the backtest result cache.
+        """
+        with self.read_engine.connect() as conn:
+            entries, nbytes = conn.execute(
+                select(func.count(), func.coalesce(func.sum(BacktestCache.nbytes), 0))).one()
+        return {'entries': entries, 'bytes': nbytes, 'max_bytes': self.backtest_cache_bytes}
+
+    def purge_backtest_cache(self):
+        """
+        Deletes every cached backtest result. Returns the number of entries removed.
+        """
+        with self.write_lock, self.engine.begin() as conn:
+            return conn.execute(delete(BacktestCache)).rowcount
+
+    def save_backtest_state(self, name, payload, config=None):
+        values = dict(name=name, config=config, payload=payload, updated=datetime.datetime.now())
+        stmt = sqlite_insert(SavedBacktest).values(**values)
+        stmt = stmt.on_conflict_do_update(index_elements=['name'],
+                                          set_={k: stmt.excluded[k] for k in values if k != 'name'})
+        with self.write_lock, self.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def load_backtest_state(self, name):
+        """
+        Payload of the backtest state saved under `name` (bytes), or None.
+        """
+        with self.read_engine.connect() as conn:
+            return conn.execute(select(SavedBacktest.payload).where(SavedBacktest.name == name)).scalar()
+
+    def list_backtest_states(self):
+        """
+        DataFrame of saved backtest states (name, config, updated).
+        """
+        with self.read_engine.connect() as conn:
+            rows = conn.execute(select(SavedBacktest.name, SavedBacktest.config, SavedBacktest.updated)
+                                .order_by(SavedBacktest.name)).all()
+        return pd.DataFrame(rows, columns=['name', 'config', 'updated'])
+
+    def delete_backtest_state(self, name):
+        with self.write_lock, self.engine.begin() as conn:
+            return conn.execute(delete(SavedBacktest).where(SavedBacktest.name == name)).rowcount > 0
+
     def get_all_asset_names(self):
         session = self.Session()
         try:
@@ -1,14 +1,38 @@
+import argparse
 from .store import DataStore
 from .fetcher import DataFetcher
 from ..engine import universe
+from ..engine.backtest import Backtester
+from ..risk.indicators import update_indicators
+from ..risk.signals import RiskManager
 
 def main():
+    parser = argparse.ArgumentParser(description="Fetch the latest prices for the asset universe")
+    parser.add_argument('--workers', type=int, default=4, help="Download threads (1 = sequential)")
+    parser.add_argument('--batch-size', type=int, default=20, help="Tickers per multi-ticker download")
+    parser.add_argument('--rate', type=float, default=2.0, help="Max provider calls per second")
+    args = parser.parse_args()
+
     print("Starting Daily Update...")
     store = DataStore()
     fetcher = DataFetcher(store)
     
     tickers = universe.get_all_tickers()
-    fetcher.update_universe(tickers)
+    fetcher.update_universe(tickers, workers=args.workers, batch_size=args.batch_size, rate=args.rate)
+    
+    # Extend the materialized indicator series with the new bars
+    written = update_indicators(store)
+    print(f"Indicators updated: {written}")
+
+    # Carry saved backtests forward over the new bars
+    backtester = Backtester(store, RiskManager(store))
+    for name in store.list_backtest_states()['name']:
+        try:
+            value, metrics, _ = backtester.extend_saved(name)
+            if value is not None:
+                print(f"Backtest {name}: {value.index[-1].date()}, value {value.iloc[-1]:,.2f}")
+        except Exception as e:
+            print(f"Error extending backtest {name}: {e}")
     print("Update Complete.")
 
 if __name__ == "__main__":
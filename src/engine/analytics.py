@@ -0,0 +1,162 @@
+import numpy as np
+import pandas as pd
+
+METRICS = ['Total Return', 'CAGR', 'Sharpe', 'Vol', 'Max Drawdown', 'Turnover', 'Cost Drag',
+           'Sortino', 'Calmar', 'Max Drawdown Duration', 'Turnover-adj Return']
+
+# Curves per chunk are picked so one chunk x time float64 buffer stays around this many elements (32MB)
+CHUNK_ELEMENTS = 2 ** 22
+
+def performance_metrics(curves, kind='values', index=None, initial_value=None, turnover=None, cost_drag=None,
+                        periods_per_year=252, turnover_cost_bps=10.0, chunk_size=None):
+    """
+    Metrics of many equity curves at once, one row per curve (columns: METRICS).
+
+    curves: time x curves array or DataFrame (columns are the curve labels, a
+            DatetimeIndex gives the dates). Curves share the time axis and have
+            no gaps; align and trim them first.
+    kind: 'values' (equity curves) or 'returns' (periodic returns, compounded
+          from 1 into a curve that starts one period earlier).
+    index: dates of the rows; for values, years then come from the calendar
+           span (days / 365.25), otherwise from the number of periods.
+    initial_value: scalar or per-curve starting capital for Total Return / CAGR
+                   (default: the first value of each curve).
+    turnover / cost_drag: per-curve totals over the whole curve (sum of the
+                          per-rebalance turnover / cost fractions), reported per year.
+    turnover_cost_bps: cost charged on each unit of annual turnover for
+                       'Turnover-adj Return' (CAGR minus that cost).
+
+    Sharpe, Sortino and Vol use periodic returns annualized by
+    periods_per_year, with a zero target for the downside deviation; Calmar is
+    CAGR / |Max Drawdown|; Max Drawdown Duration is the longest stretch (in
+    periods) spent below a previous peak.
+    Curves are processed chunk_size at a time (default: ~CHUNK_ELEMENTS values
+    per chunk), each as one curves x time block, so memory stays bounded for
+    any number of curves. For a single curve the shared metrics are the same,
+    to the bit, as the pandas formulas run_backtest used before.
+    """
+    labels = None
+    if isinstance(curves, pd.Series):
+        curves = curves.to_frame()
+    if isinstance(curves, pd.DataFrame):
+        labels = curves.columns
+        if index is None and isinstance(curves.index, pd.DatetimeIndex):
+            index = curves.index
+        curves = curves.to_numpy(dtype='float64')
+    curves = np.asarray(curves, dtype='float64')
+    if curves.ndim == 1:
+        curves = curves[:, None]
+    if kind not in ('values', 'returns'):
+        raise ValueError(f"Unknown kind {kind!r}, expected 'values' or 'returns'")
+    T, C = curves.shape
+    if index is not None and len(index) != T:
+        raise ValueError("index must have one date per row")
+
+    if index is not None and kind == 'values':
+        years = (index[-1] - index[0]).days / 365.25
+    else:
+        # A returns curve gains a leading row (the starting value), so T returns span T periods
+        years = (T - 1 if kind == 'values' else T) / periods_per_year
+
+    chunk_size = chunk_size or max(1, CHUNK_ELEMENTS // max(T, 1))
+    out = np.empty((C, len(METRICS)))
+    for a in range(0, C, chunk_size):
+        b = min(a + chunk_size, C)
+        # curves x time, C-contiguous: every reduction runs along contiguous rows
+        block = np.ascontiguousarray(curves[:, a:b].T)
+        if kind == 'returns':
+            block = np.concatenate([np.ones((b - a, 1)), np.cumprod(1 + block, axis=1)], axis=1)
+        start = block[:, 0] if initial_value is None else np.broadcast_to(
+            np.asarray(initial_value, dtype='float64'), (C,))[a:b]
+        out[a:b] = _chunk_metrics(block, start, years, periods_per_year)
+
+    frame = pd.DataFrame(out, columns=METRICS, index=labels)
+    per_year = years if years > 0 else 1.0
+    frame['Turnover'] = np.nan if turnover is None else np.asarray(turnover, dtype='float64') / per_year
+    frame['Cost Drag'] = np.nan if cost_drag is None else np.asarray(cost_drag, dtype='float64') / per_year
+    frame['Turnover-adj Return'] = frame['CAGR'] - frame['Turnover'] * turnover_cost_bps / 1e4
+    return frame
+
+def _chunk_metrics(values, initial_value, years, periods_per_year):
+    """
+    METRICS columns (turnover ones left NaN) of a curves x time block.
+    """
+    n_curves, T = values.shape
+    out = np.full((n_curves, len(METRICS)), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = values[:, 1:] / values[:, :-1] - 1
+        n = r.shape[1]
+        # Same operation order as pandas' mean / std(ddof=1), so results match them exactly
+        mean = r.sum(axis=1) / n
+        std = np.sqrt(((mean[:, None] - r) ** 2).sum(axis=1) / (n - 1)) if n > 1 else np.full(n_curves, np.nan)
+        downside = np.sqrt((np.minimum(r, 0.0) ** 2).sum(axis=1) / n)
+
+        growth = values[:, -1] / initial_value
+        total = growth - 1
+        if years > 0:
+            # libm pow per curve: numpy's SIMD power may differ in the last bit
+            cagr = np.array([g ** (1 / years) for g in growth.tolist()]) - 1
+        else:
+            cagr = total
+
+        peak = np.maximum.accumulate(values, axis=1)
+        max_dd = (values / peak - 1).min(axis=1)
+        # Longest run below the running peak: periods since the last new high
+        steps = np.arange(T)
+        last_high = np.maximum.accumulate(np.where(values < peak, 0, steps), axis=1)
+        duration = (steps - last_high).max(axis=1)
+
+        out[:, METRICS.index('Total Return')] = total
+        out[:, METRICS.index('CAGR')] = cagr
+        out[:, METRICS.index('Sharpe')] = (mean / std) * (periods_per_year ** 0.5)
+        out[:, METRICS.index('Vol')] = std * (periods_per_year ** 0.5)
+        out[:, METRICS.index('Max Drawdown')] = max_dd
+        out[:, METRICS.index('Sortino')] = np.where(downside > 0, mean / downside, np.nan) * (periods_per_year ** 0.5)
+        out[:, METRICS.index('Calmar')] = np.where(max_dd < 0, cagr / np.abs(max_dd), np.nan)
+        out[:, METRICS.index('Max Drawdown Duration')] = duration
+    return out
+
+def rolling_sharpe(curves, window=126, kind='values', periods_per_year=252, chunk_size=None):
+    """
+    Annualized Sharpe ratio over a trailing `window` of periodic returns, for
+    every date of every curve (time x curves, NaN until a full window exists).
+    Takes curves like performance_metrics and returns the same shape (a
+    DataFrame for DataFrame input); running sums keep it O(T) per curve.
+    """
+    labels = index = None
+    if isinstance(curves, pd.Series):
+        curves = curves.to_frame()
+    if isinstance(curves, pd.DataFrame):
+        labels, index = curves.columns, curves.index
+        curves = curves.to_numpy(dtype='float64')
+    curves = np.asarray(curves, dtype='float64')
+    if curves.ndim == 1:
+        curves = curves[:, None]
+    T, C = curves.shape
+    chunk_size = chunk_size or max(1, CHUNK_ELEMENTS // max(T, 1))
+    out = np.full((T, C), np.nan)
+    for a in range(0, C, chunk_size):
+        b = min(a + chunk_size, C)
+        block = np.ascontiguousarray(curves[:, a:b].T)
+        if kind == 'values':
+            r = np.concatenate([np.full((b - a, 1), np.nan), block[:, 1:] / block[:, :-1] - 1], axis=1)
+        else:
+            r = block
+        # Running sums over the returns (the leading NaN of a values curve excluded)
+        valid = ~np.isnan(r)
+        s1 = np.cumsum(np.where(valid, r, 0.0), axis=1)
+        s2 = np.cumsum(np.where(valid, r * r, 0.0), axis=1)
+        cnt = np.cumsum(valid, axis=1)
+        pad = np.zeros((b - a, 1))
+        s1, s2, cnt = (np.concatenate([pad, s], axis=1) for s in (s1, s2, cnt))
+        w1 = s1[:, window:] - s1[:, :-window]
+        w2 = s2[:, window:] - s2[:, :-window]
+        full = (cnt[:, window:] - cnt[:, :-window]) == window
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = w1 / window
+            var = np.maximum(w2 - window * mean ** 2, 0.0) / (window - 1)
+            sharpe = np.where(full, mean / np.sqrt(var) * (periods_per_year ** 0.5), np.nan)
+        out[window - 1:, a:b] = sharpe.T
+    if labels is not None:
+        return pd.DataFrame(out, index=index, columns=labels)
+    return out
@@ -1,141 +1,571 @@
+import json
+from collections import namedtuple
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from .optimization import optimize_portfolio
+from .moments import RollingMoments
+from .covariance import ESTIMATORS, estimate_moments
+from .simulator import simulate_portfolio
+from .analytics import performance_metrics
+from .profiling import RunStats
+from . import profiling
+from .result_cache import fingerprint, frame_digest, pack_result, unpack_result
+from .incremental import BacktestState
 from ..risk.signals import RiskManager
 
+# Placeholder for a rebalance window whose covariance estimate failed (see rebalance_windows)
+WindowError = namedtuple('WindowError', ['message'])
+
+def optimize_window(moments, strategy, tickers, initial_weights=None, solver='auto'):
+    """
+    Target weights for one rebalance date from its lookback-window moments.
+    Returns (weights, error, solver_info); moments=None (short history), a
+    WindowError (failed estimate) or a solver failure falls back to equal weight.
+    """
+    if moments is None:
+        # Default Equal Weight
+        return pd.Series(1.0/len(tickers), index=tickers), None, None
+    if isinstance(moments, WindowError):
+        return pd.Series(1.0/len(tickers), index=tickers), moments.message, None
+    try:
+        w, info = optimize_portfolio(method=strategy, moments=moments,
+                                     initial_weights=initial_weights, return_info=True, solver=solver)
+        return w, None, info
+    except Exception as e:
+        return pd.Series(1.0/len(tickers), index=tickers), str(e), None
+
+def optimize_windows(windows, strategy, tickers, solver='auto'):
+    """
+    Solves consecutive rebalance windows in order, warm-starting each solve
+    from the previous date's weights. Module-level so process pools can pickle it.
+    """
+    solved = []
+    previous = None
+    for moments in windows:
+        w, error, info = optimize_window(moments, strategy, tickers, previous, solver)
+        if error is None and info is not None:
+            previous = w
+        solved.append((w, error, info))
+    return solved
+
+def factors_config(factors):
+    """
+    The factors argument as it goes into a result cache config: a count, a
+    ticker list, or the digest of a factor returns frame (see frame_digest).
+    """
+    if isinstance(factors, (list, tuple)):
+        return list(factors)
+    if isinstance(factors, pd.DataFrame):
+        return {'frame': frame_digest(factors)}
+    return factors
+
 class Backtester:
     def __init__(self, store, risk_manager: RiskManager = None):
         self.store = store
         self.risk_manager = risk_manager
+        self.solver_stats = []
+        self.simulation = None
+        self.risk_adjustments = []
+        self.stats = None
+
+    def solver_stats_frame(self):
+        """
+        Solver stats of the last run, one row per optimized rebalance date.
+        """
+        return pd.DataFrame(self.solver_stats).set_index('date') if self.solver_stats else pd.DataFrame()
         
-    def run_backtest(self, tickers, start_date, end_date, initial_capital=10000, rebalance_freq='M', strategy='max_sharpe'):
+    def load_prices(self, tickers, start_date, end_date, prices=None):
+        """
+        adj_close panel for the backtest, restricted to tickers with data and
+        to dates where all of them trade. `prices` is an already loaded
+        date x ticker panel (e.g. shared by a parameter sweep) to slice instead
+        of querying the store.
+        """
+        if prices is None:
+            # Load Data (one query, only adj_close inside the backtest window)
+            prices = self.store.load_price_matrix(tickers, 'adj_close', start_date, end_date)
+        return select_prices(prices, tickers, start_date, end_date)
+
+    def run_backtest(self, tickers, start_date, end_date, initial_capital=10000, rebalance_freq='M', strategy='max_sharpe',
+                     workers=1, executor='process', solver='auto', lookback_years=1, prices=None,
+                     cost_bps=0.0, fixed_cost=0.0, return_stats=False, use_cache=True, estimator='sample',
+                     factors=None):
         """
         Simulate portfolio performance.
         rebalance_freq: 'M' (Month End), 'Q' (Quarter End), 'A' (Year End), or None (Buy & Hold)
+        workers: number of parallel optimizations across rebalance dates (1 = sequential).
+        executor: 'process' or 'thread' pool for workers > 1. Results are deterministic for a
+                  given worker count; warm starts make them differ from a sequential run only
+                  within solver tolerance.
+        solver: 'auto', 'qp' or 'slsqp', passed to optimize_portfolio.
+        lookback_years: length of the optimization window at each rebalance date.
+        estimator: covariance estimator of each window, 'sample', 'ledoit_wolf' or 'factor'
+                   (see engine.covariance); factors: number of statistical factors, or a
+                   list of tickers (e.g. ['VOO', 'BND']) whose returns are the factors.
+        prices: optional preloaded adj_close panel (see load_prices).
+        cost_bps / fixed_cost: transaction costs at each rebalance (bps of traded notional / fee per asset traded).
+        Holdings drift between rebalance dates; realized weights, cash, turnover and costs
+        of the last run are kept in self.simulation (a SimulationResult).
+        With a risk_manager, weights are adjusted at each rebalance from its point-in-time
+        regime series; the adjusted dates are listed in self.risk_adjustments.
+        Per-solve status, iterations and timings are kept in self.solver_stats (see solver_stats_frame).
+        Stage timings and counters (solver calls and iterations, rows read, cache hits)
+        are kept in self.stats (a RunStats, also written to PORTFOLIO_STATS_LOG if set);
+        return_stats=True appends it to the returned tuple.
+        use_cache: look the run up in the store's backtest result cache first and store it
+                   there afterwards. The key covers every input above plus the data
+                   version of each ticker read (see engine.result_cache), so new prices
+                   invalidate it. Runs on a preloaded `prices` panel are never cached.
         """
-        # Load Data
-        price_map = {}
-        for t in tickers:
-            df = self.store.load_prices(t)
-            if not df.empty:
-                # Truncate to dates
-                df = df[(df.index >= pd.Timestamp(start_date)) & (df.index <= pd.Timestamp(end_date))]
-                price_map[t] = df['adj_close']
-        
-        # Combine into one DF
-        # Drop tickers with no data
-        valid_tickers = [t for t in tickers if t in price_map]
-        prices = pd.DataFrame({t: price_map[t] for t in valid_tickers}).dropna()
+        self.stats = RunStats('backtest', tickers=list(tickers), strategy=strategy, start_date=start_date,
+                              end_date=end_date, rebalance_freq=rebalance_freq, lookback_years=lookback_years,
+                              solver=solver, workers=workers)
+        with profiling.collect(self.stats), self.stats.stage('total'):
+            key = None
+            if use_cache and prices is None:
+                with profiling.stage('result_cache'):
+                    config = {
+                        'tickers': list(tickers),
+                        'start_date': pd.Timestamp(start_date).isoformat(),
+                        'end_date': pd.Timestamp(end_date).isoformat(),
+                        'initial_capital': float(initial_capital),
+                        'rebalance_freq': rebalance_freq,
+                        'strategy': strategy,
+                        # Not the executor: results only depend on the worker count
+                        'workers': int(workers or 1),
+                        'solver': solver,
+                        'lookback_years': lookback_years,
+                        'cost_bps': float(cost_bps),
+                        'fixed_cost': float(fixed_cost),
+                        'risk_manager': type(self.risk_manager).__name__ if self.risk_manager else None,
+                        'estimator': estimator,
+                        'factors': factors_config(factors),
+                    }
+                    key = self.cache_key(config)
+                    result = self._cached_result(key)
+                if result is not None:
+                    self.stats.emit()
+                    return result + (self.stats,) if return_stats else result
+            result = self._run_backtest(tickers, start_date, end_date, initial_capital, rebalance_freq, strategy,
+                                        workers, executor, solver, lookback_years, prices, cost_bps, fixed_cost,
+                                        estimator, factors)
+            if key is not None and result[0] is not None:
+                with profiling.stage('result_cache'):
+                    payload = pack_result(*result, self.simulation, self.risk_adjustments, self.solver_stats)
+                    self.store.put_backtest_result(key, payload, json.dumps(config))
+        self.stats.emit()
+        return result + (self.stats,) if return_stats else result
+
+    def cache_key(self, config):
+        """
+        Result cache fingerprint of a run config: the config plus the data version
+        of every ticker it reads (the regime inputs too with a risk manager).
+        """
+        read = list(config['tickers']) + (['^VIX', 'VOO'] if config['risk_manager'] else [])
+        if isinstance(config.get('factors'), list):
+            read += config['factors']
+        return fingerprint(config, {t: self.store.get_data_version(t) for t in read})
+
+    def _cached_result(self, key):
+        """
+        (curve, metrics, target_weights) of a cached run, restoring the run's
+        simulation, risk adjustments and solver stats; None on a miss.
+        """
+        payload = self.store.get_backtest_result(key)
+        if payload is None:
+            profiling.count('result_cache_misses')
+            return None
+        try:
+            curve, metrics, weights, self.simulation, self.risk_adjustments, self.solver_stats = unpack_result(payload)
+        except Exception as e:
+            print(f"Error reading cached backtest result: {e}")
+            return None
+        profiling.count('result_cache_hits')
+        return curve, metrics, weights
+
+    def _run_backtest(self, tickers, start_date, end_date, initial_capital, rebalance_freq, strategy,
+                      workers, executor, solver, lookback_years, prices, cost_bps, fixed_cost,
+                      estimator='sample', factors=None):
+        with profiling.stage('load_prices'):
+            prices = self.load_prices(tickers, start_date, end_date, prices)
+            if isinstance(factors, (list, tuple)):
+                # Factor-mimicking tickers: their daily returns are the factor returns
+                factors = self.store.load_price_matrix(list(factors), 'adj_close', start_date,
+                                                       end_date).pct_change()
         
         if prices.empty:
             return None, "No sufficient data for backtest", None
-        
-        # Rebalance Dates
-        if rebalance_freq:
-            # Handle deprecation if needed but Pandas 2.2+ suggests 'ME' for Month End
-            freq = 'ME' if rebalance_freq == 'M' else rebalance_freq
-            rebalance_dates = prices.resample(freq).last().index
-        else:
-            rebalance_dates = [prices.index[0]]
-            
-        # Simulation
-        portfolio_value = []
-        current_holdings = {t: 0 for t in valid_tickers} # Units held
-        cash = initial_capital
-        
-        current_weights = None
-        
-        # We need to iterate day by day to capture daily value, but valid weights change only on rebalance dates.
-        # Efficient approach: Calculate daily returns of the *current allocation*.
-        
-        # Actually, simpler loop: iterate rebalance periods.
-        # But we want daily equity curve.
-        
-        # Let's iterate days for accurate tracking
-        # To speed up, we can compute weights at rebalance dates and then forward fill?
-        # No, because price changes shift weights.
-        
-        # Let's use a "Vectorized with Rebalance" approach:
-        # Create a defined Series of target weights per day (ffilled)
-        
-        target_weights = pd.DataFrame(index=prices.index, columns=valid_tickers, dtype=float)
+        if isinstance(factors, pd.DataFrame):
+            missing = [str(t) for t in factors.columns if factors[t].isna().all()]
+            if missing:
+                return None, f"No price data for factors: {', '.join(missing)}", None
+        self.stats.context.update(assets=prices.shape[1], days=prices.shape[0])
         
         print("Calculating target weights...")
-        for date in rebalance_dates:
-            # Avoid lookahead: ensure date is in prices index or take closest previous
-            if date not in prices.index:
-                # Find closest prev date
-                loc = prices.index.get_indexer([date], method='pad')[0]
-                if loc == -1: continue
-                calc_date = prices.index[loc]
-            else:
-                calc_date = date
-            
-            # Use data UP TO calc_date (exclusive of today if we want strict, but inclusive is standard for "close")
-            # For optimization we should use a lookback window, e.g. 1 year.
-            lookback_start = calc_date - pd.DateOffset(years=1)
-            history = prices[(prices.index >= lookback_start) & (prices.index <= calc_date)]
+        with profiling.stage('windows'):
+            calc_dates, windows = rebalance_windows(prices, rebalance_freq, lookback_years, estimator, factors)
+        with profiling.stage('optimize'):
+            solved = solve_windows(windows, strategy, list(prices.columns), solver, workers, executor)
+        
+        with profiling.stage('risk_overlay'):
+            # Regime for every day up to end_date, computed once; each rebalance
+            # reads the row at its own date, so there is no lookahead.
+            regime = self.risk_manager.get_regime_series(end_date=end_date) if self.risk_manager else None
+            self.risk_adjustments = []
             
-            if len(history) < 60: # Need some data
-                # Default Equal Weight
-                w = pd.Series(1.0/len(valid_tickers), index=valid_tickers)
-            else:
-                # Run Optimization
+            self.solver_stats = []
+            weights = []
+            for calc_date, (w, error, info) in zip(calc_dates, solved):
+                if error:
+                    print(f"Optimization failed on {calc_date}: {error}, using EW")
+                    profiling.count('optimization_failures')
+                if info:
+                    self.solver_stats.append(dict(info, date=calc_date))
+                
                 # Check for Risk Signals at this rebalance point
                 # (In a real system, we might check daily, but for this backtest we check at rebalance)
-                
-                try:
-                    w = optimize_portfolio(history, method=strategy)
-                    
-                    if self.risk_manager:
-                        # Fake a "historical" signal check?
-                        # This is hard because signals need data at that time. 
-                        # We can try to reuse risk manager logic if we implemented "historical lookup" support.
-                        # For now, let's skip dynamic risk adjustment in backtest unless easy.
-                        pass
-                        
-                except Exception as e:
-                    print(f"Optimization failed on {calc_date}: {e}, using EW")
-                    w = pd.Series(1.0/len(valid_tickers), index=valid_tickers)
-            
-            # Assign weights to the rebalance date row in target_weights
-            # We assign to the *next* day? Or this day? 
-            # Usually we calculate on Close, trade on Next Open. 
-            # For simplicity: Trade on Close (Theoretical).
-            target_weights.loc[calc_date] = w
-            
-        # Forward fill weights
-        target_weights = target_weights.ffill()
-        pd.set_option('future.no_silent_downcasting', True)
-        target_weights = target_weights.infer_objects(copy=False)
-        target_weights = target_weights.fillna(0) # For beginning if any
-        
-        # Now calculate strategy returns
-        # Strategy Return = Sum(Weight_i * Asset_Return_i)
-        asset_returns = prices.pct_change().dropna()
-        
-        # Shift weights by 1 day because weights determined at T Close apply to T+1 Return
-        aligned_weights = target_weights.shift(1).dropna()
-        aligned_returns = asset_returns.loc[aligned_weights.index] # Align dates
-        
-        portfolio_returns = (aligned_weights * aligned_returns).sum(axis=1)
-        
-        cumulative_return = (1 + portfolio_returns).cumprod()
-        portfolio_value = cumulative_return * initial_capital
-        
-        # Calculate CAGR
-        days = (portfolio_value.index[-1] - portfolio_value.index[0]).days
-        years = days / 365.25
-        total_ret = (portfolio_value.iloc[-1] / initial_capital) - 1
-        cagr = ((portfolio_value.iloc[-1] / initial_capital) ** (1/years)) - 1 if years > 0 else total_ret
-
-        metrics = {
-            'Total Return': total_ret,
-            'CAGR': cagr,
-            'Sharpe': (portfolio_returns.mean() / portfolio_returns.std()) * (252**0.5),
-            'Vol': portfolio_returns.std() * (252**0.5),
-            'Max Drawdown': (portfolio_value / portfolio_value.cummax() - 1).min()
-        }
+                if regime is not None:
+                    signals = self.risk_manager.signals_at(regime, calc_date)
+                    if not signals['risk_on']:
+                        # adjust_weights works in place; keep the optimizer's weights intact
+                        w = self.risk_manager.adjust_weights(w.copy(), signals)
+                        self.risk_adjustments.append({'date': calc_date, 'warnings': signals['warnings']})
+                weights.append(w)
+        profiling.count('rebalances', len(calc_dates))
+        profiling.count('risk_adjustments', len(self.risk_adjustments))
         
+        with profiling.stage('simulate'):
+            portfolio_value, metrics, target_weights, self.simulation = simulate(
+                prices, calc_dates, weights, initial_capital, cost_bps, fixed_cost)
+        return portfolio_value, metrics, target_weights
+
+    def start_backtest(self, tickers, start_date, end_date=None, initial_capital=10000, rebalance_freq='M',
+                       strategy='max_sharpe', solver='auto', lookback_years=1, cost_bps=0.0, fixed_cost=0.0):
+        """
+        Runs a backtest that can be carried forward as new bars arrive (see extend_backtest).
+        Returns (state, portfolio_value, metrics, target_weights); the outputs are
+        those of a sequential run_backtest with the same inputs.
+        """
+        state = BacktestState({
+            'tickers': list(tickers),
+            'start_date': pd.Timestamp(start_date).isoformat(),
+            'initial_capital': float(initial_capital),
+            'rebalance_freq': rebalance_freq,
+            'strategy': strategy,
+            'solver': solver,
+            'lookback_years': lookback_years,
+            'cost_bps': float(cost_bps),
+            'fixed_cost': float(fixed_cost),
+            'risk_overlay': self.risk_manager is not None,
+        })
+        return (state,) + self.extend_backtest(state, end_date)
+
+    def extend_backtest(self, state, end_date=None):
+        """
+        Carries a BacktestState forward over the bars stored after its last date,
+        up to end_date (latest if None), updating it in place.
+        Only the new rows are read and simulated, and the optimizer only runs when a
+        rebalance date is crossed (reading that date's lookback window), so a daily
+        refresh is a couple of small queries plus an O(N) step.
+        Returns (portfolio_value, metrics, target_weights), identical to a sequential
+        run_backtest from the state's start_date to end_date; target_weights only covers
+        the rows simulated by this call (the previous last date onwards).
+        Assumes stored prices before the state's last date don't change (append-only
+        updates, as update_indicators does); start a new backtest after a backfill.
+        """
+        self.stats = RunStats('extend_backtest', tickers=state.config['tickers'],
+                              strategy=state.config['strategy'], last_date=state.last_date, end_date=end_date)
+        with profiling.collect(self.stats), self.stats.stage('total'):
+            result = self._extend_backtest(state, end_date)
+        self.stats.emit()
+        return result
+
+    def _extend_backtest(self, state, end_date):
+        config = state.config
+        last = state.last_date
+        with profiling.stage('load_prices'):
+            if last is None:
+                seg = self.load_prices(config['tickers'], config['start_date'], end_date)
+                if seg.empty:
+                    return None, "No sufficient data for backtest", None
+                state.tickers = list(seg.columns)
+                state.shares = np.zeros(len(state.tickers))
+                state.target = np.zeros(len(state.tickers))
+            else:
+                seg = self._load_rows(state.tickers, last, end_date)
+                # A ticker without data so far that now has some would join a full run
+                missing = [t for t in config['tickers'] if t not in state.tickers]
+                if missing and self.store.load_price_matrix(missing, 'adj_close', config['start_date'],
+                                                            end_date).notna().any().any():
+                    seg = None
+        if seg is None or (last is not None and (seg.empty or seg.index[0] != last)):
+            print("Backtest state no longer matches the stored prices; rerunning from the start")
+            profiling.count('state_rebuilds')
+            state.__init__(config)
+            return self._extend_backtest(state, end_date)
+
+        # Rows before this segment (the old last date is the segment's first row)
+        n_old = len(state.value) - 1 if last is not None else 0
+        index = seg.index if last is None else state.value.index[:-1].append(seg.index)
+        # Buy & hold only rebalances on the very first date
+        calc_dates = rebalance_dates(seg.index, config['rebalance_freq']) \
+            if config['rebalance_freq'] or last is None else []
+        end = seg.index[-1]
+        # A full run skips a rebalance on its last date unless it is the only one;
+        # it stays pending (unsaved) until a later bar arrives
+        committed = [d for d in calc_dates if d != end]
+        solve = committed
+        if len(committed) < len(calc_dates) and state.calc_count + len(calc_dates) == 1:
+            solve = calc_dates
+        self.stats.context.update(assets=len(state.tickers), days=len(seg), rebalances=len(solve))
+
+        self.solver_stats = []
+        self.risk_adjustments = []
+        weights = []
+        if solve:
+            with profiling.stage('windows'):
+                bounds = [window_bounds(index, d, config['lookback_years']) for d in solve]
+                rolling = None
+                first = next((b for b in bounds if b), None)
+                if first:
+                    # Price rows from the start of the running window sums, so they slide on
+                    # from where the last solve left them
+                    base = state.rolling[0] if state.rolling else first[0]
+                    panel = seg.iloc[base - n_old:] if base >= n_old else \
+                        pd.concat([self._load_rows(state.tickers, index[base], last).iloc[:-1], seg])
+                    if len(panel) != len(index) - base:
+                        print("Backtest state no longer matches the stored prices; rerunning from the start")
+                        profiling.count('state_rebuilds')
+                        state.__init__(config)
+                        return self._extend_backtest(state, end_date)
+                    rolling = RollingMoments(panel.pct_change().iloc[1:])
+                    if state.rolling:
+                        lo, hi, s1, s2, removed = state.rolling
+                        rolling.lo, rolling.hi, rolling.s1, rolling.s2, rolling.removed = \
+                            lo - base, hi - base, s1.copy(), s2.copy(), removed
+
+            regime = None
+            if config['risk_overlay'] and self.risk_manager:
+                with profiling.stage('risk_overlay'):
+                    regime = self.risk_manager.get_regime_series(end_date=end)
+            previous = state.previous
+            with profiling.stage('optimize'):
+                for calc_date, b in zip(solve, bounds):
+                    moments = rolling.window(b[0] - base, b[1] - 1 - base) if b else None
+                    w, error, info = optimize_window(moments, config['strategy'], state.tickers, previous,
+                                                     config['solver'])
+                    if error is None and info is not None:
+                        previous = w
+                    if error:
+                        print(f"Optimization failed on {calc_date}: {error}, using EW")
+                        profiling.count('optimization_failures')
+                    if info:
+                        self.solver_stats.append(dict(info, date=calc_date))
+                    if regime is not None:
+                        signals = self.risk_manager.signals_at(regime, calc_date)
+                        if not signals['risk_on']:
+                            w = self.risk_manager.adjust_weights(w.copy(), signals)
+                            self.risk_adjustments.append({'date': calc_date, 'warnings': signals['warnings']})
+                    weights.append(w)
+            if solve is committed:
+                state.previous = previous
+                if rolling is not None:
+                    state.rolling = (rolling.lo + base, rolling.hi + base, rolling.s1, rolling.s2, rolling.removed)
+        profiling.count('rebalances', len(solve))
+        profiling.count('risk_adjustments', len(self.risk_adjustments))
+
+        with profiling.stage('simulate'):
+            targets = np.array([np.asarray(w, dtype=float) for w in weights]).reshape(len(weights), len(state.tickers))
+            k = len(committed)
+            sim, shares, cash = simulate_portfolio(seg, committed, targets[:k], state.cash, config['cost_bps'],
+                                                   config['fixed_cost'], initial_shares=state.shares,
+                                                   return_state=True)
+            # The lone rebalance on the last date of a one-rebalance run is applied to the output only
+            self.simulation = sim if solve is committed else simulate_portfolio(
+                seg, solve, targets, state.cash, config['cost_bps'], config['fixed_cost'],
+                initial_shares=state.shares)
+
+            rows = seg.index.get_indexer(solve)
+            segment = np.searchsorted(rows, np.arange(len(seg)), side='right')
+            target_weights = pd.DataFrame(np.vstack([state.target, targets])[segment],
+                                          index=seg.index, columns=state.tickers)
+
+            head = state.value.iloc[:-1] if last is not None else None
+            portfolio_value = pd.concat([head, self.simulation.value]) if head is not None else self.simulation.value
+            turnover = pd.concat([state.turnover, self.simulation.turnover]) if len(state.turnover) \
+                else self.simulation.turnover
+            costs = pd.concat([state.costs, self.simulation.costs]) if len(state.costs) else self.simulation.costs
+            metrics = backtest_metrics(portfolio_value, turnover, costs, config['initial_capital'])
+
+            state.value = pd.concat([head, sim.value]) if head is not None else sim.value
+            if k:
+                state.turnover = pd.concat([state.turnover, sim.turnover]) if len(state.turnover) else sim.turnover
+                state.costs = pd.concat([state.costs, sim.costs]) if len(state.costs) else sim.costs
+                state.target = targets[k - 1]
+            state.shares, state.cash = shares, cash
+            state.calc_count += k
         return portfolio_value, metrics, target_weights
 
+    def _load_rows(self, tickers, start_date, end_date):
+        """
+        adj_close rows of a state's tickers inside [start_date, end_date], keeping
+        only dates where all of them trade (as load_prices does).
+        """
+        return self.store.load_price_matrix(tickers, 'adj_close', start_date, end_date) \
+            .reindex(columns=list(tickers)).dropna()
+
+    def save_state(self, name, state):
+        self.store.save_backtest_state(name, state.to_bytes(), json.dumps(state.config))
+
+    def load_state(self, name):
+        payload = self.store.load_backtest_state(name)
+        return BacktestState.from_bytes(payload) if payload is not None else None
+
+    def extend_saved(self, name, end_date=None):
+        """
+        Extends the backtest state saved under `name` to end_date and saves it back.
+        Returns extend_backtest's outputs, or None if there is no such state.
+        """
+        state = self.load_state(name)
+        if state is None:
+            return None
+        result = self.extend_backtest(state, end_date)
+        if result[0] is not None:
+            self.save_state(name, state)
+        return result
+
+def select_prices(prices, tickers, start_date=None, end_date=None):
+    """
+    Columns of a price panel for `tickers` inside [start_date, end_date],
+    dropping tickers with no data and dates where any ticker is missing.
+    """
+    prices = prices.reindex(columns=list(tickers))
+    if start_date is not None:
+        prices = prices[prices.index >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        prices = prices[prices.index <= pd.Timestamp(end_date)]
+    
+    # Drop tickers with no data
+    valid_tickers = [t for t in prices.columns if prices[t].notna().any()]
+    return prices[valid_tickers].dropna()
+
+def rebalance_dates(index, rebalance_freq='M'):
+    """
+    Rebalance (calc) dates of a date index: the last date at or before the end
+    of each rebalance period, or just the first date when rebalance_freq is None.
+    """
+    if not rebalance_freq:
+        return [index[0]]
+    # Handle deprecation if needed but Pandas 2.2+ suggests 'ME' for Month End
+    freq = 'ME' if rebalance_freq == 'M' else rebalance_freq
+    calc_dates = []
+    for date in pd.Series(0, index=index).resample(freq).last().index:
+        # Avoid lookahead: ensure date is in prices index or take closest previous
+        if date not in index:
+            # Find closest prev date
+            loc = index.get_indexer([date], method='pad')[0]
+            if loc == -1: continue
+            calc_dates.append(index[loc])
+        else:
+            calc_dates.append(date)
+    return calc_dates
+
+def window_bounds(index, calc_date, lookback_years=1):
+    """
+    Price rows [lo, hi) of a calc date's lookback window, or None if it has
+    fewer than 60 prices (equal weight).
+    """
+    # Use data UP TO calc_date (exclusive of today if we want strict, but inclusive is standard for "close")
+    # For optimization we use a lookback window, 1 year by default.
+    lookback_start = calc_date - pd.DateOffset(years=lookback_years)
+    lo = index.searchsorted(lookback_start, side='left')
+    hi = index.get_loc(calc_date) + 1
+    if hi - lo < 60: # Need some data
+        return None
+    return lo, hi
+
+def rebalance_windows(prices, rebalance_freq='M', lookback_years=1, estimator='sample', factors=None):
+    """
+    Rebalance dates and the Moments of each date's lookback window.
+    A window with fewer than 60 prices is None (equal weight).
+    estimator / factors: covariance estimator of each window (see
+    engine.covariance.estimate_moments; factors is a count or factor returns).
+    A window the estimator fails on (e.g. factor returns that don't cover it)
+    is a WindowError, which optimize_window turns into equal weight like a
+    solver failure.
+    """
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unknown covariance estimator {estimator!r}, expected one of {ESTIMATORS}")
+    calc_dates = rebalance_dates(prices.index, rebalance_freq)
+    # Returns once for the whole panel; each window's mean/cov comes from
+    # running sums that slide forward with the rebalance dates.
+    returns = prices.pct_change().iloc[1:]
+    rolling = RollingMoments(returns) if estimator == 'sample' else None
+    windows = []
+    for calc_date in calc_dates:
+        bounds = window_bounds(prices.index, calc_date, lookback_years)
+        if bounds is None:
+            windows.append(None)
+        elif rolling is not None:
+            # Price rows [lo, hi) -> return rows [lo, hi - 1) (returns start at price row 1)
+            windows.append(rolling.window(bounds[0], bounds[1] - 1))
+        else:
+            try:
+                windows.append(estimate_moments(returns.iloc[bounds[0]:bounds[1] - 1], estimator, factors))
+            except Exception as e:
+                windows.append(WindowError(f"{estimator} covariance estimate failed: {e}"))
+    return calc_dates, windows
+
+def solve_windows(windows, strategy, tickers, solver='auto', workers=1, executor='process'):
+    """
+    Optimizes every rebalance window, returning (weights, error, info) per date in order.
+    """
+    # Each window is independent apart from the warm start, so the dates are
+    # split into contiguous chunks, one per worker, each warm-started in order.
+    # Chunks are joined back in rebalance-date order.
+    if workers and workers > 1 and len(windows) > 1:
+        pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+        bounds = np.linspace(0, len(windows), min(workers, len(windows)) + 1).astype(int)
+        chunks = [windows[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+        with pool_cls(max_workers=workers) as pool:
+            solved = [r for chunk in pool.map(optimize_windows, chunks, repeat(strategy), repeat(tickers),
+                                              repeat(solver))
+                      for r in chunk]
+        # Pool workers don't see the caller's RunStats; count their solves here
+        for _, _, info in solved:
+            profiling.record_solve(info)
+        return solved
+    return optimize_windows(windows, strategy, tickers, solver)
+
+def simulate(prices, calc_dates, weights, initial_capital=10000, cost_bps=0.0, fixed_cost=0.0):
+    """
+    Equity curve, metrics and daily target weights for weights set at calc_dates,
+    plus the full SimulationResult (realized weights, turnover, costs).
+    Trades happen on the close of each calc_date (theoretical), so the new
+    holdings earn the next day's return; holdings drift until the next rebalance.
+    """
+    # A rebalance on the last day of the panel would only pay costs
+    pairs = [(d, w) for d, w in zip(calc_dates, weights) if d != prices.index[-1] or len(calc_dates) == 1]
+    dates = [d for d, _ in pairs]
+    targets = np.array([np.asarray(w, dtype=float) for _, w in pairs]).reshape(len(pairs), prices.shape[1])
+    sim = simulate_portfolio(prices, dates, targets, initial_capital, cost_bps, fixed_cost)
+    
+    # Target weights in force each day (0 before the first rebalance)
+    seg = np.searchsorted(prices.index.get_indexer(dates), np.arange(len(prices)), side='right')
+    target_weights = pd.DataFrame(np.vstack([np.zeros(prices.shape[1]), targets])[seg],
+                                  index=prices.index, columns=prices.columns)
+    
+    return sim.value, backtest_metrics(sim.value, sim.turnover, sim.costs, initial_capital), target_weights, sim
+
+def backtest_metrics(portfolio_value, turnover, costs, initial_capital=10000):
+    """
+    Metrics dict of an equity curve and its per-rebalance turnover / costs
+    (see analytics.performance_metrics).
+    """
+    # Cost drag: costs as a fraction of the value they were paid from
+    drag = (costs / (portfolio_value.loc[costs.index] + costs)).sum()
+    metrics = performance_metrics(portfolio_value, initial_value=initial_capital,
+                                  turnover=[turnover.sum()], cost_drag=[drag])
+    return metrics.iloc[0].to_dict()
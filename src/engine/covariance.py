@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+from .moments import Moments, moments_from_returns
+
+ESTIMATORS = ('sample', 'ledoit_wolf', 'factor')
+# Statistical factors (principal components) when none are given
+DEFAULT_FACTORS = 5
+# Floor on specific variances, as a fraction of the average total variance
+MIN_SPECIFIC_VARIANCE = 1e-4
+
+class FactorCovariance:
+    """
+    Covariance in low-rank plus diagonal form, S = B B' + diag(d), with
+    B (N x k) the factor loadings scaled by the factor covariance and d the
+    specific (idiosyncratic) variances. Storage and every product are O(N k)
+    instead of O(N^2); the N x N matrix is only built on request (to_dense,
+    or np.asarray for code that needs it, e.g. HRP clustering).
+
+    Products: S @ w, w @ S @ w (quad), diagonal(), and solves on any subset
+    of assets through the Woodbury identity (solve_subset), which is what the
+    active-set QP needs.
+    """
+    def __init__(self, loadings, specific, index=None):
+        self.loadings = np.ascontiguousarray(loadings, dtype='float64')
+        self.specific = np.asarray(specific, dtype='float64')
+        self.index = index
+        self.shape = (len(self.specific), len(self.specific))
+
+    @property
+    def n_factors(self):
+        return self.loadings.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.loadings.nbytes + self.specific.nbytes
+
+    def __matmul__(self, w):
+        w = np.asarray(w, dtype='float64')
+        return self.loadings @ (self.loadings.T @ w) + (self.specific * w.T).T
+
+    def __rmatmul__(self, w):
+        return (self @ np.asarray(w, dtype='float64').T).T
+
+    def __mul__(self, scale):
+        return FactorCovariance(self.loadings * np.sqrt(scale), self.specific * scale, self.index)
+
+    __rmul__ = __mul__
+
+    def quad(self, w):
+        """
+        w' S w.
+        """
+        f = self.loadings.T @ w
+        return f @ f + w @ (self.specific * w)
+
+    def diagonal(self):
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.specific
+
+    def add_diagonal(self, value):
+        return FactorCovariance(self.loadings, self.specific + value, self.index)
+
+    def solve_subset(self, idx, rhs):
+        """
+        S[idx, idx]^-1 @ rhs by Woodbury:
+        (D + B B')^-1 = D^-1 - D^-1 B (I + B' D^-1 B)^-1 B' D^-1, O(len(idx) k^2).
+        """
+        B = self.loadings[idx]
+        inv_d = 1.0 / self.specific[idx]
+        scaled = rhs * (inv_d if rhs.ndim == 1 else inv_d[:, None])
+        BD = B * inv_d[:, None]
+        core = np.eye(B.shape[1]) + B.T @ BD
+        return scaled - BD @ np.linalg.solve(core, B.T @ scaled)
+
+    def to_dense(self):
+        return self.loadings @ self.loadings.T + np.diag(self.specific)
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.to_dense()
+        return dense if dtype is None else dense.astype(dtype)
+
+    def to_frame(self):
+        return pd.DataFrame(self.to_dense(), index=self.index, columns=self.index)
+
+def estimate_moments(returns, estimator='sample', factors=None):
+    """
+    Moments (mean, cov, count) of a daily returns window with a choice of
+    covariance estimator:
+
+      'sample'       pandas cov(), as before (dense N x N)
+      'ledoit_wolf'  Ledoit-Wolf shrinkage towards a scaled identity
+      'factor'       factor model: statistical (the first `factors` principal
+                     components, DEFAULT_FACTORS by default) or, when `factors`
+                     is a DataFrame of factor returns (e.g. market and bond
+                     index ETFs), fundamental loadings from a time-series regression
+
+    The mean is the sample mean for every estimator. 'factor' returns a
+    FactorCovariance and never builds the N x N matrix. So does 'ledoit_wolf'
+    for large universes (T <= N): with T observations, shrinkage is exactly
+    (1 - s) X'X / (T - 1) + s * mu * I, a rank-T plus diagonal matrix, and its
+    intensity only needs the T x T Gram matrix. With more observations than
+    assets the N x N matrix is the smaller form, so it comes back dense (a
+    DataFrame like 'sample', intensity in cov.attrs['shrinkage']). Both
+    estimators stay positive definite when N exceeds T.
+    """
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Unknown covariance estimator {estimator!r}, expected one of {ESTIMATORS}")
+    if estimator == 'sample':
+        return moments_from_returns(returns)
+    mean = returns.mean()
+    X = returns.to_numpy(dtype='float64') - mean.to_numpy()
+    T, N = X.shape
+    if T < 2:
+        raise ValueError("Need at least two observations for a covariance")
+    if estimator == 'ledoit_wolf':
+        cov, shrinkage = ledoit_wolf(X)
+        if isinstance(cov, np.ndarray):
+            cov = pd.DataFrame(cov, index=returns.columns, columns=returns.columns)
+            cov.attrs['shrinkage'] = shrinkage
+            return Moments(mean, cov, T)
+        cov.shrinkage = shrinkage
+    elif isinstance(factors, pd.DataFrame):
+        cov = regression_factor_model(X, returns.index, factors)
+    else:
+        cov = statistical_factor_model(X, factors or DEFAULT_FACTORS)
+    cov.index = returns.columns
+    return Moments(mean, cov, T)
+
+def ledoit_wolf(X):
+    """
+    Ledoit-Wolf (2004) shrinkage of the covariance of demeaned returns X (T x N)
+    towards mu * I. Returns (cov, shrinkage intensity): cov is a FactorCovariance
+    with rank-T loadings when T <= N, otherwise the dense N x N array, whose
+    solves don't grow with T. The intensity uses the paper's 1/T moments; the
+    shrunk matrix keeps the unbiased (T - 1) scaling.
+    """
+    T, N = X.shape
+    sq_norms = np.einsum('ij,ij->i', X, X)
+    # ||X'X||_F = ||XX'||_F: use the smaller Gram matrix
+    gram = X @ X.T if T <= N else X.T @ X
+    gram_sq = np.einsum('ij,ij->', gram, gram)
+    mu = sq_norms.sum() / (T * N)
+    # Squared Frobenius distance of the 1/T sample covariance to mu * I, and the
+    # sum of squared distances of each observation's outer product from it
+    delta = gram_sq / T ** 2 - mu ** 2 * N
+    beta = (np.sum(sq_norms ** 2) - gram_sq / T) / T ** 2
+    shrinkage = float(np.clip(beta / delta, 0.0, 1.0)) if delta > 0 else 1.0
+    if T > N:
+        # gram is X'X here
+        cov = gram * ((1 - shrinkage) / (T - 1))
+        cov[np.diag_indices(N)] += shrinkage * mu * T / (T - 1)
+        return cov, shrinkage
+    loadings = X.T * np.sqrt((1 - shrinkage) / (T - 1))
+    # (floored so Woodbury solves stay well conditioned if nothing is shrunk)
+    specific = np.full(N, max(shrinkage, 1e-8) * mu * T / (T - 1))
+    return FactorCovariance(loadings, specific), shrinkage
+
+def statistical_factor_model(X, n_factors=DEFAULT_FACTORS):
+    """
+    Principal-component factor model of demeaned returns X (T x N): the top
+    n_factors components from a thin SVD (O(T N min(T, N)), no N x N
+    matrix), with the rest of each asset's sample variance as specific variance.
+    """
+    T, N = X.shape
+    k = max(1, min(int(n_factors), T - 1, N))
+    _, s, vt = np.linalg.svd(X, full_matrices=False)
+    loadings = vt[:k].T * (s[:k] / np.sqrt(T - 1))
+    total = np.einsum('ij,ij->j', X, X) / (T - 1)
+    return FactorCovariance(loadings, _specific(total, loadings))
+
+def regression_factor_model(X, index, factor_returns):
+    """
+    Fundamental/macro factor model: loadings from regressing each asset's
+    demeaned returns X (T x N) on the given factor returns (dates x factors,
+    aligned to `index`), factor covariance from the factor returns and
+    specific variances from the residuals.
+    """
+    F = factor_returns.reindex(index).to_numpy(dtype='float64')
+    rows = np.isfinite(F).all(axis=1)
+    X, F = X[rows], F[rows]
+    if len(F) <= F.shape[1] + 1:
+        raise ValueError("Not enough overlapping observations for the factor regression")
+    X = X - X.mean(axis=0)
+    F = F - F.mean(axis=0)
+    T = len(F)
+    betas = np.linalg.lstsq(F, X, rcond=None)[0].T  # N x factors
+    factor_cov = F.T @ F / (T - 1)
+    # B Cov_f B' = (B L)(B L)' with L the Cholesky factor of the factor covariance
+    chol = np.linalg.cholesky(factor_cov + np.eye(len(factor_cov)) * 1e-12 * np.trace(factor_cov))
+    loadings = betas @ chol
+    residuals = X - F @ betas.T
+    specific = np.einsum('ij,ij->j', residuals, residuals) / (T - 1 - F.shape[1])
+    total = np.einsum('ij,ij->j', X, X) / (T - 1)
+    return FactorCovariance(loadings, np.maximum(specific, _floor(total)))
+
+def _specific(total, loadings):
+    """
+    Specific variances: total variance minus the factor part, floored so the
+    matrix stays positive definite.
+    """
+    return np.maximum(total - np.einsum('ij,ij->i', loadings, loadings), _floor(total))
+
+def _floor(total):
+    return MIN_SPECIFIC_VARIANCE * max(total.mean(), np.finfo(float).tiny)
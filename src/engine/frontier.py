@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+
+from .moments import moments_from_returns
+from .optimization import get_returns
+from .solvers import RIDGE, ridge_for, solve_qp
+from . import profiling
+
+# One point per target return, lowest risk first.
+# returns / risks: annualized return and volatility per point (arrays)
+# weights: DataFrame (points x tickers)
+# info: dict with 'max_sharpe' (index of the best Sharpe point), 'min_volatility' (0),
+#       solver totals ('solves', 'iterations', 'fallbacks', 'seconds') and 'cache_hit'
+Frontier = namedtuple('Frontier', ['returns', 'risks', 'weights', 'info'])
+
+# Frontiers kept in memory, keyed by moments fingerprint (see frontier_key)
+FRONTIER_CACHE_ENTRIES = 32
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def frontier_key(moments, n_points, risk_free_rate):
+    """
+    sha256 of the tickers, mean and covariance (raw float64 bytes) and the
+    frontier settings: equal inputs give the same frontier, so it is reused.
+    """
+    h = hashlib.sha256()
+    h.update('\x00'.join(map(str, moments.mean.index)).encode())
+    h.update(np.ascontiguousarray(moments.mean.to_numpy(dtype='float64')).tobytes())
+    h.update(np.ascontiguousarray(np.asarray(moments.cov, dtype='float64')).tobytes())
+    h.update(repr((int(n_points), float(risk_free_rate))).encode())
+    return h.hexdigest()
+
+def efficient_frontier(prices=None, moments=None, n_points=30, risk_free_rate=0.04, use_cache=True):
+    """
+    Long-only efficient frontier: for n_points target returns between the
+    minimum-volatility portfolio and the best single asset,
+
+        min w'Sw  s.t.  sum(w) = 1,  mu'w = target,  w >= 0
+
+    prices / moments: as in optimize_portfolio (daily returns; results are annualized).
+    Targets are solved in increasing order with the active-set QP (engine.solvers),
+    each seeded with the previous point's weights, so its active set (the assets at
+    zero) only changes by a few pivots from one point to the next. A point the
+    QP can't solve falls back to SLSQP. The point with the best Sharpe ratio
+    (against risk_free_rate) is flagged in info['max_sharpe'].
+    Results are cached in memory by frontier_key (use_cache=False skips it), so
+    redrawing a chart for the same window costs a hash of the covariance.
+    """
+    started = time.perf_counter()
+    if moments is None:
+        moments = moments_from_returns(get_returns(prices))
+    key = frontier_key(moments, n_points, risk_free_rate) if use_cache else None
+    if key is not None:
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+        if cached is not None:
+            profiling.count('frontier_cache_hits')
+            return cached._replace(info=dict(cached.info, cache_hit=True))
+
+    tickers = moments.mean.index
+    mu = moments.mean.to_numpy(dtype=float) * 252
+    cov = np.asarray(moments.cov, dtype=float) * 252
+    n = len(mu)
+    ones = np.ones((1, n))
+    # A low-rank estimate is full rank; a sample covariance may not be
+    ridge = RIDGE if hasattr(moments.cov, 'solve_subset') else ridge_for(n, moments.count)
+    totals = {'solves': 0, 'iterations': 0, 'fallbacks': 0}
+
+    def record(info):
+        totals['solves'] += 1
+        totals['iterations'] += int(info.get('iterations') or 0)
+        totals['fallbacks'] += bool(info.get('fallback_from'))
+        profiling.record_solve(info)
+
+    # Lowest point: minimum volatility
+    t0 = time.perf_counter()
+    result = solve_qp(cov, ones, [1.0], ridge=ridge)
+    w = result.x / result.x.sum()
+    record({'solver': 'qp', 'status': result.status, 'converged': result.converged,
+            'iterations': result.iterations, 'seconds': time.perf_counter() - t0})
+    points = [w]
+
+    low, high = float(mu @ w), float(mu.max())
+    if n_points > 1 and high - low > 1e-12 * max(1.0, abs(high)):
+        # Rows scaled alike (returns are annualized) to keep the KKT systems well conditioned
+        A = np.vstack([ones, mu[None, :]])
+        for target in np.linspace(low, high, n_points)[1:]:
+            t0 = time.perf_counter()
+            result = solve_qp(cov, A, [1.0, target], x0=w, ridge=ridge)
+            info = {'solver': 'qp', 'status': result.status, 'converged': result.converged,
+                    'iterations': result.iterations}
+            if result.converged:
+                x = result.x
+            else:
+                x, slsqp_info = _solve_target_slsqp(mu, cov, target, w)
+                info = dict(slsqp_info, fallback_from=info['status'])
+            info['seconds'] = time.perf_counter() - t0
+            record(info)
+            w = x / x.sum() if x.sum() > 0 else x
+            points.append(w)
+
+    weights = pd.DataFrame(np.array(points), columns=tickers)
+    returns = weights.to_numpy() @ mu
+    risks = np.sqrt(np.einsum('ij,jk,ik->i', weights.to_numpy(), cov, weights.to_numpy()))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(risks > 0, (returns - risk_free_rate) / risks, -np.inf)
+    info = dict(totals, min_volatility=0, max_sharpe=int(np.argmax(sharpe)), cache_hit=False,
+                seconds=time.perf_counter() - started)
+    frontier = Frontier(returns, risks, weights, info)
+    profiling.count('frontier_points', len(points))
+
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = frontier
+            while len(_cache) > FRONTIER_CACHE_ENTRIES:
+                _cache.popitem(last=False)
+    return frontier
+
+def clear_frontier_cache():
+    with _cache_lock:
+        _cache.clear()
+
+def _solve_target_slsqp(mu, cov, target, x0):
+    n = len(mu)
+    constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)},
+                   {'type': 'eq', 'fun': lambda x: mu @ x - target, 'jac': lambda x: mu})
+    result = minimize(lambda x: x @ cov @ x, x0, jac=lambda x: 2 * cov @ x, method='SLSQP',
+                      bounds=[(0.0, 1.0)] * n, constraints=constraints)
+    x = np.clip(result.x, 0.0, None)
+    return x, {'solver': 'slsqp', 'status': 'optimal' if result.success else 'failed',
+               'converged': bool(result.success), 'iterations': int(result.nit)}
@@ -0,0 +1,90 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+
+class BacktestState:
+    """
+    Everything a backtest needs to continue over new bars without replaying
+    its history (see Backtester.start_backtest / extend_backtest).
+
+    config: run inputs (tickers, start_date, initial_capital, rebalance_freq,
+            strategy, solver, lookback_years, cost_bps, fixed_cost, risk_overlay)
+    tickers: panel columns actually simulated (tickers with data)
+    value: daily equity curve so far; turnover / costs: per applied rebalance
+    shares / cash: holdings after the last applied rebalance
+    target: last target weights; previous: last solver solution (warm start)
+    rolling: (lo, hi, s1, s2, removed) of the RollingMoments window sums after
+             the last solve, so new windows slide on exactly as in a full run
+    calc_count: rebalance dates applied so far
+
+    A rebalance falling on the last date is left pending (a full run skips it
+    too); it is applied once a later bar arrives.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.tickers = None
+        self.value = None
+        self.turnover = pd.Series(dtype='float64', index=pd.DatetimeIndex([]))
+        self.costs = pd.Series(dtype='float64', index=pd.DatetimeIndex([]))
+        self.shares = None
+        self.cash = float(config['initial_capital'])
+        self.target = None
+        self.previous = None
+        self.rolling = None
+        self.calc_count = 0
+
+    @property
+    def last_date(self):
+        return self.value.index[-1] if self.value is not None and len(self.value) else None
+
+    def to_bytes(self):
+        """
+        Compressed npz blob (arrays as raw float64, the rest as JSON).
+        """
+        meta = {
+            'config': self.config,
+            'tickers': self.tickers,
+            'cash': self.cash,
+            'calc_count': self.calc_count,
+            'rolling': [int(self.rolling[0]), int(self.rolling[1]), int(self.rolling[4])] if self.rolling else None,
+            'index_name': self.value.index.name,
+            'has_previous': self.previous is not None,
+        }
+        arrays = dict(
+            meta=np.frombuffer(json.dumps(meta, default=str).encode(), dtype=np.uint8),
+            dates=self.value.index.to_numpy(),
+            value=self.value.to_numpy(dtype='float64'),
+            rebalance_dates=self.turnover.index.to_numpy(),
+            turnover=self.turnover.to_numpy(dtype='float64'),
+            costs=self.costs.to_numpy(dtype='float64'),
+            shares=self.shares,
+            target=self.target,
+            previous=np.asarray(self.previous if self.previous is not None else [], dtype='float64'),
+        )
+        if self.rolling:
+            arrays.update(s1=self.rolling[2], s2=self.rolling[3])
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **arrays)
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload):
+        with np.load(io.BytesIO(payload), allow_pickle=False) as z:
+            meta = json.loads(z['meta'].tobytes())
+            state = cls(meta['config'])
+            state.tickers = meta['tickers']
+            state.cash = meta['cash']
+            state.calc_count = meta['calc_count']
+            state.value = pd.Series(z['value'], index=pd.DatetimeIndex(z['dates'], name=meta['index_name']))
+            rebalance = pd.DatetimeIndex(z['rebalance_dates'], name=meta['index_name'])
+            state.turnover = pd.Series(z['turnover'], index=rebalance)
+            state.costs = pd.Series(z['costs'], index=rebalance)
+            state.shares = z['shares']
+            state.target = z['target']
+            if meta['has_previous']:
+                state.previous = pd.Series(z['previous'], index=state.tickers)
+            if meta['rolling']:
+                lo, hi, removed = meta['rolling']
+                state.rolling = (lo, hi, z['s1'], z['s2'], removed)
+        return state
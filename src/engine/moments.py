@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+# Sample moments of daily returns over one window.
+# mean: Series (tickers), cov: DataFrame (tickers x tickers), count: observations
+Moments = namedtuple('Moments', ['mean', 'cov', 'count'])
+
+def moments_from_returns(returns):
+    """
+    Moments of a returns DataFrame computed from scratch (pandas mean/cov).
+    """
+    return Moments(returns.mean(), returns.cov(), len(returns))
+
+class RollingMoments:
+    """
+    Running sums of returns and return cross-products over a sliding window.
+
+    Moving the window from [lo, hi) to [lo', hi') adds the rows that enter and
+    subtracts the rows that leave, so each step costs O(k * N^2) for k changed
+    rows instead of O(window * N^2) to recompute. Windows must move forward
+    (lo and hi never decrease); a jump wider than the current window, or
+    `refresh_every` subtracted rows, triggers a fresh recomputation to keep
+    rounding error from accumulating.
+    """
+    def __init__(self, returns, refresh_every=2520):
+        self.index = returns.index
+        self.columns = returns.columns
+        self.values = np.ascontiguousarray(returns.to_numpy(dtype='float64'))
+        self.refresh_every = refresh_every
+        n = self.values.shape[1]
+        self.lo = 0
+        self.hi = 0
+        self.s1 = np.zeros(n)
+        self.s2 = np.zeros((n, n))
+        self.removed = 0
+
+    def _reset(self, lo, hi):
+        block = self.values[lo:hi]
+        self.s1 = block.sum(axis=0)
+        self.s2 = block.T @ block
+        self.lo, self.hi = lo, hi
+        self.removed = 0
+
+    def _advance(self, lo, hi):
+        if hi > self.hi:
+            block = self.values[self.hi:hi]
+            self.s1 += block.sum(axis=0)
+            self.s2 += block.T @ block
+        if lo > self.lo:
+            block = self.values[self.lo:lo]
+            self.s1 -= block.sum(axis=0)
+            self.s2 -= block.T @ block
+            self.removed += lo - self.lo
+        self.lo, self.hi = lo, hi
+
+    def window(self, lo, hi):
+        """
+        Moments of rows [lo, hi) of the returns panel.
+        """
+        n = hi - lo
+        if n < 2:
+            raise ValueError("Need at least two observations for a covariance")
+        stale = (
+            lo < self.lo or hi < self.hi
+            or lo >= self.hi
+            or (lo - self.lo) + (hi - self.hi) > n
+            or self.removed + (lo - self.lo) > self.refresh_every
+        )
+        if stale:
+            self._reset(lo, hi)
+        else:
+            self._advance(lo, hi)
+
+        mean = self.s1 / n
+        cov = (self.s2 - n * np.outer(mean, mean)) / (n - 1)
+        # Symmetrize away the rounding noise from the subtraction
+        cov = (cov + cov.T) / 2
+        return Moments(
+            pd.Series(mean, index=self.columns),
+            pd.DataFrame(cov, index=self.columns, columns=self.columns),
+            n,
+        )
+
+    def window_between(self, start, end):
+        """
+        Moments of the rows with start <= date <= end.
+        """
+        lo = self.index.searchsorted(start, side='left')
+        hi = self.index.searchsorted(end, side='right')
+        return self.window(lo, hi)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-path results of run_monte_carlo (arrays of length n_paths) plus a summary dict
+MonteCarloResult = namedtuple('MonteCarloResult', ['terminal_value', 'cagr', 'max_drawdown', 'summary'])
+
+METHODS = ('bootstrap', 'normal', 'student_t')
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def run_monte_carlo(returns, weights, horizon_years=10, n_paths=10000, method='bootstrap', block_size=20,
+                    df=5, initial_value=10000, drawdown_threshold=0.2, chunk_size=2000, workers=1, seed=None):
+    """
+    Forward-simulates a constant-weight portfolio (rebalanced daily) over horizon_years.
+
+    returns: daily asset returns (e.g. optimization.get_returns(prices))
+    weights: Series/dict by ticker, or an array in the column order of returns
+    method:
+      'bootstrap'  stationary block bootstrap (Politis & Romano) of the historical
+                   portfolio returns, mean block length `block_size` days; keeps
+                   fat tails and volatility clustering from the stored history.
+      'normal'     multivariate normal with the sample mean and covariance.
+      'student_t'  multivariate Student-t with `df` (> 2) degrees of freedom,
+                   scaled to the sample covariance.
+    Any linear combination of a multivariate normal / t is normal / t, so the
+    parametric modes draw the portfolio return directly from w'mu and w'Cov w.
+
+    Paths are generated chunk_size at a time (each chunk is a chunk_size x days
+    array), so memory stays bounded for 100k paths; chunks run on `workers`
+    processes. Every chunk has its own seed from one SeedSequence, so results
+    depend on `seed` and chunk_size but not on the number of workers.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {METHODS}")
+    if method == 'student_t' and not df > 2:
+        # The t variance df / (df - 2) is infinite or undefined, nothing to scale
+        raise ValueError(f"student_t needs df > 2, got {df}")
+    returns = returns.dropna()
+    if isinstance(weights, (pd.Series, dict)):
+        w = pd.Series(weights).reindex(returns.columns).fillna(0).to_numpy(dtype=float)
+    else:
+        w = np.asarray(weights, dtype=float)
+    days = int(round(horizon_years * 252))
+
+    if method == 'bootstrap':
+        params = returns.to_numpy(dtype=float) @ w
+    else:
+        mu = returns.mean().to_numpy() @ w
+        sigma = np.sqrt(w @ returns.cov().to_numpy() @ w)
+        params = (mu, sigma)
+
+    sizes = [min(chunk_size, n_paths - i) for i in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(method, params, n, days, block_size, df, s) for n, s in zip(sizes, seeds)]
+    if workers and workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        chunks = [_simulate_chunk(*a) for a in args]
+
+    growth = np.concatenate([c[0] for c in chunks])
+    max_dd = np.concatenate([c[1] for c in chunks])
+    terminal = initial_value * growth
+    cagr = growth ** (1.0 / horizon_years) - 1
+
+    summary = {
+        'paths': n_paths,
+        'method': method,
+        'horizon_years': horizon_years,
+        'terminal_value': _quantiles(terminal),
+        'cagr': _quantiles(cagr),
+        'max_drawdown': _quantiles(max_dd),
+        'prob_loss': float(np.mean(terminal < initial_value)),
+        'prob_drawdown': float(np.mean(max_dd <= -drawdown_threshold)),
+        'drawdown_threshold': drawdown_threshold,
+    }
+    return MonteCarloResult(terminal, cagr, max_dd, summary)
+
+def _quantiles(values):
+    return {q: float(v) for q, v in zip(QUANTILES, np.quantile(values, QUANTILES))}
+
+def _simulate_chunk(method, params, n, days, block_size, df, seed):
+    """
+    n paths of `days` portfolio returns. Returns (terminal growth, max drawdown) arrays.
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'bootstrap':
+        r = params[bootstrap_indices(rng, len(params), n, days, block_size)]
+    elif method == 'normal':
+        mu, sigma = params
+        r = rng.normal(mu, sigma, (n, days))
+    else:
+        mu, sigma = params
+        # Unit-variance t draws scaled to the portfolio volatility
+        r = mu + sigma * np.sqrt((df - 2) / df) * rng.standard_t(df, (n, days))
+    return path_metrics(r)
+
+def bootstrap_indices(rng, n_obs, n, days, block_size):
+    """
+    n x days row indices of a stationary block bootstrap: each day starts a new
+    block at a random row with probability 1/block_size, otherwise continues the
+    current block at the next row (wrapping around the end of the history).
+    """
+    new_block = rng.random((n, days)) < 1.0 / block_size
+    new_block[:, 0] = True
+    pos = np.arange(days, dtype=np.int32)
+    # Day on which each day's block began
+    block_start = np.where(new_block, pos, 0).astype(np.int32)
+    np.maximum.accumulate(block_start, axis=1, out=block_start)
+    # Random start rows, drawn only for the days that begin a block
+    starts = np.zeros((n, days), dtype=np.int32)
+    starts[new_block] = rng.integers(0, n_obs, int(new_block.sum()))
+    idx = np.take_along_axis(starts, block_start, axis=1)
+    idx += pos - block_start
+    idx %= n_obs
+    return idx
+
+def path_metrics(r):
+    """
+    Terminal growth and max drawdown of each row of a paths x days returns array.
+    Works in place on `r` to keep one paths x days buffer per chunk.
+    """
+    r += 1
+    wealth = np.cumprod(r, axis=1, out=r)
+    # The starting value (1) counts as a peak
+    peak = np.maximum.accumulate(wealth, axis=1)
+    np.maximum(peak, 1.0, out=peak)
+    np.divide(wealth, peak, out=peak)
+    max_dd = np.minimum(peak.min(axis=1) - 1, 0.0)
+    return wealth[:, -1].copy(), max_dd
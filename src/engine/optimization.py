@@ -1,6 +1,11 @@
+import time
 import pandas as pd
 import numpy as np
 from scipy.optimize import minimize
+from .covariance import estimate_moments
+from .solvers import RIDGE, ridge_for, solve_qp
+from .risk_parity import equal_risk_contribution, hrp_weights
+from . import profiling
 
 def get_returns(prices_df):
     """
@@ -11,72 +16,182 @@ def get_returns(prices_df):
 
 def portfolio_performance(weights, mean_returns, cov_matrix):
     returns = np.sum(mean_returns * weights) * 252
-    std = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))) * np.sqrt(252)
+    std = np.sqrt(np.dot(weights.T, cov_matrix @ weights)) * np.sqrt(252)
     return returns, std
 
 def neg_sharpe_ratio(weights, mean_returns, cov_matrix, risk_free_rate):
     p_ret, p_var = portfolio_performance(weights, mean_returns, cov_matrix)
     return -(p_ret - risk_free_rate) / p_var
 
-def optimize_portfolio(prices, risk_free_rate=0.04, method='max_sharpe'):
+def neg_sharpe_ratio_grad(weights, mean_returns, cov_matrix, risk_free_rate):
+    """
+    Analytic gradient of neg_sharpe_ratio.
+    With a = 252*mu'w - rf and s = sqrt(252*w'Sw):  d(-a/s)/dw = -252*mu/s + a*252*Sw/s^3
+    """
+    cov_w = cov_matrix @ weights
+    a = np.dot(mean_returns, weights) * 252 - risk_free_rate
+    s = np.sqrt(np.dot(weights, cov_w) * 252)
+    return -252 * mean_returns / s + a * 252 * cov_w / s**3
+
+def portfolio_volatility(weights, mean_returns, cov_matrix):
+    return np.sqrt(np.dot(weights, cov_matrix @ weights) * 252)
+
+def portfolio_volatility_grad(weights, mean_returns, cov_matrix):
+    """
+    Analytic gradient of portfolio_volatility: 252*Sw / s
+    """
+    cov_w = cov_matrix @ weights
+    return 252 * cov_w / np.sqrt(np.dot(weights, cov_w) * 252)
+
+def starting_weights(initial_weights, tickers):
+    """
+    Feasible starting point for the solver: the given weights (e.g. the previous
+    rebalance's solution) aligned to tickers, clipped to [0, 1] and renormalized.
+    Falls back to equal weight.
+    """
+    n = len(tickers)
+    if initial_weights is None:
+        return np.full(n, 1. / n)
+    if isinstance(initial_weights, pd.Series):
+        initial_weights = initial_weights.reindex(tickers).fillna(0.0)
+    x0 = np.clip(np.asarray(initial_weights, dtype=float), 0.0, 1.0)
+    if x0.shape != (n,) or not np.isfinite(x0).all() or x0.sum() <= 0:
+        return np.full(n, 1. / n)
+    return x0 / x0.sum()
+
+SOLVERS = ('auto', 'qp', 'slsqp')
+
+def optimize_portfolio(prices=None, risk_free_rate=0.04, method='max_sharpe', moments=None,
+                       initial_weights=None, return_info=False, solver='auto', estimator='sample', factors=None):
     """
     Optimize portfolio weights.
     prices: DataFrame of asset prices (cols=tickers, index=date)
+    moments: precomputed Moments (mean, cov, count) of daily returns, used
+             instead of prices (see engine.moments.RollingMoments).
+    initial_weights: warm start for the solver, e.g. the previous rebalance's weights.
+    return_info: also return a dict of solver stats (solver, status, iterations, seconds, ...).
+                 Solves are also counted in the collecting RunStats, if any (see engine.profiling).
+    method: 'max_sharpe', 'min_volatility', 'risk_parity' (inverse volatility),
+            'erc' (equal risk contribution) or 'hrp' (hierarchical risk parity).
+    solver: 'qp' (exact active-set QP, see engine.solvers), 'slsqp' (SciPy), or
+            'auto' (QP, falling back to SLSQP if it doesn't converge).
+    estimator / factors: covariance estimator for prices ('sample', 'ledoit_wolf' or
+            'factor', see engine.covariance.estimate_moments). The low-rank estimates
+            are solved without forming the N x N matrix ('erc' and 'hrp' still need it).
     """
-    returns = get_returns(prices)
-    mean_returns = returns.mean()
-    cov_matrix = returns.cov()
-    num_assets = len(mean_returns)
-    args = (mean_returns, cov_matrix, risk_free_rate)
-    
-    constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1})
-    bounds = tuple((0.0, 1.0) for asset in range(num_assets))
+    started = time.perf_counter()
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver: {solver}")
+    if moments is None:
+        moments = estimate_moments(get_returns(prices), estimator, factors)
+    tickers = moments.mean.index
+    mean_returns = moments.mean.to_numpy(dtype=float)
+    # A FactorCovariance stays in low-rank form (and full rank); a dense sample
+    # covariance is singular when there are no more observations than assets
+    low_rank = hasattr(moments.cov, 'solve_subset')
+    cov_matrix = moments.cov if low_rank else np.asarray(moments.cov, dtype=float)
+    ridge = RIDGE if low_rank else ridge_for(len(tickers), moments.count)
     
-    initial_guess = num_assets * [1./num_assets,]
+    initial_guess = starting_weights(initial_weights, tickers)
     
-    if method == 'max_sharpe':
-        result = minimize(neg_sharpe_ratio, initial_guess, args=args,
-                          method='SLSQP', bounds=bounds, constraints=constraints)
-    elif method == 'min_volatility':
-        # Minimize Variance
-        fun = lambda w: portfolio_performance(w, mean_returns, cov_matrix)[1]
-        result = minimize(fun, initial_guess,
-                          method='SLSQP', bounds=bounds, constraints=constraints)
+    if method in ('max_sharpe', 'min_volatility'):
+        info = None
+        if solver in ('qp', 'auto'):
+            x, info = solve_mean_variance_qp(method, mean_returns, cov_matrix, risk_free_rate, initial_guess, ridge)
+            if not info['converged']:
+                if solver == 'qp':
+                    raise ValueError(f"QP solver failed ({info['status']}): {info['message']}")
+                fallback_from = info
+                x, info = solve_mean_variance_slsqp(method, mean_returns, cov_matrix, risk_free_rate, initial_guess)
+                info['fallback_from'] = fallback_from['status']
+        else:
+            x, info = solve_mean_variance_slsqp(method, mean_returns, cov_matrix, risk_free_rate, initial_guess)
     elif method == 'risk_parity':
         # Simple Risk Parity (Equal Risk Contribution)
         # This is a more complex implementation often solving for w s.t. w_i * (Sigma*w)_i is constant.
         # For simplicity in this demo, we use Inverse Volatility weighting.
-        vols = returns.std()
-        weights = 1. / vols
-        weights /= weights.sum()
-        
-        # Clean small weights
-        weights[weights < 0.001] = 0.0
-        weights /= weights.sum()
-        
-        return pd.Series(weights, index=prices.columns)
-    
+        vols = np.sqrt(cov_matrix.diagonal())
+        x = 1. / vols
+        x /= x.sum()
+        info = {'solver': 'closed_form', 'status': 'optimal', 'converged': True, 'iterations': 0}
+    elif method == 'erc':
+        # True Equal Risk Contribution, correlations included
+        x, info = equal_risk_contribution(cov_matrix)
+    elif method == 'hrp':
+        x = hrp_weights(cov_matrix)
+        info = {'solver': 'hrp', 'status': 'optimal', 'converged': True, 'iterations': 0}
     else:
         raise ValueError(f"Unknown method: {method}")
         
-    weights = pd.Series(result.x, index=prices.columns)
+    weights = pd.Series(x, index=tickers)
     
     # Clean small weights
     weights[weights < 0.001] = 0.0
     weights /= weights.sum()
     
+    info.setdefault('evaluations', 0)
+    info.setdefault('gradient_evaluations', 0)
+    info.setdefault('message', '')
+    info['method'] = method
+    info['seconds'] = time.perf_counter() - started
+    profiling.record_solve(info)
+    if return_info:
+        return weights, info
     return weights
 
+def solve_mean_variance_qp(method, mean_returns, cov_matrix, risk_free_rate, initial_guess, ridge=RIDGE):
+    """
+    min_volatility:  min w'Sw  s.t. sum(w) = 1, w >= 0
+    max_sharpe:      min y'Sy  s.t. (mu - rf)'y = 1, y >= 0, then w = y / sum(y)
+                     (the standard change of variables that turns max Sharpe into a QP)
+    The upper bound w <= 1 is implied by the budget and w >= 0.
+    """
+    n = len(mean_returns)
+    if method == 'min_volatility':
+        result = solve_qp(cov_matrix, np.ones((1, n)), [1.0], x0=initial_guess, ridge=ridge)
+        x = result.x / result.x.sum() if result.x.sum() > 0 else result.x
+    else:
+        excess = mean_returns - risk_free_rate / 252
+        if not (excess > 0).any():
+            return initial_guess, {'solver': 'qp', 'status': 'infeasible', 'converged': False, 'iterations': 0,
+                                   'message': "No asset has a positive excess return"}
+        result = solve_qp(cov_matrix, excess[None, :], [1.0], x0=initial_guess, ridge=ridge)
+        total = result.x.sum()
+        x = result.x / total if total > 0 else result.x
+    return x, {'solver': 'qp', 'status': result.status, 'converged': result.converged,
+               'iterations': result.iterations, 'message': result.message}
+
+def solve_mean_variance_slsqp(method, mean_returns, cov_matrix, risk_free_rate, initial_guess):
+    num_assets = len(mean_returns)
+    constraints = ({'type': 'eq', 'fun': lambda x: np.sum(x) - 1, 'jac': lambda x: np.ones_like(x)})
+    bounds = tuple((0.0, 1.0) for asset in range(num_assets))
+    
+    if method == 'max_sharpe':
+        if np.dot(mean_returns, initial_guess) * 252 <= risk_free_rate:
+            # Sharpe is only quasi-concave where the excess return is positive;
+            # a warm start below the risk-free rate can get stuck on a vertex.
+            initial_guess = np.full(num_assets, 1. / num_assets)
+        result = minimize(neg_sharpe_ratio, initial_guess, args=(mean_returns, cov_matrix, risk_free_rate),
+                          jac=neg_sharpe_ratio_grad, method='SLSQP', bounds=bounds, constraints=constraints)
+    else:
+        # Minimize Variance
+        result = minimize(portfolio_volatility, initial_guess, args=(mean_returns, cov_matrix),
+                          jac=portfolio_volatility_grad, method='SLSQP', bounds=bounds, constraints=constraints)
+    return result.x, {
+        'solver': 'slsqp',
+        'status': 'optimal' if result.success else 'failed',
+        'converged': bool(result.success),
+        'iterations': int(result.nit),
+        'evaluations': int(result.nfev),
+        'gradient_evaluations': int(getattr(result, 'njev', 0) or 0),
+        'message': str(result.message),
+    }
+
 def hierarchical_risk_parity(prices):
     """
-    Placeholder for HRP. 
-    Ideally implements the clustering and quasi-diagonalization steps.
-    For this scope, we can rely on basic 'risk_parity' (inverse vol) or add full HRP if requested.
-    Let's stick to Inverse Vol as a proxy for "risk balanced" for now to keep it robust.
+    Hierarchical Risk Parity weights from a price frame
+    (clustering, quasi-diagonalization and recursive bisection, see risk_parity.hrp_weights).
+    Same as optimize_portfolio(prices, method='hrp') without the small-weight cleanup.
     """
-    # Simple Inverse Volatility for now
     returns = get_returns(prices)
-    vols = returns.std()
-    weights = 1. / vols
-    weights /= weights.sum()
-    return pd.Series(weights, index=prices.columns)
+    return pd.Series(hrp_weights(returns.cov().to_numpy()), index=prices.columns)
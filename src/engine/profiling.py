@@ -0,0 +1,148 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+# Append every finished run's stats as one JSON line to this file ('-' prints them)
+STATS_LOG = os.environ.get('PORTFOLIO_STATS_LOG')
+
+# RunStats collecting for the current run, if any. Instrumented code calls the
+# module-level helpers below, which do nothing when no run is collecting.
+_current = contextvars.ContextVar('run_stats', default=None)
+
+class RunStats:
+    """
+    Wall time per stage and counters of one run (a backtest, a universe update).
+
+    stages: {name: {'seconds', 'calls'}}. Stages can nest (e.g. the price
+            query inside 'load_prices'), so they don't add up to 'total'.
+    counters: {name: number}, e.g. solver_calls, solver_iterations,
+              rows_read, rows_written, cache_hits, cache_misses.
+    Safe to update from several threads.
+    """
+    def __init__(self, name, **context):
+        self.name = name
+        self.context = context
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_time(name, time.perf_counter() - t0)
+
+    def add_time(self, name, seconds, calls=1):
+        with self._lock:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            entry['seconds'] += seconds
+            entry['calls'] += calls
+
+    def add(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record_solve(self, info):
+        """
+        Counts one optimize_portfolio solve from its info dict.
+        """
+        self.add('solver_calls')
+        self.add('solver_iterations', int(info.get('iterations') or 0))
+        self.add('solver_seconds', float(info.get('seconds') or 0.0))
+        if not info.get('converged', True):
+            self.add('solver_not_converged')
+        if info.get('fallback_from'):
+            self.add('solver_fallbacks')
+
+    def stages_frame(self):
+        with self._lock:
+            return stages_frame(self.stages)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'started': pd.Timestamp(self.started, unit='s').isoformat(timespec='seconds'),
+                'context': dict(self.context),
+                'stages': {k: dict(v) for k, v in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), default=str)
+
+    def emit(self, path=None):
+        """
+        Writes the stats as one JSON line to `path` (default: PORTFOLIO_STATS_LOG).
+        Does nothing if neither is set.
+        """
+        path = path or STATS_LOG
+        if not path:
+            return
+        if path == '-':
+            print(self.to_json())
+            return
+        try:
+            with open(path, 'a') as f:
+                f.write(self.to_json() + '\n')
+        except Exception as e:
+            print(f"Error writing run stats to {path}: {e}")
+
+def stages_frame(stages):
+    """
+    A stages dict (RunStats.stages or to_dict()['stages']) as a DataFrame of
+    seconds, calls and share of the 'total' stage, slowest first.
+    """
+    if not stages:
+        return pd.DataFrame(columns=['seconds', 'calls', 'share'])
+    frame = pd.DataFrame.from_dict(stages, orient='index').sort_values('seconds', ascending=False)
+    total = stages.get('total', {}).get('seconds') or frame['seconds'].max()
+    frame['share'] = frame['seconds'] / total if total else 0.0
+    return frame
+
+@contextmanager
+def collect(stats):
+    """
+    Makes `stats` the collector for instrumented calls in this thread/context.
+    """
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+def current():
+    return _current.get()
+
+def stage(name):
+    stats = _current.get()
+    return stats.stage(name) if stats is not None else nullcontext()
+
+def count(name, n=1):
+    stats = _current.get()
+    if stats is not None:
+        stats.add(name, n)
+
+def record_solve(info):
+    stats = _current.get()
+    if stats is not None and info:
+        stats.record_solve(info)
+
+def propagate(fn):
+    """
+    Wraps fn to run with the caller's collector, for worker threads (threads
+    don't inherit context variables). Each call gets its own context copy, so
+    the wrapper can run on several threads at once.
+    """
+    ctx = contextvars.copy_context()
+    def run(*args, **kwargs):
+        return ctx.copy().run(fn, *args, **kwargs)
+    return run
@@ -0,0 +1,80 @@
+import hashlib
+import io
+import json
+import numpy as np
+import pandas as pd
+from .simulator import SimulationResult
+
+# Bump when the backtest logic or the payload layout changes, so results from
+# older code stop matching
+CACHE_VERSION = 2
+
+def fingerprint(config, versions):
+    """
+    Cache key of a backtest: sha256 of its configuration and the data version
+    (latest_date, row_count) of every ticker it reads.
+    """
+    blob = json.dumps({'cache_version': CACHE_VERSION, 'config': config,
+                       'versions': {t: list(v) if v else None for t, v in versions.items()}},
+                      sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def frame_digest(frame):
+    """
+    sha256 of a DataFrame's labels, dtypes and every value (pandas' row hashes),
+    for config entries such as factor returns: their repr is truncated, so two
+    different frames could otherwise share a key.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([list(map(str, frame.columns)), list(map(str, frame.dtypes))]).encode())
+    h.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def pack_result(curve, metrics, target_weights, simulation, risk_adjustments=(), solver_stats=()):
+    """
+    run_backtest outputs as a compressed npz blob: the daily frames as raw
+    float64 arrays (so they round-trip exactly), everything else as JSON.
+    """
+    meta = {
+        'metrics': metrics,
+        'tickers': list(target_weights.columns),
+        'index_name': curve.index.name,
+        'risk_adjustments': [dict(a, date=str(a['date'])) for a in risk_adjustments],
+        'solver_stats': [dict(s, date=str(s['date'])) for s in solver_stats],
+    }
+    buf = io.BytesIO()
+    np.savez_compressed(
+        buf,
+        meta=np.frombuffer(json.dumps(meta, default=str).encode(), dtype=np.uint8),
+        dates=curve.index.to_numpy(),
+        curve=curve.to_numpy(dtype='float64'),
+        target=target_weights.to_numpy(dtype='float64'),
+        realized=simulation.weights.to_numpy(dtype='float64'),
+        cash=simulation.cash.to_numpy(dtype='float64'),
+        rebalance_dates=simulation.turnover.index.to_numpy(),
+        turnover=simulation.turnover.to_numpy(dtype='float64'),
+        costs=simulation.costs.to_numpy(dtype='float64'),
+    )
+    return buf.getvalue()
+
+def unpack_result(payload):
+    """
+    Inverse of pack_result: (curve, metrics, target_weights, simulation, risk_adjustments, solver_stats).
+    """
+    with np.load(io.BytesIO(payload), allow_pickle=False) as z:
+        meta = json.loads(z['meta'].tobytes())
+        index = pd.DatetimeIndex(z['dates'], name=meta['index_name'])
+        rebalance = pd.DatetimeIndex(z['rebalance_dates'], name=meta['index_name'])
+        tickers = meta['tickers']
+        curve = pd.Series(z['curve'], index=index)
+        target = pd.DataFrame(z['target'], index=index, columns=tickers)
+        simulation = SimulationResult(
+            curve.copy(),
+            pd.DataFrame(z['realized'], index=index, columns=tickers),
+            pd.Series(z['cash'], index=index),
+            pd.Series(z['turnover'], index=rebalance),
+            pd.Series(z['costs'], index=rebalance),
+        )
+    risk_adjustments = [dict(a, date=pd.Timestamp(a['date'])) for a in meta['risk_adjustments']]
+    solver_stats = [dict(s, date=pd.Timestamp(s['date'])) for s in meta['solver_stats']]
+    return curve, meta['metrics'], target, simulation, risk_adjustments, solver_stats
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from collections import namedtuple
+
+# Output of simulate_portfolio.
+# value: daily portfolio value (Series), weights: daily realized weights (DataFrame, excl. cash),
+# cash: daily cash balance, turnover: traded notional / pre-trade value per rebalance date,
+# costs: transaction costs paid per rebalance date (currency)
+SimulationResult = namedtuple('SimulationResult', ['value', 'weights', 'cash', 'turnover', 'costs'])
+
+def simulate_portfolio(prices, rebalance_dates, target_weights, initial_capital=10000, cost_bps=0.0, fixed_cost=0.0,
+                       initial_shares=None, return_state=False):
+    """
+    Buy-and-hold between rebalance dates: trades to `target_weights` at the close of each
+    rebalance date, then holds the share counts so weights drift with prices until the next one.
+
+    prices: date x ticker panel without gaps (adj_close)
+    rebalance_dates: dates in prices.index, one per row of target_weights
+    target_weights: sequence of weight vectors (ticker order of prices); any part
+                    not allocated (sum < 1) stays in cash at 0%
+    cost_bps: proportional cost on traded notional, in basis points
+    fixed_cost: flat fee per asset traded
+
+    Costs are charged on trades sized at the pre-trade value and paid out of the
+    new positions pro rata. Before the first rebalance the portfolio holds
+    initial_capital in cash plus `initial_shares` (none by default), so a
+    simulation can resume from the holdings at the end of an earlier one;
+    return_state=True also returns the final (shares, cash) for that.
+    Only the rebalance dates are looped over (O(N) each); holdings for every day
+    come from one share-count x price product, O(T * N) overall.
+    """
+    px = prices.to_numpy(dtype='float64')
+    T, N = px.shape
+    rows = prices.index.get_indexer(pd.DatetimeIndex(rebalance_dates))
+    if (rows < 0).any():
+        raise ValueError("Rebalance dates must be in the price index")
+    targets = np.asarray(target_weights, dtype='float64').reshape(len(rows), N)
+    # One rebalance per date (the last one wins), in date order
+    rows, keep = np.unique(rows[::-1], return_index=True)
+    targets = targets[::-1][keep]
+
+    R = len(rows)
+    shares = np.zeros((R + 1, N))
+    if initial_shares is not None:
+        shares[0] = initial_shares
+    cash = np.zeros(R + 1)
+    cash[0] = initial_capital
+    turnover = np.zeros(R)
+    costs = np.zeros(R)
+    for k, r in enumerate(rows):
+        held = shares[k] * px[r]
+        value = held.sum() + cash[k]
+        trades = np.abs(targets[k] * value - held)
+        traded = trades.sum()
+        costs[k] = cost_bps / 1e4 * traded + fixed_cost * np.count_nonzero(trades > 1e-9 * value)
+        value_after = value - costs[k]
+        position = targets[k] * value_after
+        shares[k + 1] = position / px[r]
+        cash[k + 1] = value_after - position.sum()
+        turnover[k] = traded / value if value > 0 else 0.0
+
+    # Segment of each day: the number of rebalances at or before it
+    seg = np.searchsorted(rows, np.arange(T), side='right')
+    holdings = shares[seg] * px
+    daily_cash = cash[seg]
+    value = holdings.sum(axis=1) + daily_cash
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weights = np.where(value[:, None] > 0, holdings / value[:, None], 0.0)
+
+    dates = prices.index[rows]
+    result = SimulationResult(
+        pd.Series(value, index=prices.index),
+        pd.DataFrame(weights, index=prices.index, columns=prices.columns),
+        pd.Series(daily_cash, index=prices.index),
+        pd.Series(turnover, index=dates),
+        pd.Series(costs, index=dates),
+    )
+    if return_state:
+        return result, shares[-1].copy(), float(cash[-1])
+    return result
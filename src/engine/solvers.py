@@ -0,0 +1,146 @@
+import numpy as np
+from collections import namedtuple
+
+# status: 'optimal', 'max_iter', 'infeasible'
+SolverResult = namedtuple('SolverResult', ['x', 'status', 'converged', 'iterations', 'message'])
+
+# Diagonal ridge, relative to trace(Q) / n. A full-rank covariance only needs
+# a token amount; a sample covariance of fewer observations than assets
+# (rank < n) needs enough that every KKT block stays well conditioned,
+# otherwise the pivoting chases null-space noise for thousands of pivots.
+RIDGE = 1e-12
+SINGULAR_RIDGE = 1e-3
+# Single-variable (Murty) pivots allowed before giving up, on top of n // 10
+MURTY_PIVOTS = 50
+
+def ridge_for(n_assets, n_obs):
+    """
+    Ridge for a sample covariance of n_obs daily returns (None: unknown, assumed full rank).
+    """
+    return SINGULAR_RIDGE if n_obs is not None and n_obs <= n_assets else RIDGE
+
+def solve_qp(Q, A, b, c=None, x0=None, max_iter=None, tol=1e-9, ridge=RIDGE, max_murty=None):
+    """
+    Solves the convex QP
+
+        min 1/2 x'Qx + c'x   s.t.  A x = b,  x >= 0
+
+    with a block principal pivoting active-set method: guess which variables
+    sit at zero, solve the equality-constrained KKT system on the rest, and
+    swap every variable that violates primal (x < 0) or dual (z < 0)
+    feasibility. If a full swap stops reducing the number of violations it
+    falls back to swapping one variable at a time (Murty's rule), which is
+    guaranteed to terminate. Usually converges in a handful of linear solves,
+    independent of how many weights end up at zero. Murty's rule can need
+    thousands of pivots on a badly conditioned Q, so after max_murty of them
+    (default MURTY_PIVOTS + n // 10) it stops with status 'max_iter' and
+    leaves it to the caller's fallback.
+
+    x0 seeds the initial active set (its zero entries), e.g. the previous
+    rebalance's weights. `ridge` adds ridge * trace(Q) / n to the diagonal;
+    pass ridge_for(n, observations) for sample covariances with more assets
+    than observations (SINGULAR_RIDGE), so they stay solvable.
+    Q can also be a low-rank plus diagonal FactorCovariance (engine.covariance):
+    the KKT systems are then solved through its Woodbury solves, O(n k^2) per
+    pivot for k factors, and the n x n matrix is never formed.
+    """
+    low_rank = hasattr(Q, 'solve_subset')
+    if not low_rank:
+        Q = np.asarray(Q, dtype=float)
+    n = Q.shape[0]
+    A = np.atleast_2d(np.asarray(A, dtype=float))
+    b = np.atleast_1d(np.asarray(b, dtype=float))
+    c = np.zeros(n) if c is None else np.asarray(c, dtype=float)
+    if ridge:
+        shift = ridge * max(np.mean(Q.diagonal()), np.finfo(float).tiny)
+        Q = Q.add_diagonal(shift) if low_rank else Q + np.eye(n) * shift
+    solve_kkt = _solve_kkt_low_rank if low_rank else _solve_kkt
+    if max_iter is None:
+        max_iter = 10 * n + 50
+    if max_murty is None:
+        max_murty = MURTY_PIVOTS + n // 10
+
+    free = np.ones(n, dtype=bool)
+    if x0 is not None:
+        x0 = np.asarray(x0, dtype=float)
+        if x0.shape == (n,) and (x0 > 0).any():
+            free = x0 > 0
+
+    best = n + 1
+    tries = 3
+    murty = 0
+    x = np.zeros(n)
+    for it in range(1, max_iter + 1):
+        x, nu = solve_kkt(Q, A, b, c, free)
+        grad = Q @ x + c
+        z = grad - A.T @ nu
+        tol_x = tol * max(1.0, np.abs(x).max())
+        tol_z = tol * max(np.abs(grad).max(), np.abs(A.T @ nu).max(), np.finfo(float).tiny)
+        bad = (free & (x < -tol_x)) | (~free & (z < -tol_z))
+        n_bad = int(bad.sum())
+        if n_bad == 0:
+            residual = np.abs(A @ x - b).max() if len(b) else 0.0
+            if residual > 1e-6 * max(1.0, np.abs(b).max()):
+                return SolverResult(np.clip(x, 0, None), 'infeasible', False, it,
+                                    "Equality constraints cannot be met with x >= 0")
+            return SolverResult(np.clip(x, 0, None), 'optimal', True, it, '')
+        if n_bad < best:
+            best = n_bad
+            tries = 3
+            free ^= bad
+        elif tries > 0:
+            tries -= 1
+            free ^= bad
+        elif murty < max_murty:
+            murty += 1
+            i = np.flatnonzero(bad)[-1]
+            free[i] = ~free[i]
+        else:
+            return SolverResult(np.clip(x, 0, None), 'max_iter', False, it,
+                                f"No convergence after {it} pivots ({murty} single-variable)")
+    return SolverResult(np.clip(x, 0, None), 'max_iter', False, max_iter,
+                        f"No convergence after {max_iter} pivots")
+
+def _solve_kkt(Q, A, b, c, free):
+    """
+    Solves the KKT system of min 1/2 x'Qx + c'x s.t. Ax = b, x[~free] = 0:
+
+        [Q_FF  -A_F'] [x_F]   [-c_F]
+        [A_F    0   ] [nu ] = [ b  ]
+    """
+    n = Q.shape[0]
+    m = len(b)
+    idx = np.flatnonzero(free)
+    k = len(idx)
+    K = np.zeros((k + m, k + m))
+    K[:k, :k] = Q[np.ix_(idx, idx)]
+    K[:k, k:] = -A[:, idx].T
+    K[k:, :k] = A[:, idx]
+    rhs = np.concatenate([-c[idx], b])
+    try:
+        sol = np.linalg.solve(K, rhs)
+    except np.linalg.LinAlgError:
+        sol = np.linalg.lstsq(K, rhs, rcond=None)[0]
+    x = np.zeros(n)
+    x[idx] = sol[:k]
+    return x, sol[k:]
+
+def _solve_kkt_low_rank(Q, A, b, c, free):
+    """
+    _solve_kkt for a FactorCovariance Q, by elimination:
+    x_F = Q_FF^-1 (A_F' nu - c_F), with (A_F Q_FF^-1 A_F') nu = b + A_F Q_FF^-1 c_F.
+    """
+    n = Q.shape[0]
+    m = len(b)
+    idx = np.flatnonzero(free)
+    A_F = A[:, idx]
+    solved = Q.solve_subset(idx, np.column_stack([A_F.T, c[idx]]))
+    schur = A_F @ solved[:, :m]
+    rhs = b + A_F @ solved[:, m]
+    try:
+        nu = np.linalg.solve(schur, rhs)
+    except np.linalg.LinAlgError:
+        nu = np.linalg.lstsq(schur, rhs, rcond=None)[0]
+    x = np.zeros(n)
+    x[idx] = solved[:, :m] @ nu - solved[:, m]
+    return x, nu
@@ -0,0 +1,99 @@
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from .backtest import select_prices, rebalance_windows, optimize_windows, simulate
+from .analytics import METRICS
+
+def expand_grid(asset_sets, strategies=('max_sharpe',), rebalance_freqs=('M',), lookbacks=(1,)):
+    """
+    Every combination of asset set x strategy x rebalance frequency x lookback (years).
+    asset_sets: {label: [tickers]} or a list of ticker lists (labelled by their tickers).
+    Returns a list of config dicts for run_sweep.
+    """
+    if not isinstance(asset_sets, dict):
+        asset_sets = {','.join(a): a for a in asset_sets}
+    return [
+        {'assets': label, 'tickers': list(tickers), 'strategy': strategy,
+         'rebalance_freq': freq, 'lookback_years': lookback}
+        for (label, tickers), strategy, freq, lookback
+        in product(asset_sets.items(), strategies, rebalance_freqs, lookbacks)
+    ]
+
+def run_sweep(store, configs, start_date, end_date, initial_capital=10000, workers=1, keep_curves=False,
+              solver='auto', cost_bps=0.0, fixed_cost=0.0):
+    """
+    Backtests a list of configs (see expand_grid) over one price panel.
+
+    The adj_close panel for the union of all tickers is loaded once. Configs
+    sharing tickers, rebalance frequency and lookback share the same windows,
+    so their returns and rolling covariances are computed once per group and
+    only the optimization differs per strategy. Groups are spread over
+    `workers` processes. cost_bps / fixed_cost apply to every config.
+
+    Returns a DataFrame with one row per config (config fields + metrics,
+    'error' for configs that could not run). With keep_curves=True returns
+    (results, curves) where curves has one equity curve column per results row.
+    """
+    start = time.time()
+    all_tickers = sorted({t for c in configs for t in c['tickers']})
+    panel = store.load_price_matrix(all_tickers, 'adj_close', start_date, end_date)
+
+    groups = {}
+    for i, config in enumerate(configs):
+        key = (tuple(config['tickers']), config.get('rebalance_freq', 'M'), config.get('lookback_years', 1))
+        groups.setdefault(key, []).append(i)
+
+    tasks = [(select_prices(panel, key[0]), key[1], key[2],
+              [configs[i].get('strategy', 'max_sharpe') for i in idx], initial_capital, solver, keep_curves,
+              cost_bps, fixed_cost)
+             for key, idx in groups.items()]
+    if workers and workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(_run_group, *zip(*tasks)))
+    else:
+        outputs = [_run_group(*task) for task in tasks]
+
+    rows = [None] * len(configs)
+    curves = {}
+    for idx, group_out in zip(groups.values(), outputs):
+        for i, (metrics, curve, error) in zip(idx, group_out):
+            config = configs[i]
+            rows[i] = dict(
+                assets=config.get('assets', ','.join(config['tickers'])),
+                strategy=config.get('strategy', 'max_sharpe'),
+                rebalance_freq=config.get('rebalance_freq', 'M'),
+                lookback_years=config.get('lookback_years', 1),
+                **{m: (metrics or {}).get(m) for m in METRICS},
+                error=error,
+            )
+            if curve is not None:
+                curves[i] = curve
+
+    results = pd.DataFrame(rows)
+    for m in METRICS:
+        results[m] = results[m].astype(float)
+    print(f"Sweep: {len(configs)} configs in {len(groups)} window groups, {time.time() - start:.1f}s")
+    if keep_curves:
+        return results, pd.DataFrame({i: curves[i] for i in sorted(curves)})
+    return results
+
+def _run_group(prices, rebalance_freq, lookback_years, strategies, initial_capital, solver, keep_curves,
+               cost_bps=0.0, fixed_cost=0.0):
+    """
+    Runs every strategy over one set of rebalance windows.
+    Returns [(metrics, curve, error)] in strategy order.
+    """
+    if prices.empty:
+        return [(None, None, "No sufficient data for backtest")] * len(strategies)
+    calc_dates, windows = rebalance_windows(prices, rebalance_freq, lookback_years)
+    tickers = list(prices.columns)
+    out = []
+    for strategy in strategies:
+        try:
+            weights = [w for w, _, _ in optimize_windows(windows, strategy, tickers, solver)]
+            curve, metrics, _, _ = simulate(prices, calc_dates, weights, initial_capital, cost_bps, fixed_cost)
+            out.append((metrics, curve if keep_curves else None, None))
+        except Exception as e:
+            out.append((None, None, str(e)))
+    return out
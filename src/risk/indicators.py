@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+# name -> (bars of close history needed for one value, close Series -> indicator Series)
+INDICATORS = {
+    'close': (1, lambda close: close),
+    'sma_50': (50, lambda close: close.rolling(50).mean()),
+    'sma_200': (200, lambda close: close.rolling(200).mean()),
+    'vol_20': (21, lambda close: close.pct_change().rolling(20).std() * np.sqrt(252)),
+    'mom_252': (253, lambda close: close.pct_change(252)),
+}
+
+# Tickers the risk signals read, and the indicators kept for each
+INDICATOR_TICKERS = {
+    'VOO': ['close', 'sma_50', 'sma_200', 'vol_20', 'mom_252'],
+    '^VIX': ['close'],
+}
+
+def compute_indicators(close, names=None):
+    """
+    date x indicator DataFrame of the named indicators over a close price Series.
+    """
+    names = list(INDICATORS) if names is None else names
+    return pd.DataFrame({name: INDICATORS[name][1](close) for name in names})
+
+def update_indicators(store, tickers=None, rebuild=False):
+    """
+    Extends the stored indicator series of each ticker with the bars added since
+    its last stored value. Only the tail of the close history needed for the
+    longest lookback is read, so a daily update costs O(new bars + lookback)
+    instead of the whole history. rebuild=True recomputes everything (e.g.
+    after a backfill of older prices).
+    Returns {ticker: rows written}.
+    """
+    if tickers is None:
+        tickers = INDICATOR_TICKERS
+    else:
+        tickers = {t: INDICATOR_TICKERS.get(t, list(INDICATORS)) for t in tickers}
+
+    written = {}
+    for ticker, names in tickers.items():
+        if rebuild:
+            store.delete_indicators(ticker)
+            last = None
+        else:
+            last = store.get_indicator_latest_date(ticker)
+        bars = max(INDICATORS[n][0] for n in names)
+
+        close = None
+        if last is not None:
+            last = pd.Timestamp(last)
+            # Calendar buffer comfortably covering `bars` trading days
+            start = last - pd.Timedelta(days=int(bars * 1.5) + 30)
+            close = store.load_price_matrix([ticker], 'close', start_date=start, dtype='float64')[ticker].dropna()
+            if (close.index <= last).sum() < bars:
+                close = None
+        if close is None:
+            close = store.load_price_matrix([ticker], 'close', dtype='float64')[ticker].dropna()
+
+        frame = compute_indicators(close, names)
+        if last is not None:
+            frame = frame[frame.index > last]
+        written[ticker] = store.store_indicators(ticker, frame)
+    return written
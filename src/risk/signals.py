@@ -1,42 +1,108 @@
 import pandas as pd
 import numpy as np
+from .indicators import update_indicators
+
+# Using a simple heuristic: VTI, VOO, VUG, VTV, VXUS, VWO, VEA are Equity
+# BND, BIV, BLV, BSV, BNDX, VGIT are Bonds
+EQUITY_TICKERS = ['VTI', 'VOO', 'VUG', 'VTV', 'VXUS', 'VWO', 'VEA', 'VNQ', 'GLD', 'GSG']
+BOND_TICKERS = ['BND', 'BIV', 'BLV', 'BSV', 'BNDX', 'VGIT']
+
+def classify_regime(regime):
+    """
+    Adds vix_level, downtrend and risk_on columns to a frame of vix / voo / sma200 values.
+    """
+    regime['vix_level'] = np.select([regime['vix'] > 30, regime['vix'] > 20], [2, 1], 0)
+    regime['downtrend'] = regime['voo'] < regime['sma200']
+    regime['risk_on'] = (regime['vix_level'] < 2) & ~regime['downtrend']
+    return regime
 
 class RiskManager:
     def __init__(self, data_store):
         self.store = data_store
         
-    def get_market_regime(self):
+    def get_regime_series(self, end_date=None):
         """
-        Determines if we are in 'Risk On' or 'Risk Off'
-        Returns a dict with signals.
+        Point-in-time regime for every day of the VIX / VOO history, in one vectorized pass.
+        Each row only uses data available at that day's close (VIX and VOO are
+        forward-filled onto the union of their dates; SMA200 is over VOO's own rows).
+        Columns: vix, voo, sma200, vix_level (0 normal, 1 elevated > 20, 2 high > 30),
+        downtrend (VOO < SMA200), risk_on.
         """
-        # Fetch Indicators
-        vix_df = self.store.load_prices('^VIX')
+        # Fetch Indicators (close only, both tickers in one query)
+        closes = self.store.load_price_matrix(['^VIX', 'VOO'], field='close', end_date=end_date, dtype='float64')
+        vix = closes['^VIX'].dropna()
+        voo = closes['VOO'].dropna()
         # tnx_df = self.store.load_prices('^TNX') # 10 Year Yield
         
+        regime = pd.DataFrame(index=vix.index.union(voo.index))
+        regime['vix'] = vix.reindex(regime.index).ffill()
+        regime['voo'] = voo.reindex(regime.index).ffill()
+        # Simple MA Cross on SPY (using VOO as proxy if SPY not in universe, but we have VOO)
+        regime['sma200'] = voo.rolling(200).mean().reindex(regime.index).ffill()
+        return classify_regime(regime)
+
+    def get_latest_levels(self):
+        """
+        Latest VIX close, VOO close and VOO SMA200 from the indicator table
+        (O(1) indexed lookups), or None if no indicators have been stored yet.
+        Indicators behind the latest stored prices are extended first.
+        """
+        voo = self.store.get_latest_indicators('VOO', ['close', 'sma_200'])
+        vix = self.store.get_latest_indicators('^VIX', ['close'])
+        if not voo and not vix:
+            return None
+        stale = [t for t, latest in [('VOO', voo), ('^VIX', vix)]
+                 if 'close' in latest and self.store.get_latest_date(t) not in (None, latest['close'][0])]
+        if stale:
+            update_indicators(self.store, stale)
+            voo = self.store.get_latest_indicators('VOO', ['close', 'sma_200'])
+            vix = self.store.get_latest_indicators('^VIX', ['close'])
+        return {
+            'vix': vix['close'][1] if 'close' in vix else np.nan,
+            'voo': voo['close'][1] if 'close' in voo else np.nan,
+            'sma200': voo['sma_200'][1] if 'sma_200' in voo else np.nan,
+        }
+
+    @staticmethod
+    def signals_at(regime, date=None):
+        """
+        Signals dict (as returned by get_market_regime) for the last regime row
+        at or before `date` (latest row if None).
+        """
         signals = {
             'risk_on': True,
             'warnings': []
         }
         
-        if not vix_df.empty:
-            current_vix = vix_df.iloc[-1]['close']
-            if current_vix > 30:
-                signals['risk_on'] = False
-                signals['warnings'].append(f"High Volatility (VIX={current_vix:.2f})")
-            elif current_vix > 20:
-                signals['warnings'].append(f"Elevated Volatility (VIX={current_vix:.2f})")
-                
-        # Simple MA Cross on SPY (using VOO as proxy if SPY not in universe, but we have VOO)
-        voo_df = self.store.load_prices('VOO')
-        if not voo_df.empty:
-            current_price = voo_df.iloc[-1]['close']
-            sma200 = voo_df['close'].rolling(200).mean().iloc[-1]
-            if current_price < sma200:
-                signals['risk_on'] = False
-                signals['warnings'].append("Market in Downtrend (Price < SMA200)")
+        if date is not None:
+            regime = regime.loc[:date]
+        if regime.empty:
+            return signals
+        row = regime.iloc[-1]
+        
+        if row['vix_level'] == 2:
+            signals['risk_on'] = False
+            signals['warnings'].append(f"High Volatility (VIX={row['vix']:.2f})")
+        elif row['vix_level'] == 1:
+            signals['warnings'].append(f"Elevated Volatility (VIX={row['vix']:.2f})")
+        
+        if row['downtrend']:
+            signals['risk_on'] = False
+            signals['warnings'].append("Market in Downtrend (Price < SMA200)")
                 
         return signals
+        
+    def get_market_regime(self):
+        """
+        Determines if we are in 'Risk On' or 'Risk Off'
+        Returns a dict with signals.
+        Reads the materialized indicators (see src/risk/indicators.py) when
+        available, otherwise computes the full regime series.
+        """
+        levels = self.get_latest_levels()
+        if levels is None:
+            return self.signals_at(self.get_regime_series())
+        return self.signals_at(classify_regime(pd.DataFrame([levels])))
 
     def adjust_weights(self, weights, signals):
         """
@@ -51,30 +117,30 @@ class RiskManager:
         print("Risk Off Signal Detected! Adjusting weights...")
         
         # Identify Equity and Bond tickers from Universe (hardcoded for now or fetch from DB asset class)
-        # Using a simple heuristic: VTI, VOO, VUG, VTV, VXUS, VWO, VEA are Equity
-        # BND, BIV, BLV, BSV, BNDX, VGIT are Bonds
-        
-        equity_tickers = [t for t in weights.index if t in ['VTI', 'VOO', 'VUG', 'VTV', 'VXUS', 'VWO', 'VEA', 'VNQ', 'GLD', 'GSG']]
-        bond_tickers = [t for t in weights.index if t in ['BND', 'BIV', 'BLV', 'BSV', 'BNDX', 'VGIT']]
+        is_equity = weights.index.isin(EQUITY_TICKERS)
+        is_bond = weights.index.isin(BOND_TICKERS)
         
-        if not bond_tickers:
+        if not is_bond.any():
             # If no bonds in portfolio, maybe cash? 
             # For now, just return weights but maybe we should warn.
             return weights
         
         # Reduce Equity by 50%, Reallocate to Bonds
-        total_equity = weights[equity_tickers].sum()
+        # (on the raw array: label lookups dominate the cost when run at every backtest rebalance)
+        values = weights.to_numpy(dtype=float, copy=True)
+        total_equity = values[is_equity].sum()
         if total_equity > 0:
             reduction = total_equity * 0.5
             # Reduce each equity proportionally
-            weights[equity_tickers] *= 0.5
+            values[is_equity] *= 0.5
             
             # Add to bonds proportionally
-            total_bonds = weights[bond_tickers].sum()
+            total_bonds = values[is_bond].sum()
             if total_bonds > 0:
-                weights[bond_tickers] += (reduction * (weights[bond_tickers] / total_bonds))
+                values[is_bond] += (reduction * (values[is_bond] / total_bonds))
             else:
                 # Distribute equally if starting from 0 (unlikely in opt but possible)
-                weights[bond_tickers] += (reduction / len(bond_tickers))
+                values[is_bond] += (reduction / is_bond.sum())
+            weights[:] = values
                 
         return weights
@@ -14,8 +14,115 @@ st.set_page_config(page_title="Portfolio Manager", layout="wide")
 
 st.title("Vanguard Portfolio Manager")
 
-store = DataStore()
-risk_mgr = RiskManager(store)
+# Caching layer
+# The store (engine + create_all) and risk manager live for the whole server
+# process. Data results are cached by their inputs plus the data versions
+# (latest date, row count) of the tickers they read, so new prices produce new
+# cache keys; "Force Update Now" clears everything explicitly.
+@st.cache_resource
+def get_store():
+    return DataStore()
+
+@st.cache_resource
+def get_risk_manager():
+    return RiskManager(get_store())
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_data_versions():
+    """
+    {ticker: (latest_date, row_count)}. Re-read at most once a minute so writes
+    from the nightly update process are picked up without a query per rerun.
+    """
+    return get_store().refresh_data_versions()
+
+def versions_of(tickers):
+    versions = load_data_versions()
+    return tuple(versions.get(t) for t in tickers)
+
+def month_end(frame):
+    try:
+        return frame.resample('ME').last()
+    except ValueError: # Fallback for older pandas
+        return frame.resample('M').last()
+
+@st.cache_data(show_spinner=False)
+def load_regime(versions):
+    return get_risk_manager().get_market_regime()
+
+@st.cache_data(show_spinner=False)
+def load_ytd_metrics(tickers, year, versions):
+    """
+    (ticker, last close, YTD return) for each ticker with data this year.
+    """
+    # YTD closes for all tickers in one query
+    closes = get_store().load_price_matrix(list(tickers), field='close', start_date=pd.Timestamp(year, 1, 1))
+    metrics = []
+    for t in tickers:
+        ytd_closes = closes[t].dropna()
+        if not ytd_closes.empty:
+            last_price = ytd_closes.iloc[-1]
+            start_price = ytd_closes.iloc[0]
+            ytd = (last_price / start_price) - 1
+            metrics.append((t, last_price, ytd))
+    return metrics
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_coverage(tickers):
+    return get_store().get_coverage(list(tickers))
+
+@st.cache_data(show_spinner=False)
+def load_asset_names():
+    return get_store().get_all_asset_names()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def run_backtest_cached(tickers, start_date, end_date, initial_cap, method, workers, cost_bps, risk_overlay, versions,
+                        estimator='sample'):
+    """
+    Backtest outputs for one set of inputs, with the display frames resampled once.
+    """
+    from src.engine.backtest import Backtester
+    bt = Backtester(get_store(), get_risk_manager() if risk_overlay else None)
+    curve, metrics, weights, stats = bt.run_backtest(list(tickers), start_date, end_date, initial_cap,
+                                                     strategy=method, workers=workers, cost_bps=cost_bps,
+                                                     estimator=estimator, return_stats=True)
+    if curve is None:
+        return {'error': metrics, 'stats': stats.to_dict()}
+    sim = bt.simulation
+    return {
+        'curve': curve,
+        'metrics': metrics,
+        # Resample to monthly to show only rebalance points
+        'weights': month_end(weights),
+        'realized': month_end(sim.weights),
+        'trades': pd.DataFrame({'Turnover': sim.turnover, 'Costs': sim.costs}),
+        'risk_adjustments': len(bt.risk_adjustments),
+        # Diagnostics of the run that filled this cache entry
+        'stats': stats.to_dict(),
+    }
+
+def show_run_diagnostics(stats):
+    """
+    Collapsible stage timings and counters of a RunStats dict.
+    """
+    with st.expander("Run diagnostics"):
+        from src.engine.profiling import stages_frame
+        stages = stages_frame(stats['stages'])
+        if not stages.empty:
+            st.caption(f"Run started {stats['started']}; stages can nest, so shares don't add up to 100%")
+            st.dataframe(stages.round({'seconds': 3, 'share': 3}))
+        counters = pd.Series(stats['counters'], dtype=float).rename('value')
+        if not counters.empty:
+            st.dataframe(counters.to_frame())
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def run_sweep_cached(asset_sets, methods, freqs, lookbacks, start_date, end_date, initial_cap, workers, cost_bps,
+                     versions):
+    from src.engine.sweep import expand_grid, run_sweep
+    configs = expand_grid({label: list(t) for label, t in asset_sets}, methods, freqs, lookbacks)
+    return run_sweep(get_store(), configs, start_date, end_date, initial_cap,
+                     workers=workers, keep_curves=True, cost_bps=cost_bps)
+
+store = get_store()
 
 # Sidebar
 st.sidebar.header("Navigation")
@@ -26,7 +133,7 @@ if page == "Dashboard":
     
     # Risk Regime
     st.subheader("Risk Regime Signals")
-    signals = risk_mgr.get_market_regime()
+    signals = load_regime(versions_of(['^VIX', 'VOO']))
     
     col1, col2 = st.columns(2)
     with col1:
@@ -45,22 +152,11 @@ if page == "Dashboard":
     st.header("Asset Universe Performance (YTD)")
     tickers = universe.CORE_PORTFOLIO
     
-    metrics = []
-    
-    for t in tickers:
-        df = store.load_prices(t)
-        if not df.empty:
-            last_price = df.iloc[-1]['close']
-            # YTD
-            start_year = df[df.index.year == pd.Timestamp.now().year]
-            if not start_year.empty:
-                start_price = start_year.iloc[0]['close']
-                ytd = (last_price / start_price) - 1
-                metrics.append((t, last_price, ytd))
+    metrics = load_ytd_metrics(tuple(tickers), pd.Timestamp.now().year, versions_of(tickers))
     
     # Display in columns
     # Fetch Asset Names
-    asset_names = store.get_all_asset_names()
+    asset_names = load_asset_names()
     
     cols = st.columns(len(metrics) if metrics else 1)
     for i, (t, p, y) in enumerate(metrics):
@@ -71,9 +167,6 @@ if page == "Dashboard":
 elif page == "Backtest":
     st.header("Strategy Simulator")
     
-    from src.engine.backtest import Backtester
-    bt = Backtester(store, risk_mgr)
-    
     col1, col2 = st.columns(2)
     
     # Load Preferences
@@ -105,46 +198,155 @@ elif page == "Backtest":
     with col1:
         start_date = st.date_input("Start Date", default_start)
         initial_cap = st.number_input("Initial Capital", value=default_cap)
+        cost_bps = st.number_input("Transaction Cost (bps)", min_value=0.0, value=0.0, step=1.0,
+                                   help="Proportional cost on traded notional at each rebalance")
     with col2:
         end_date = st.date_input("End Date", default_end)
-        method = st.selectbox("Optimization Method", ["max_sharpe", "min_volatility", "risk_parity"])
+        method = st.selectbox("Optimization Method", ["max_sharpe", "min_volatility", "risk_parity", "erc", "hrp"])
+        workers = st.number_input("Parallel Workers", min_value=1, max_value=os.cpu_count() or 1, value=1,
+                                  help="Optimize rebalance dates in parallel processes")
+        estimator = st.selectbox("Covariance Estimator", ["sample", "ledoit_wolf", "factor"],
+                                 help="Sample covariance, Ledoit-Wolf shrinkage or a 5-factor statistical model "
+                                      "(better conditioned for large universes)")
+        risk_overlay = st.checkbox("Apply Risk Regime Overlay", value=True,
+                                   help="Halve equity in favour of bonds on rebalance dates that were Risk Off (VIX > 30 or VOO < SMA200)")
         
     portfolio_selection = st.multiselect("Select Assets", universe.get_all_tickers(), default=default_assets)
+    mode = st.radio("Mode", ["Single backtest", "Compare configurations", "Efficient frontier"], horizontal=True)
     
-    if st.button("Run Backtest"):
-        # Save Preferences
-        store.set_preference("start_date", str(start_date))
-        store.set_preference("end_date", str(end_date))
-        store.set_preference("initial_cap", str(initial_cap))
-        store.set_preference("assets", json.dumps(portfolio_selection))
+    if mode == "Compare configurations":
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            sweep_methods = st.multiselect("Methods", ["max_sharpe", "min_volatility", "risk_parity", "erc", "hrp"],
+                                           default=["max_sharpe", "min_volatility", "risk_parity"])
+        with c2:
+            freq_labels = {"Monthly": "ME", "Quarterly": "QE", "Yearly": "YE", "Buy & Hold": None}
+            sweep_freqs = st.multiselect("Rebalance", list(freq_labels), default=["Monthly", "Quarterly"])
+        with c3:
+            sweep_lookbacks = st.multiselect("Lookback (years)", [1, 2, 3, 5], default=[1])
+        include_core = st.checkbox("Also run the Core Portfolio", value=False)
         
-        with st.spinner("Simulating..."):
-            curve, metrics, weights = bt.run_backtest(portfolio_selection, start_date, end_date, initial_cap, strategy=method)
+        if st.button("Run Comparison"):
+            asset_sets = [("Selected", tuple(portfolio_selection))]
+            if include_core:
+                asset_sets.append(("Core", tuple(universe.CORE_PORTFOLIO)))
+            # Kept across reruns so chart interactions redraw from the cache
+            st.session_state['sweep_params'] = dict(
+                asset_sets=tuple(asset_sets), methods=tuple(sweep_methods),
+                freqs=tuple(freq_labels[f] for f in sweep_freqs), lookbacks=tuple(sweep_lookbacks),
+                start_date=start_date, end_date=end_date, initial_cap=initial_cap, workers=int(workers),
+                cost_bps=cost_bps)
+        
+        params = st.session_state.get('sweep_params')
+        if params:
+            sweep_tickers = sorted({t for _, ts in params['asset_sets'] for t in ts})
+            with st.spinner("Simulating configurations..."):
+                results, curves = run_sweep_cached(**params, versions=versions_of(sweep_tickers))
+            
+            labels = [f"{r.assets} | {r.strategy} | {r.rebalance_freq or 'B&H'} | {r.lookback_years}y"
+                      for r in results.itertuples()]
+            st.subheader("Results")
+            st.dataframe(results.assign(Config=labels).set_index('Config').sort_values('Sharpe', ascending=False)
+                         .style.format({'Total Return': '{:.2%}', 'CAGR': '{:.2%}', 'Sharpe': '{:.2f}',
+                                        'Vol': '{:.2%}', 'Max Drawdown': '{:.2%}', 'Turnover': '{:.2f}',
+                                        'Cost Drag': '{:.2%}', 'Sortino': '{:.2f}', 'Calmar': '{:.2f}',
+                                        'Max Drawdown Duration': '{:.0f}', 'Turnover-adj Return': '{:.2%}'}))
             
-            if curve is not None:
+            import plotly.express as px
+            curves = curves.rename(columns=lambda i: labels[i])
+            fig = px.line(curves, title="Portfolio Value", labels={'value': 'Value ($)', 'index': 'Date'})
+            try:
+                 st.plotly_chart(fig, width="stretch")
+            except:
+                 st.plotly_chart(fig, use_container_width=True)
+    
+    elif mode == "Efficient frontier":
+        n_points = st.number_input("Frontier Points", min_value=5, max_value=200, value=40, step=5)
+        if st.button("Compute Frontier"):
+            st.session_state['frontier_params'] = dict(tickers=tuple(portfolio_selection), start_date=start_date,
+                                                       end_date=end_date, n_points=int(n_points))
+        
+        params = st.session_state.get('frontier_params')
+        if params:
+            from src.engine.frontier import efficient_frontier
+            from src.engine.backtest import select_prices
+            prices = select_prices(store.load_price_matrix(list(params['tickers']), 'adj_close',
+                                                           params['start_date'], params['end_date']),
+                                   params['tickers'])
+            if prices.shape[0] < 60 or prices.shape[1] < 2:
+                st.error("Need at least two assets with 60 common days of prices for a frontier")
+            else:
+                # Cached by the window's covariance, so chart interactions redraw instantly
+                frontier = efficient_frontier(prices, n_points=params['n_points'])
+                best = frontier.info['max_sharpe']
+                import plotly.express as px
+                points = pd.DataFrame({'Volatility': frontier.risks, 'Return': frontier.returns,
+                                       'Sharpe': (frontier.returns - 0.04) / frontier.risks})
+                fig = px.line(points, x='Volatility', y='Return', markers=True, hover_data=['Sharpe'],
+                              title="Efficient Frontier (annualized)")
+                returns = prices.pct_change().dropna()
+                fig.add_scatter(x=returns.std() * 252 ** 0.5, y=returns.mean() * 252, mode='markers+text',
+                                text=list(prices.columns), textposition='top center', name='Assets')
+                fig.add_scatter(x=[frontier.risks[best]], y=[frontier.returns[best]], mode='markers',
+                                marker=dict(size=14, symbol='star'), name='Max Sharpe')
+                fig.update_layout(xaxis_tickformat='.0%', yaxis_tickformat='.0%')
+                try:
+                     st.plotly_chart(fig, width="stretch")
+                except:
+                     st.plotly_chart(fig, use_container_width=True)
+                
+                point = st.slider("Frontier Point", 0, len(frontier.risks) - 1, value=best,
+                                  help="0 = minimum volatility")
+                f_cols = st.columns(3)
+                f_cols[0].metric("Return", f"{frontier.returns[point]:.2%}")
+                f_cols[1].metric("Volatility", f"{frontier.risks[point]:.2%}")
+                f_cols[2].metric("Sharpe Ratio", f"{(frontier.returns[point] - 0.04) / frontier.risks[point]:.2f}")
+                w = frontier.weights.iloc[point]
+                st.dataframe((w[w > 1e-4].sort_values(ascending=False) * 100).round(2).to_frame('Weight (%)'))
+                st.caption(f"{frontier.info['solves']} solves, {frontier.info['iterations']} pivots in "
+                           f"{frontier.info['seconds'] * 1000:.0f} ms"
+                           + (" (cached)" if frontier.info['cache_hit'] else ""))
+    
+    else:
+        if st.button("Run Backtest"):
+            # Save Preferences
+            store.set_preference("start_date", str(start_date))
+            store.set_preference("end_date", str(end_date))
+            store.set_preference("initial_cap", str(initial_cap))
+            store.set_preference("assets", json.dumps(portfolio_selection))
+            # Kept across reruns so chart interactions redraw from the cache
+            st.session_state['backtest_params'] = dict(
+                tickers=tuple(portfolio_selection), start_date=start_date, end_date=end_date,
+                initial_cap=initial_cap, method=method, workers=int(workers), cost_bps=cost_bps,
+                risk_overlay=risk_overlay, estimator=estimator)
+        
+        params = st.session_state.get('backtest_params')
+        if params:
+            # Regime inputs only matter with the overlay on
+            version_tickers = list(params['tickers']) + (['^VIX', 'VOO'] if params['risk_overlay'] else [])
+            with st.spinner("Simulating..."):
+                result = run_backtest_cached(**params, versions=versions_of(version_tickers))
+            
+            if 'error' not in result:
+                curve, metrics = result['curve'], result['metrics']
+                w_monthly = result['weights']
+                
                 # Allocation Over Time
                 st.subheader("Portfolio Allocation Over Time")
                 
                 # Fetch Names
-                asset_names = store.get_all_asset_names()
+                asset_names = load_asset_names()
                 
-                # Stacked Bar Chart
                 # Stacked Bar Chart
                 import plotly.express as px
                 # Transform for Plotly
-                # Resample to monthly to show only rebalance points
-                try:
-                    w_monthly = weights.resample('ME').last()
-                except ValueError: # Fallback for older pandas
-                    w_monthly = weights.resample('M').last()
-                
-                w_monthly.index.name = 'Date'
-                w_reset = w_monthly.reset_index().melt(id_vars='Date', var_name='Asset', value_name='Weight')
+                w_long = w_monthly.rename_axis('Date').reset_index().melt(id_vars='Date', var_name='Asset',
+                                                                          value_name='Weight')
                 
                 # Add Name column
-                w_reset['Name'] = w_reset['Asset'].map(lambda x: asset_names.get(x, x))
+                w_long['Name'] = w_long['Asset'].map(lambda x: asset_names.get(x, x))
                 
-                fig_alloc = px.bar(w_reset, x='Date', y='Weight', color='Asset', 
+                fig_alloc = px.bar(w_long, x='Date', y='Weight', color='Asset', 
                                    title="Portfolio Allocation Over Time",
                                    hover_data=['Name'])
                 
@@ -155,22 +357,33 @@ elif page == "Backtest":
                      st.plotly_chart(fig_alloc, use_container_width=True)
                 
                 with st.expander("See Allocation Data"):
-                    try:
-                        st.dataframe(weights.resample('ME').last())
-                    except ValueError:
-                        st.dataframe(weights.resample('M').last())
+                    st.dataframe(w_monthly)
+                
+                with st.expander("See Realized (Drifted) Weights & Trades"):
+                    st.dataframe(result['realized'])
+                    st.dataframe(result['trades'])
                 
                 st.divider()
 
                 st.subheader("Performance Metrics")
-                m_cols = st.columns(5)
+                if result['risk_adjustments']:
+                    st.caption(f"Risk Off adjustments applied on {result['risk_adjustments']} rebalance dates")
+                m_cols = st.columns(7)
                 m_cols[0].metric("Total Return", f"{metrics['Total Return']:.2%}")
                 m_cols[1].metric("CAGR", f"{metrics['CAGR']:.2%}")
                 m_cols[2].metric("Sharpe Ratio", f"{metrics['Sharpe']:.2f}")
                 m_cols[3].metric("Volatility", f"{metrics['Vol']:.2%}")
                 m_cols[4].metric("Max Drawdown", f"{metrics['Max Drawdown']:.2%}")
+                m_cols[5].metric("Turnover / yr", f"{metrics['Turnover']:.2f}x")
+                m_cols[6].metric("Cost Drag / yr", f"{metrics['Cost Drag']:.2%}")
+                m_cols = st.columns(7)
+                m_cols[0].metric("Sortino Ratio", f"{metrics['Sortino']:.2f}")
+                m_cols[1].metric("Calmar Ratio", f"{metrics['Calmar']:.2f}")
+                m_cols[2].metric("Longest Drawdown", f"{metrics['Max Drawdown Duration']:.0f} days",
+                                 help="Longest stretch below a previous peak, in trading days")
+                m_cols[3].metric("Turnover-adj. CAGR", f"{metrics['Turnover-adj Return']:.2%}",
+                                 help="CAGR minus 10 bps per unit of annual turnover")
                 
-                import plotly.express as px
                 fig = px.line(curve, title="Portfolio Value", labels={'value': 'Value ($)', 'index': 'Date'})
                 # Auto scale Y axis
                 fig.update_layout(yaxis=dict(autorange=True, fixedrange=False))
@@ -180,24 +393,47 @@ elif page == "Backtest":
                 except:
                      st.plotly_chart(fig, use_container_width=True)
             else:
-                st.error(metrics) # Error message
+                st.error(result['error']) # Error message
+            show_run_diagnostics(result['stats'])
 
 elif page == "Data Status":
     st.header("Database Status")
     
     tickers = universe.get_all_tickers()
-    status_data = []
+    # Whole universe from the coverage catalog in one query
+    coverage = load_coverage(tuple(tickers))
+    status = coverage.rename_axis("Ticker").rename(columns={
+        'first_date': "First Date", 'last_date': "Last Update", 'row_count': "Rows",
+        'gap_count': "Gaps", 'max_gap_days': "Longest Gap (days)",
+    })
     
-    for t in tickers:
-        last = store.get_latest_date(t)
-        status_data.append({"Ticker": t, "Last Update": last})
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Tickers With Data", f"{coverage['row_count'].notna().sum()} / {len(tickers)}")
+    c2.metric("Total Rows", f"{int(coverage['row_count'].sum()):,}")
+    c3.metric("Tickers With Gaps", int((coverage['gap_count'] > 0).sum()))
         
-    st.dataframe(pd.DataFrame(status_data))
+    st.dataframe(status)
     
     if st.button("Force Update Now"):
         with st.spinner("Updating..."):
             from src.data.fetcher import DataFetcher
             f = DataFetcher(store)
-            f.update_universe(tickers)
-        st.success("Update Complete!")
+            summary = f.update_universe(tickers, workers=4)
+            from src.risk.indicators import update_indicators
+            update_indicators(store)
+            # New prices: drop every cached result and re-read data versions
+            st.cache_data.clear()
+        st.success(f"Update Complete! {len(summary['updated'])} updated, "
+                   f"{len(summary['failed'])} failed, {summary['rows']} rows in {summary['seconds']:.1f}s.")
         st.experimental_rerun()
+    
+    st.divider()
+    st.subheader("Backtest Result Cache")
+    cache = store.backtest_cache_stats()
+    b1, b2 = st.columns(2)
+    b1.metric("Cached Runs", cache['entries'])
+    b2.metric("Size", f"{cache['bytes'] / 2**20:.1f} / {cache['max_bytes'] / 2**20:.0f} MB")
+    if st.button("Purge Backtest Cache"):
+        removed = store.purge_backtest_cache()
+        st.cache_data.clear()
+        st.success(f"Removed {removed} cached backtest runs.")
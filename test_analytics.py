@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from src.engine.analytics import METRICS, performance_metrics, rolling_sharpe
+
+def make_curves(n, days=800, seed=3):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2015-01-01", periods=days)
+    returns = rng.normal(0.0004, 0.01, (days, n))
+    return pd.DataFrame(10000 * np.cumprod(1 + returns, axis=0), index=index,
+                        columns=[f"c{i}" for i in range(n)])
+
+def test_matches_pandas_formulas():
+    print("Testing batched metrics against per-curve pandas formulas...")
+    curves = make_curves(25)
+    metrics = performance_metrics(curves, initial_value=10000)
+    assert list(metrics.columns) == METRICS and list(metrics.index) == list(curves.columns)
+    years = (curves.index[-1] - curves.index[0]).days / 365.25
+    for name, curve in curves.items():
+        returns = curve.pct_change().iloc[1:]
+        expected = {
+            'Total Return': curve.iloc[-1] / 10000 - 1,
+            'CAGR': (curve.iloc[-1] / 10000) ** (1 / years) - 1,
+            'Sharpe': (returns.mean() / returns.std()) * (252 ** 0.5),
+            'Vol': returns.std() * (252 ** 0.5),
+            'Max Drawdown': (curve / curve.cummax() - 1).min(),
+        }
+        # Bit-identical, so run_backtest's metrics are unchanged
+        for key, value in expected.items():
+            assert metrics.loc[name, key] == value, (name, key)
+        downside = np.sqrt((returns.clip(upper=0) ** 2).mean())
+        assert np.isclose(metrics.loc[name, 'Sortino'], returns.mean() / downside * 252 ** 0.5)
+        assert np.isclose(metrics.loc[name, 'Calmar'], expected['CAGR'] / -expected['Max Drawdown'])
+
+    # Chunking and the returns form give the same numbers
+    assert performance_metrics(curves, initial_value=10000, chunk_size=4).equals(metrics)
+    returns = curves.pct_change().iloc[1:].to_numpy()
+    from_returns = performance_metrics(returns, kind='returns')
+    assert np.allclose(from_returns['Max Drawdown'], metrics['Max Drawdown'])
+    assert np.allclose(from_returns['Sharpe'], metrics['Sharpe'])
+    print("Batched Metrics Test Passed!")
+
+def test_drawdown_duration_and_turnover():
+    print("Testing drawdown duration and turnover-adjusted return...")
+    # Peaks at rows 1 and 6; the longest stretch below a peak is rows 2-5
+    values = np.array([[100, 110, 100, 90, 95, 105, 120, 115]], dtype=float).T
+    metrics = performance_metrics(values, turnover=[4.0], periods_per_year=7, turnover_cost_bps=50)
+    row = metrics.iloc[0]
+    assert row['Max Drawdown Duration'] == 4
+    assert np.isclose(row['Max Drawdown'], 90 / 110 - 1)
+    assert row['Turnover'] == 4.0  # 7 periods = one year
+    assert np.isclose(row['Turnover-adj Return'], row['CAGR'] - 4.0 * 50 / 1e4)
+    assert np.isnan(row['Cost Drag'])
+    print("Drawdown Duration Test Passed!")
+
+def test_rolling_sharpe():
+    print("Testing rolling Sharpe...")
+    curves = make_curves(3, days=300)
+    rolled = rolling_sharpe(curves, window=60)
+    returns = curves.pct_change()
+    expected = returns.rolling(60).mean() / returns.rolling(60).std() * 252 ** 0.5
+    assert rolled.isna().equals(expected.isna())
+    assert np.allclose(rolled.to_numpy(), expected.to_numpy(), equal_nan=True)
+    print("Rolling Sharpe Test Passed!")
+
+if __name__ == "__main__":
+    test_matches_pandas_formulas()
+    test_drawdown_duration_and_turnover()
+    test_rolling_sharpe()
@@ -0,0 +1,316 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from src.data.store import DataStore
+from src.engine.backtest import Backtester
+
+def make_store(tmp, tickers=('VTI', 'VXUS', 'BND'), start="2018-01-01", end="2022-12-30", seed=7):
+    store = DataStore(os.path.join(tmp, 'test.db'))
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, end)
+    for i, t in enumerate(tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0002 * (i + 1), 0.01 / (i + 1), len(index))))
+        store.store_prices(t, pd.DataFrame({'Close': close, 'Adj Close': close, 'Volume': 1}, index=index))
+    return store
+
+def test_parallel_matches_sequential():
+    print("Testing parallel walk-forward optimization...")
+    with tempfile.TemporaryDirectory() as tmp:
+        bt = Backtester(make_store(tmp))
+        args = (['VTI', 'VXUS', 'BND'], "2019-01-01", "2022-12-30")
+        curve, metrics, weights = bt.run_backtest(*args)
+        curve_t, metrics_t, weights_t = bt.run_backtest(*args, workers=2, executor='thread')
+        curve_p, metrics_p, weights_p = bt.run_backtest(*args, workers=2, executor='process')
+        # Deterministic for a given worker count, whichever pool runs it
+        assert curve_p.equals(curve_t)
+        assert weights_p.equals(weights_t)
+        # Chunks warm-start from equal weight instead of the previous date,
+        # so parallel runs match sequential ones within solver tolerance
+        assert np.allclose(curve_p, curve, rtol=1e-3)
+        assert np.allclose(weights_p, weights, atol=0.02)
+    print("Parallel Backtest Test Passed!")
+
+def test_sweep_matches_single_runs():
+    print("Testing parameter sweep...")
+    from src.engine.sweep import expand_grid, run_sweep
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        bt = Backtester(store)
+        configs = expand_grid({'all': ['VTI', 'VXUS', 'BND'], 'stocks': ['VTI', 'VXUS']},
+                              strategies=['max_sharpe', 'min_volatility'], rebalance_freqs=['ME', 'QE'],
+                              lookbacks=[1, 2])
+        assert len(configs) == 16
+        results, curves = run_sweep(store, configs, "2019-01-01", "2022-12-30", workers=2, keep_curves=True)
+        assert len(results) == 16 and results['error'].isna().all()
+        assert list(curves.columns) == list(results.index)
+        for i in [0, 5, 10, 15]:
+            c = configs[i]
+            curve, metrics, _ = bt.run_backtest(c['tickers'], "2019-01-01", "2022-12-30", strategy=c['strategy'],
+                                                rebalance_freq=c['rebalance_freq'], lookback_years=c['lookback_years'])
+            assert np.allclose(curves[i].dropna(), curve)
+            assert np.isclose(results.loc[i, 'Sharpe'], metrics['Sharpe'])
+    print("Sweep Test Passed!")
+
+def test_drift_simulator():
+    print("Testing drift-aware simulator...")
+    from src.engine.simulator import simulate_portfolio
+    index = pd.bdate_range("2021-01-04", periods=4)
+    prices = pd.DataFrame({'A': [100, 110, 121, 121], 'B': [100, 100, 100, 50]}, index=index, dtype=float)
+
+    # One rebalance, no costs: plain buy & hold, weights drift with prices
+    sim = simulate_portfolio(prices, [index[0]], [[0.5, 0.5]], initial_capital=1000)
+    assert np.allclose(sim.value, [1000, 1050, 1105, 855])
+    assert np.allclose(sim.weights['A'], [0.5, 550 / 1050, 605 / 1105, 605 / 855])
+    assert np.allclose(sim.turnover, [1.0])
+
+    # Rebalance back to 50/50 on day 3 with 10bps + 1 per trade
+    sim = simulate_portfolio(prices, [index[0], index[2]], [[0.5, 0.5], [0.5, 0.5]], initial_capital=1000,
+                             cost_bps=10, fixed_cost=1)
+    pre_trade = 997 * (0.5 * 1.21 + 0.5)
+    trade = 997 * 0.5 * 1.21 - pre_trade / 2
+    assert np.allclose(sim.costs, [1000 * 0.001 + 2, 2 * trade * 0.001 + 2])
+    value_day3 = pre_trade - sim.costs.iloc[1]
+    assert np.isclose(sim.value.iloc[2], value_day3)
+    assert np.isclose(sim.value.iloc[3], value_day3 * 0.75)
+    assert np.allclose(sim.weights.iloc[2], [0.5, 0.5])
+
+    # Costs show up in the backtest metrics
+    with tempfile.TemporaryDirectory() as tmp:
+        bt = Backtester(make_store(tmp))
+        args = (['VTI', 'VXUS', 'BND'], "2019-01-01", "2022-12-30")
+        _, free, _ = bt.run_backtest(*args, strategy='risk_parity')
+        _, costly, _ = bt.run_backtest(*args, strategy='risk_parity', cost_bps=25)
+        assert free['Cost Drag'] == 0 and costly['Cost Drag'] > 0
+        assert costly['Total Return'] < free['Total Return']
+        assert np.isclose(free['Turnover'], costly['Turnover'], rtol=1e-2)
+        assert bt.simulation.costs.iloc[0] > 0
+    print("Drift Simulator Test Passed!")
+
+def test_regime_series_in_backtest():
+    print("Testing point-in-time risk regime...")
+    from src.risk.signals import RiskManager
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp, tickers=('VTI', 'BND', 'VOO'))
+        index = pd.bdate_range("2018-01-01", "2022-12-30")
+        vix = pd.Series(15.0, index=index)
+        vix["2020-03-02":"2020-05-29"] = 40.0
+        vix["2021-06-01":"2021-06-30"] = 25.0
+        store.store_prices('^VIX', pd.DataFrame({'Close': vix, 'Adj Close': vix, 'Volume': 0}))
+        rm = RiskManager(store)
+
+        regime = rm.get_regime_series()
+        assert (regime.loc["2020-03-02":"2020-05-29", 'vix_level'] == 2).all()
+        assert not regime.loc["2020-04-15", 'risk_on']
+        assert (regime.loc["2021-06-01":"2021-06-30", 'vix_level'] == 1).all()
+        assert regime['sma200'].iloc[:199].isna().all()
+        # No lookahead: a series cut at a date matches the full one up to it
+        cut = rm.get_regime_series(end_date="2020-04-15")
+        assert cut.equals(regime.loc[:"2020-04-15"])
+        assert rm.signals_at(regime) == rm.get_market_regime()
+        assert "High Volatility" in rm.signals_at(regime, "2020-04-15")['warnings'][0]
+
+        args = (['VTI', 'BND'], "2019-01-01", "2022-12-30")
+        _, _, plain = Backtester(store).run_backtest(*args, strategy='risk_parity')
+        bt = Backtester(store, rm)
+        _, _, adjusted = bt.run_backtest(*args, strategy='risk_parity')
+        off_dates = [a['date'] for a in bt.risk_adjustments]
+        assert pd.Timestamp("2020-03-31") in off_dates
+        for d in off_dates:
+            assert np.isclose(adjusted.loc[d, 'VTI'], plain.loc[d, 'VTI'] * 0.5)
+            assert np.isclose(adjusted.loc[d].sum(), 1)
+            assert not regime.loc[:d].iloc[-1]['risk_on']
+        on_dates = [d for d in bt.simulation.turnover.index if d not in off_dates]
+        assert np.allclose(adjusted.loc[on_dates], plain.loc[on_dates])
+    print("Risk Regime Test Passed!")
+
+def test_indicator_store():
+    print("Testing materialized indicators...")
+    from src.risk.indicators import update_indicators, compute_indicators
+    from src.risk.signals import RiskManager
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp, tickers=('VOO',), end="2021-12-31")
+        index = pd.bdate_range("2018-01-01", "2021-12-31")
+        vix = pd.Series(np.linspace(12, 35, len(index)), index=index)
+        store.store_prices('^VIX', pd.DataFrame({'Close': vix, 'Adj Close': vix, 'Volume': 0}))
+        rm = RiskManager(store)
+        assert rm.get_latest_levels() is None
+        from_series = rm.get_market_regime()
+
+        written = update_indicators(store)
+        assert written['^VIX'] == len(index)
+        assert rm.get_market_regime() == from_series
+        assert update_indicators(store) == {'VOO': 0, '^VIX': 0}
+
+        # New bars: only they are computed and stored, matching a full recompute
+        more = pd.bdate_range("2022-01-03", "2022-03-31")
+        close = 150 * np.exp(np.cumsum(np.full(len(more), -0.01)))
+        store.store_prices('VOO', pd.DataFrame({'Close': close, 'Adj Close': close, 'Volume': 1}, index=more))
+        written = update_indicators(store, ['VOO'])
+        assert written['VOO'] == 5 * len(more)
+        full = compute_indicators(store.load_price_matrix(['VOO'], 'close', dtype='float64')['VOO'],
+                                  ['close', 'sma_50', 'sma_200', 'vol_20', 'mom_252'])
+        stored = store.load_indicators('VOO')
+        assert np.allclose(stored[full.columns].loc["2022"], full.loc["2022"])
+        latest = store.get_latest_indicators('VOO', ['sma_200'])
+        assert latest['sma_200'][0] == more[-1].date()
+
+        # Prices newer than the indicators are picked up on read
+        store.store_prices('VOO', pd.DataFrame({'Close': [50.0], 'Adj Close': [50.0], 'Volume': 1},
+                                               index=[pd.Timestamp("2022-04-01")]))
+        levels = rm.get_latest_levels()
+        assert levels['voo'] == 50.0
+        assert rm.get_market_regime() == rm.signals_at(rm.get_regime_series())
+    print("Indicator Store Test Passed!")
+
+def test_run_stats():
+    print("Testing backtest run stats...")
+    import json
+    with tempfile.TemporaryDirectory() as tmp:
+        bt = Backtester(make_store(tmp))
+        args = (['VTI', 'VXUS', 'BND'], "2019-01-01", "2022-12-30")
+        log = os.path.join(tmp, 'stats.jsonl')
+        curve, metrics, weights, stats = bt.run_backtest(*args, return_stats=True)
+        stats.emit(log)
+        print(stats.stages_frame())
+        assert stats is bt.stats
+        assert {'total', 'load_prices', 'windows', 'optimize', 'simulate', 'store.load_price_matrix'} <= set(stats.stages)
+        counters = stats.counters
+        assert counters['solver_calls'] == len(bt.solver_stats)
+        assert counters['solver_iterations'] == sum(s['iterations'] for s in bt.solver_stats)
+        assert counters['rows_read'] == 3 * len(pd.bdate_range("2019-01-01", "2022-12-30"))
+        assert counters['cache_misses'] == 1 and 'cache_hits' not in counters
+
+        # Same inputs again: the panel comes from the cache; pool solves are counted in the parent
+        _, _, _, again = bt.run_backtest(*args, workers=2, executor='process', return_stats=True)
+        again.emit(log)
+        assert again.counters['cache_hits'] == 1 and 'rows_read' not in again.counters
+        assert again.counters['solver_calls'] == len(bt.solver_stats)
+
+        with open(log) as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == 2 and lines[0]['name'] == 'backtest'
+        assert lines[0]['context']['assets'] == 3
+    print("Run Stats Test Passed!")
+
+def test_backtest_result_cache():
+    print("Testing persistent backtest result cache...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        args = (['VTI', 'VXUS', 'BND'], "2019-01-01", "2022-12-30")
+        bt = Backtester(store)
+        curve, metrics, weights, stats = bt.run_backtest(*args, cost_bps=5, return_stats=True)
+        sim = bt.simulation
+        assert stats.counters['result_cache_misses'] == 1
+        assert store.backtest_cache_stats()['entries'] == 1
+
+        # A new Backtester (e.g. after an app restart) gets the stored run back unchanged
+        fresh = Backtester(DataStore(os.path.join(tmp, 'test.db')))
+        curve_c, metrics_c, weights_c, stats_c = fresh.run_backtest(*args, cost_bps=5, return_stats=True)
+        assert stats_c.counters['result_cache_hits'] == 1 and 'solver_calls' not in stats_c.counters
+        assert curve_c.equals(curve) and weights_c.equals(weights)
+        assert metrics_c == metrics
+        for a, b in zip(fresh.simulation, sim):
+            assert a.equals(b)
+        assert fresh.solver_stats_frame().equals(bt.solver_stats_frame())
+
+        # Other inputs, or new prices for one of the tickers, miss
+        _, _, _, stats = bt.run_backtest(*args, cost_bps=10, return_stats=True)
+        assert 'result_cache_hits' not in stats.counters
+        close = pd.Series([100.0], index=[pd.Timestamp("2023-01-03")])
+        store.store_prices('BND', pd.DataFrame({'Close': close, 'Adj Close': close}))
+        _, _, _, stats = bt.run_backtest(*args, cost_bps=5, return_stats=True)
+        assert 'result_cache_hits' not in stats.counters
+        assert store.backtest_cache_stats()['entries'] == 3
+
+        # Least recently used entries go once the size budget is exceeded
+        store.backtest_cache_bytes = int(store.backtest_cache_stats()['bytes'] * 0.8)
+        bt.run_backtest(*args, cost_bps=20)
+        assert store.backtest_cache_stats()['bytes'] <= store.backtest_cache_bytes
+        assert store.backtest_cache_stats()['entries'] == 2
+
+        assert store.purge_backtest_cache() == 2
+        assert store.backtest_cache_stats()['entries'] == 0
+    print("Backtest Result Cache Test Passed!")
+
+def test_covariance_estimator_option():
+    print("Testing backtests with covariance estimators...")
+    with tempfile.TemporaryDirectory() as tmp:
+        bt = Backtester(make_store(tmp))
+        args = (['VTI', 'VXUS', 'BND'], "2019-01-01", "2022-12-30")
+        sample = bt.run_backtest(*args, strategy='min_volatility')
+        for estimator, factors in [('ledoit_wolf', None), ('factor', 2), ('factor', ['VTI'])]:
+            curve, metrics, weights = bt.run_backtest(*args, strategy='min_volatility', estimator=estimator,
+                                                      factors=factors)
+            assert curve is not None and np.allclose(weights.sum(axis=1).iloc[-1], 1)
+            assert not curve.equals(sample[0]), estimator
+        # A different estimator is a different cache entry
+        assert bt.store.backtest_cache_stats()['entries'] == 4
+
+        # Factor frames are keyed by their values, not their (truncated) repr
+        frame = bt.store.load_price_matrix(['VTI'], 'adj_close').pct_change()
+        other = frame.copy()
+        other.iloc[len(other) // 2] += 0.01
+        assert repr(other) == repr(frame)
+        for f in [frame, other, frame]:
+            bt.run_backtest(*args, strategy='min_volatility', estimator='factor', factors=f)
+        assert bt.store.backtest_cache_stats()['entries'] == 6
+
+        # A factor that starts mid-backtest: windows it doesn't cover fall back to equal weight
+        late = pd.bdate_range("2021-06-01", "2022-12-30")
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.01, len(late))))
+        bt.store.store_prices('VOO', pd.DataFrame({'Close': close, 'Adj Close': close, 'Volume': 1}, index=late))
+        curve, metrics, weights, stats = bt.run_backtest(*args, strategy='min_volatility', estimator='factor',
+                                                         factors=['VOO'], return_stats=True)
+        assert curve is not None
+        failures = stats.counters['optimization_failures']
+        assert 0 < failures < stats.counters['rebalances']
+        assert np.allclose(weights.loc["2020-06-30"], 1 / 3)
+        # An unknown factor ticker is reported before any window is solved
+        curve, message, _ = bt.run_backtest(*args, estimator='factor', factors=['NOPE'])
+        assert curve is None and 'NOPE' in message
+    print("Covariance Estimator Backtest Test Passed!")
+
+def test_incremental_extension():
+    print("Testing incremental backtest extension...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        tickers = ['VTI', 'VXUS', 'BND']
+        kwargs = dict(rebalance_freq='M', strategy='max_sharpe', cost_bps=5, fixed_cost=1)
+        dates = store.load_price_matrix(tickers).loc["2020-06-10":].index
+        bt = Backtester(store)
+        state, curve, metrics, weights = bt.start_backtest(tickers, "2019-01-01", dates[0], **kwargs)
+        bt.save_state('daily', state)
+
+        # Day by day across month ends (state reloaded each day), then in bigger steps
+        steps = list(dates[1:45]) + list(dates[45::20]) + [dates[-1]]
+        for end in steps:
+            curve, metrics, weights = bt.extend_saved('daily', end)
+            full = Backtester(store)
+            full_curve, full_metrics, full_weights = full.run_backtest(
+                tickers, "2019-01-01", end, use_cache=False, **kwargs)
+            assert curve.equals(full_curve), end
+            assert metrics == full_metrics, end
+            assert weights.equals(full_weights.loc[weights.index]), end
+
+        state = bt.load_state('daily')
+        assert state.last_date == dates[-1] and list(store.list_backtest_states()['name']) == ['daily']
+        assert state.calc_count == len(full.simulation.turnover)
+        assert state.turnover.equals(full.simulation.turnover)
+        # Nothing new: same outputs, no solves
+        curve_again, metrics_again, _ = bt.extend_backtest(state)
+        assert curve_again.equals(curve) and metrics_again == metrics
+        assert 'solver_calls' not in bt.stats.counters
+        assert store.delete_backtest_state('daily')
+    print("Incremental Extension Test Passed!")
+
+if __name__ == "__main__":
+    test_parallel_matches_sequential()
+    test_sweep_matches_single_runs()
+    test_drift_simulator()
+    test_regime_series_in_backtest()
+    test_indicator_store()
+    test_run_stats()
+    test_backtest_result_cache()
+    test_covariance_estimator_option()
+    test_incremental_extension()
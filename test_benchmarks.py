@@ -0,0 +1,42 @@
+import json
+import os
+import tempfile
+import numpy as np
+from benchmarks.synthetic import synthetic_prices
+from benchmarks import run
+
+def test_synthetic_prices():
+    print("Testing synthetic price generator...")
+    prices, market = synthetic_prices(20, years=4, market_corr=0.3, sector_corr=0.2, n_sectors=10, seed=1)
+    again, _ = synthetic_prices(20, years=4, market_corr=0.3, sector_corr=0.2, n_sectors=10, seed=1)
+    assert prices.equals(again)
+    assert prices.shape == (1008, 20) and len(market) == 1008
+
+    corr = np.log(prices).diff().dropna().corr().to_numpy()
+    sector = np.arange(20) % 10
+    same = (sector[:, None] == sector[None, :]) & ~np.eye(20, dtype=bool)
+    print(f"Same sector {corr[same].mean():.2f}, different {corr[sector[:, None] != sector[None, :]].mean():.2f}")
+    assert abs(corr[same].mean() - 0.5) < 0.05
+    assert abs(corr[sector[:, None] != sector[None, :]].mean() - 0.3) < 0.05
+    print("Synthetic Prices Test Passed!")
+
+def test_benchmark_suite():
+    print("Testing benchmark suite (smoke run)...")
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, 'first.json')
+        assert run.main(['--sizes', '3', '--years', '3', '--repeat', '1', '--output', first]) == 0
+        with open(first) as f:
+            out = json.load(f)
+        names = {r['name'] for r in out['results']}
+        assert {'store.store_prices', 'optimize.hrp', 'backtest.max_sharpe', 'risk.get_market_regime'} <= names
+        assert all('median' in r for r in out['results']), out['results']
+        assert out['meta']['args']['sizes'] == [3]
+
+        # A run can be compared against the last one
+        second = os.path.join(tmp, 'second.json')
+        run.main(['--sizes', '3', '--years', '3', '--repeat', '1', '--output', second, '--compare', first])
+    print("Benchmark Suite Test Passed!")
+
+if __name__ == "__main__":
+    test_synthetic_prices()
+    test_benchmark_suite()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from src.data.store import DataStore
+from src.data.fetcher import DataFetcher
+
+class FakeProvider:
+    """
+    Offline stand-in for yf.download returning (Price, Ticker) columns like yfinance.
+    Tickers in `broken` always raise; `flaky` ones fail on their first call.
+    """
+    def __init__(self, broken=(), flaky=()):
+        self.broken = set(broken)
+        self.flaky = set(flaky)
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers, start=None, period=None, progress=False, auto_adjust=True):
+        batch = [tickers] if isinstance(tickers, str) else list(tickers)
+        with self.lock:
+            self.calls.append(batch)
+            first_call = sum(1 for c in self.calls if c == batch) == 1
+        if self.broken & set(batch):
+            raise RuntimeError(f"no data for {sorted(self.broken & set(batch))}")
+        if first_call and self.flaky & set(batch):
+            raise RuntimeError("rate limited")
+
+        index = pd.bdate_range(start or "2020-01-01", "2020-03-31")
+        frames = {}
+        for i, t in enumerate(batch):
+            close = 100 + i + np.arange(len(index), dtype=float)
+            for field in ['Open', 'High', 'Low', 'Close']:
+                frames[(field, t)] = close
+            frames[('Volume', t)] = np.full(len(index), 1000)
+        return pd.DataFrame(frames, index=index)
+
+def test_concurrent_update():
+    print("Testing concurrent universe update...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DataStore(os.path.join(tmp, 'test.db'))
+        tickers = [f"T{i}" for i in range(12)] + ['BAD']
+        provider = FakeProvider(broken=['BAD'], flaky=['T0'])
+        fetcher = DataFetcher(store, download=provider, info=False)
+
+        summary = fetcher.update_universe(tickers, workers=4, batch_size=5, rate=0, backoff=0)
+        print(summary)
+        assert len(summary['updated']) == 12
+        assert list(summary['failed']) == ['BAD']
+        rows = len(pd.bdate_range("2020-01-01", "2020-03-31"))
+        assert summary['rows'] == 12 * rows
+        for t in tickers[:-1]:
+            assert len(store.load_prices(t)) == rows
+        # Batched: far fewer provider calls than tickers on the happy path
+        assert any(len(c) > 1 for c in provider.calls)
+        # Writes and downloads on worker threads are counted in the run's stats
+        counters = summary['stats']['counters']
+        assert counters['rows_written'] == summary['rows']
+        assert counters['download_calls'] == len(provider.calls)
+
+        # Second run finds nothing new after the last stored date
+        provider.calls.clear()
+        summary = fetcher.update_universe(tickers[:-1], workers=4, batch_size=5, rate=0, backoff=0)
+        assert summary['rows'] == 0 and not summary['failed']
+
+    print("Concurrent Update Test Passed!")
+
+def test_sequential_update():
+    print("Testing sequential universe update...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DataStore(os.path.join(tmp, 'test.db'))
+        fetcher = DataFetcher(store, download=FakeProvider(broken=['BAD']), info=False)
+        summary = fetcher.update_universe(['AAA', 'BAD'])
+        assert summary['updated'] == ['AAA']
+        assert list(summary['failed']) == ['BAD']
+    print("Sequential Update Test Passed!")
+
+def test_update_write_failure():
+    print("Testing failed writes during an update...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DataStore(os.path.join(tmp, 'test.db'))
+        def broken_begin():
+            raise RuntimeError("database is locked")
+        store.engine.begin = broken_begin
+        fetcher = DataFetcher(store, download=FakeProvider(), info=False)
+        for workers in [1, 2]:
+            summary = fetcher.update_universe(['A', 'B', 'C'], workers=workers, rate=0, backoff=0)
+            print(summary)
+            assert summary['updated'] == [] and summary['rows'] == 0
+            assert sorted(summary['failed']) == ['A', 'B', 'C']
+            assert all('database is locked' in err for err in summary['failed'].values())
+    print("Write Failure Test Passed!")
+
+if __name__ == "__main__":
+    test_concurrent_update()
+    test_sequential_update()
+    test_update_write_failure()
@@ -0,0 +1,278 @@
+import numpy as np
+import pandas as pd
+from src.engine.moments import RollingMoments, moments_from_returns
+from src.engine.optimization import optimize_portfolio, get_returns
+
+def make_prices(n_assets=5, periods=600, seed=3):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2020-01-01", periods=periods)
+    drift = np.linspace(0.0001, 0.0006, n_assets)
+    vol = np.linspace(0.004, 0.015, n_assets)
+    rets = rng.normal(drift, vol, (periods, n_assets))
+    return pd.DataFrame(100 * np.exp(np.cumsum(rets, axis=0)), index=index,
+                        columns=[f"A{i}" for i in range(n_assets)])
+
+def test_rolling_moments():
+    print("Testing rolling moments...")
+    returns = get_returns(make_prices())
+    rolling = RollingMoments(returns, refresh_every=100)
+    for lo in range(0, 330, 21):
+        m = rolling.window(lo, lo + 252)
+        ref = moments_from_returns(returns.iloc[lo:lo + 252])
+        assert m.count == 252
+        assert np.allclose(m.mean, ref.mean, rtol=1e-10, atol=1e-14)
+        assert np.allclose(m.cov, ref.cov, rtol=1e-8, atol=1e-14)
+    print("Rolling Moments Test Passed!")
+
+def test_optimize_with_moments():
+    print("Testing optimize_portfolio with precomputed moments...")
+    prices = make_prices()
+    moments = moments_from_returns(get_returns(prices))
+    for method in ['max_sharpe', 'min_volatility', 'risk_parity']:
+        from_prices = optimize_portfolio(prices, method=method)
+        from_moments = optimize_portfolio(method=method, moments=moments)
+        assert abs(from_moments.sum() - 1) < 1e-9
+        assert np.allclose(from_prices, from_moments, atol=1e-8)
+    print("Optimize With Moments Test Passed!")
+
+def test_gradients_and_warm_start():
+    print("Testing analytic gradients and warm starts...")
+    from scipy.optimize import check_grad
+    from src.engine.optimization import (neg_sharpe_ratio, neg_sharpe_ratio_grad,
+                                         portfolio_volatility, portfolio_volatility_grad)
+    moments = moments_from_returns(get_returns(make_prices()))
+    mu, cov = moments.mean.to_numpy(), moments.cov.to_numpy()
+    w = np.array([0.1, 0.3, 0.2, 0.25, 0.15])
+    assert check_grad(neg_sharpe_ratio, neg_sharpe_ratio_grad, w, mu, cov, 0.04) < 1e-5
+    assert check_grad(portfolio_volatility, portfolio_volatility_grad, w, mu, cov) < 1e-5
+
+    for method in ['max_sharpe', 'min_volatility']:
+        cold, cold_info = optimize_portfolio(method=method, moments=moments, return_info=True)
+        warm, warm_info = optimize_portfolio(method=method, moments=moments, initial_weights=cold, return_info=True)
+        print(method, cold_info['iterations'], warm_info['iterations'])
+        assert warm_info['iterations'] <= cold_info['iterations']
+        assert np.allclose(cold, warm, atol=1e-3)
+    print("Gradients And Warm Start Test Passed!")
+
+def test_qp_solver():
+    print("Testing QP solver backend...")
+    from src.engine.optimization import portfolio_volatility, neg_sharpe_ratio
+    from src.engine.solvers import solve_qp
+    moments = moments_from_returns(get_returns(make_prices(n_assets=8)))
+    mu, cov = moments.mean.to_numpy(), moments.cov.to_numpy()
+    objectives = {
+        'min_volatility': lambda w: portfolio_volatility(w, mu, cov),
+        'max_sharpe': lambda w: neg_sharpe_ratio(w, mu, cov, 0.04),
+    }
+    for method, objective in objectives.items():
+        qp, qp_info = optimize_portfolio(method=method, moments=moments, solver='qp', return_info=True)
+        slsqp, slsqp_info = optimize_portfolio(method=method, moments=moments, solver='slsqp', return_info=True)
+        print(method, qp_info['iterations'], slsqp_info['iterations'])
+        assert qp_info['solver'] == 'qp' and qp_info['converged']
+        assert slsqp_info['solver'] == 'slsqp'
+        # The exact QP is never worse than SLSQP
+        assert objective(qp.to_numpy()) <= objective(slsqp.to_numpy()) + 1e-9
+
+    # Nothing beats the risk-free rate: max_sharpe has no QP form, 'auto' falls back
+    bad = moments._replace(mean=moments.mean * 0 - 0.001)
+    w, info = optimize_portfolio(method='max_sharpe', moments=bad, return_info=True)
+    assert info['solver'] == 'slsqp' and info['fallback_from'] == 'infeasible'
+    try:
+        optimize_portfolio(method='max_sharpe', moments=bad, solver='qp')
+        assert False, "expected the QP-only solve to fail"
+    except ValueError:
+        pass
+
+    # Raw solver: infeasible equality is reported, not hidden
+    result = solve_qp(np.eye(2), [[-1.0, -1.0]], [1.0])
+    assert not result.converged and result.status == 'infeasible'
+
+    # More assets than observations: the sample covariance is singular
+    from benchmarks.synthetic import synthetic_prices
+    wide = moments_from_returns(get_returns(synthetic_prices(400, years=0.5, seed=1)[0]))
+    assert wide.count < 400
+    for method in ['min_volatility', 'max_sharpe']:
+        w, info = optimize_portfolio(method=method, moments=wide, solver='qp', return_info=True)
+        print(method, "N > T:", info['iterations'])
+        assert info['converged'] and info['iterations'] < 50
+        assert abs(w.sum() - 1) < 1e-9 and (w >= 0).all()
+    # With the default ridge it stops at the single-pivot cap instead of running ~10n pivots
+    result = solve_qp(wide.cov.to_numpy(), np.ones((1, 400)), [1.0])
+    assert result.converged or 'single-variable' in result.message
+    assert result.iterations < 10 * 400
+    print("QP Solver Test Passed!")
+
+def test_risk_parity_engines():
+    print("Testing ERC and HRP...")
+    from src.engine.risk_parity import equal_risk_contribution, hrp_weights
+    from src.engine.optimization import hierarchical_risk_parity
+    prices = make_prices(n_assets=6)
+    cov = get_returns(prices).cov().to_numpy()
+
+    w, info = equal_risk_contribution(cov)
+    contributions = w * (cov @ w)
+    assert info['converged']
+    assert abs(w.sum() - 1) < 1e-12
+    assert np.allclose(contributions, contributions.mean(), rtol=1e-6)
+
+    # Two uncorrelated assets: HRP is inverse variance
+    h = hrp_weights(np.diag([0.04, 0.01]))
+    assert np.allclose(h, [0.2, 0.8])
+    hrp = hierarchical_risk_parity(prices)
+    assert abs(hrp.sum() - 1) < 1e-12 and (hrp > 0).all()
+
+    for method in ['erc', 'hrp']:
+        w = optimize_portfolio(prices, method=method)
+        assert abs(w.sum() - 1) < 1e-9 and (w >= 0).all()
+    print("Risk Parity Engines Test Passed!")
+
+def test_monte_carlo():
+    print("Testing Monte Carlo engine...")
+    from src.engine.montecarlo import run_monte_carlo, bootstrap_indices, path_metrics
+    returns = get_returns(make_prices(periods=300))
+    weights = pd.Series(0.2, index=returns.columns)
+
+    # Blocks continue at the next row (wrapping) and restart at random rows
+    idx = bootstrap_indices(np.random.default_rng(0), 300, 50, 500, 20)
+    assert idx.min() >= 0 and idx.max() < 300
+    steps = np.diff(idx, axis=1)
+    continued = (steps == 1) | (steps == -299)
+    assert 0.9 < continued.mean() < 0.99
+
+    growth, max_dd = path_metrics(np.array([[0.1, -0.5, 0.5], [-0.1, 0.0, 0.2]]))
+    assert np.allclose(growth, [0.825, 1.08]) and np.allclose(max_dd, [-0.5, -0.1])
+
+    for method in ['bootstrap', 'normal', 'student_t']:
+        result = run_monte_carlo(returns, weights, horizon_years=2, n_paths=3000, method=method,
+                                 chunk_size=1000, seed=42)
+        s = result.summary
+        print(method, s['cagr'][0.5], s['prob_drawdown'])
+        assert len(result.terminal_value) == 3000 and (result.max_drawdown <= 0).all()
+        assert s['terminal_value'][0.05] < s['terminal_value'][0.5] < s['terminal_value'][0.95]
+        assert 0 <= s['prob_drawdown'] <= 1
+
+    # Same seed, same paths, however many processes run the chunks
+    a = run_monte_carlo(returns, weights, horizon_years=1, n_paths=2000, chunk_size=500, seed=7)
+    b = run_monte_carlo(returns, weights, horizon_years=1, n_paths=2000, chunk_size=500, seed=7, workers=2)
+    assert np.array_equal(a.terminal_value, b.terminal_value)
+
+    # A t with df <= 2 has no finite variance to scale
+    for df in [2, 1, 0]:
+        try:
+            run_monte_carlo(returns, weights, n_paths=10, method='student_t', df=df)
+            assert False, f"expected df={df} to be rejected"
+        except ValueError as e:
+            assert 'df > 2' in str(e)
+    print("Monte Carlo Test Passed!")
+
+def test_efficient_frontier():
+    print("Testing efficient frontier...")
+    from scipy.optimize import minimize
+    from src.engine.frontier import efficient_frontier
+    prices = make_prices(n_assets=8)
+    moments = moments_from_returns(get_returns(prices))
+    frontier = efficient_frontier(moments=moments, n_points=15, use_cache=False)
+    weights = frontier.weights.to_numpy()
+    assert weights.shape == (15, 8)
+    assert np.allclose(weights.sum(axis=1), 1) and (weights >= 0).all()
+    # Risk and return both rise along the frontier, from min volatility to the best asset
+    assert (np.diff(frontier.returns) > 0).all() and (np.diff(frontier.risks) > -1e-12).all()
+    min_vol = optimize_portfolio(method='min_volatility', moments=moments)
+    assert np.allclose(weights[0], min_vol, atol=1e-6)
+    assert np.isclose(frontier.returns[-1], moments.mean.max() * 252)
+
+    # Each point is the minimum-variance portfolio for its return (checked against SLSQP)
+    mu, cov = moments.mean.to_numpy() * 252, moments.cov.to_numpy() * 252
+    for target, w in zip(frontier.returns[1:-1:3], weights[1:-1:3]):
+        ref = minimize(lambda x: x @ cov @ x, np.full(8, 1 / 8), method='SLSQP', bounds=[(0, 1)] * 8,
+                       constraints=[{'type': 'eq', 'fun': lambda x: x.sum() - 1},
+                                    {'type': 'eq', 'fun': lambda x, t=target: mu @ x - t}],
+                       options={'ftol': 1e-14})
+        assert w @ cov @ w <= ref.fun + 1e-10
+    sharpe = (frontier.returns - 0.04) / frontier.risks
+    assert frontier.info['max_sharpe'] == int(np.argmax(sharpe))
+
+    # Warm starts pivot less than solving every point from scratch
+    from src.engine.solvers import solve_qp
+    A = np.vstack([np.ones(8), mu])
+    cold = sum(solve_qp(cov, A, [1.0, t]).iterations for t in frontier.returns[1:])
+    assert frontier.info['iterations'] - 1 < cold, (frontier.info['iterations'], cold)
+
+    # Same moments: served from the cache
+    first = efficient_frontier(moments=moments, n_points=15)
+    again = efficient_frontier(moments=moments, n_points=15)
+    assert not first.info['cache_hit'] and again.info['cache_hit']
+    assert again.weights.equals(first.weights)
+    print("Efficient Frontier Test Passed!")
+
+def test_covariance_estimators():
+    print("Testing covariance estimators...")
+    from src.engine.covariance import estimate_moments
+    from src.engine.moments import Moments
+    prices = make_prices(n_assets=30, periods=120, seed=5)
+    returns = get_returns(prices)
+    X = returns.to_numpy() - returns.to_numpy().mean(axis=0)
+    T, N = X.shape
+
+    # Ledoit-Wolf equals the dense textbook formula (dense itself, with more days than assets)
+    lw = estimate_moments(returns, 'ledoit_wolf')
+    sample = X.T @ X / T
+    mu = np.trace(sample) / N
+    delta = ((sample - mu * np.eye(N)) ** 2).sum()
+    beta = sum(((np.outer(x, x) - sample) ** 2).sum() for x in X) / T ** 2
+    shrinkage = min(beta, delta) / delta
+    expected = (1 - shrinkage) * returns.cov().to_numpy() + shrinkage * mu * T / (T - 1) * np.eye(N)
+    assert isinstance(lw.cov, pd.DataFrame) and np.isclose(lw.cov.attrs['shrinkage'], shrinkage)
+    assert np.allclose(np.asarray(lw.cov), expected, rtol=1e-10, atol=1e-16)
+    # Fewer days than assets: low-rank form, rank-T loadings
+    lw_wide = estimate_moments(returns.iloc[:20], 'ledoit_wolf')
+    assert lw_wide.cov.loadings.shape == (N, 20) and 0 < lw_wide.cov.shrinkage <= 1
+
+    # Few assets, long history: solving doesn't grow with T
+    import time
+    def solve_seconds(periods):
+        moments = estimate_moments(get_returns(make_prices(n_assets=10, periods=periods)), 'ledoit_wolf')
+        assert np.asarray(moments.cov).shape == (10, 10)
+        started = time.perf_counter()
+        for _ in range(5):
+            optimize_portfolio(method='min_volatility', moments=moments, solver='qp')
+        return time.perf_counter() - started
+    short, long = solve_seconds(253), solve_seconds(2521)
+    print(f"LW solves, 252 vs 2520 days: {short:.4f}s {long:.4f}s")
+    assert long < 3 * short + 0.05
+
+    # Statistical factor model: keeps each asset's variance, stores O(N k)
+    pca = estimate_moments(returns, 'factor', 3)
+    assert pca.cov.n_factors == 3 and pca.cov.nbytes < N * N * 8 / 5
+    assert np.allclose(pca.cov.diagonal(), returns.var().to_numpy())
+    # Fundamental factors from given factor returns (here: an equal-weight index)
+    index_returns = returns.mean(axis=1).to_frame('index')
+    fundamental = estimate_moments(returns, 'factor', index_returns)
+    assert fundamental.cov.n_factors == 1
+
+    # Low-rank solves match solving the same matrix in dense form, for both solvers
+    w = np.random.default_rng(0).random(N)
+    assert np.allclose(pca.cov @ w, np.asarray(pca.cov) @ w)
+    assert np.isclose(pca.cov.quad(w), w @ np.asarray(pca.cov) @ w)
+    for method in ['min_volatility', 'max_sharpe']:
+        for moments in (lw, lw_wide, pca, fundamental):
+            # count=None: these are full rank even with fewer days than assets (no singular-sample ridge)
+            dense = Moments(moments.mean, pd.DataFrame(np.asarray(moments.cov)), None)
+            low_rank = optimize_portfolio(method=method, moments=moments, solver='qp')
+            assert np.allclose(low_rank.to_numpy(), optimize_portfolio(method=method, moments=dense).to_numpy(),
+                               atol=1e-8)
+            slsqp = optimize_portfolio(method=method, moments=moments, solver='slsqp')
+            assert abs(slsqp.sum() - 1) < 1e-9
+    for method in ['risk_parity', 'erc', 'hrp']:
+        assert abs(optimize_portfolio(prices, method=method, estimator='ledoit_wolf').sum() - 1) < 1e-9
+    print("Covariance Estimators Test Passed!")
+
+if __name__ == "__main__":
+    test_rolling_moments()
+    test_optimize_with_moments()
+    test_gradients_and_warm_start()
+    test_qp_solver()
+    test_risk_parity_engines()
+    test_monte_carlo()
+    test_efficient_frontier()
+    test_covariance_estimators()
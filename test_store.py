@@ -0,0 +1,240 @@
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from src.data.store import DataStore
+
+def make_prices(start="2023-01-02", periods=50):
+    index = pd.bdate_range(start, periods=periods)
+    close = np.linspace(100, 110, periods)
+    return pd.DataFrame({
+        'Open': close, 'High': close + 1, 'Low': close - 1,
+        'Close': close, 'Adj Close': close, 'Volume': np.arange(periods) * 100,
+    }, index=index)
+
+def test_store_prices_bulk():
+    print("Testing bulk price insert...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DataStore(os.path.join(tmp, 'test.db'))
+        df = make_prices()
+
+        result = store.store_prices('TEST', df)
+        print(f"First insert: {result}")
+        assert result == {'inserted': 50, 'skipped': 0}
+
+        # Overlapping refresh only adds the new tail
+        result = store.store_prices('TEST', make_prices(periods=60))
+        print(f"Overlapping insert: {result}")
+        assert result == {'inserted': 10, 'skipped': 50}
+
+        loaded = store.load_prices('TEST')
+        assert len(loaded) == 60
+        assert loaded['adj_close'].iloc[0] == 100
+        assert store.get_latest_date('TEST') == make_prices(periods=60).index[-1].date()
+
+        # A failed commit is reported per ticker, not swallowed
+        def broken_begin():
+            raise RuntimeError("disk I/O error")
+        store.engine.begin = broken_begin
+        results = store.store_prices_many([('AAA', make_prices()), ('BBB', make_prices())])
+        print(f"Failed insert: {results}")
+        assert all(r['inserted'] == 0 and 'disk I/O error' in r['error'] for r in results.values())
+        assert list(results) == ['AAA', 'BBB']
+
+    print("Bulk Insert Test Passed!")
+
+def test_load_price_matrix():
+    print("Testing price matrix loader...")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DataStore(os.path.join(tmp, 'test.db'))
+        store.store_prices('AAA', make_prices(periods=50))
+        store.store_prices('BBB', make_prices(start="2023-01-09", periods=30))
+
+        matrix = store.load_price_matrix(['AAA', 'BBB', 'NONE'], 'close', start_date="2023-01-05", end_date="2023-02-10")
+        print(matrix.tail())
+        assert list(matrix.columns) == ['AAA', 'BBB', 'NONE']
+        assert matrix.index[0] == pd.Timestamp("2023-01-05")
+        assert matrix.index[-1] == pd.Timestamp("2023-02-10")
+        assert matrix.dtypes.eq(np.float32).all()
+        assert matrix['NONE'].isna().all()
+        # BBB starts later, so the first rows are missing
+        assert matrix['BBB'].isna().sum() == 2
+        assert matrix['AAA'].notna().all()
+
+    print("Price Matrix Test Passed!")
+
+def test_price_cache():
+    print("Testing price cache...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.db')
+        store = DataStore(path)
+        store.store_prices('AAA', make_prices(periods=50))
+
+        first = store.load_price_matrix(['AAA'], 'close')
+        # A rebuilt DataStore on the same DB shares the cache
+        again = DataStore(path).load_price_matrix(['AAA'], 'close')
+        stats = store.cache_stats()
+        print(stats)
+        assert stats['misses'] == 1 and stats['hits'] == 1
+        assert again.equals(first)
+        assert store.get_latest_date('AAA') == first.index[-1].date()
+
+        # New rows bump the version, so the next read goes back to SQLite
+        store.store_prices('AAA', make_prices(periods=60))
+        assert len(store.load_price_matrix(['AAA'], 'close')) == 60
+        assert store.cache_stats()['invalidations'] == 1
+
+        # A tiny budget forces evictions
+        small = DataStore(os.path.join(tmp, 'small.db'), cache_bytes=1000)
+        small.store_prices('AAA', make_prices(periods=50))
+        small.store_prices('BBB', make_prices(periods=50))
+        small.load_price_matrix(['AAA'], 'close')
+        small.load_price_matrix(['BBB'], 'close')
+        assert small.cache_stats()['evictions'] >= 1
+        assert small.cache_stats()['bytes'] <= 1000
+
+        # A write before any version lookup must not hide tickers written elsewhere
+        other = os.path.join(tmp, 'other.db')
+        DataStore(other, cache_bytes=0).store_prices('BBB', make_prices(periods=50))
+        fresh = DataStore(other)
+        fresh.store_prices('AAA', make_prices(periods=50))
+        assert fresh.get_latest_date('BBB') == make_prices(periods=50).index[-1].date()
+        assert fresh.get_latest_date('AAA') == make_prices(periods=50).index[-1].date()
+
+    print("Price Cache Test Passed!")
+
+def test_columnar_backend():
+    print("Testing columnar backend...")
+    from src.data.migrate import migrate
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.db')
+        store = DataStore(path, backend='columnar')
+
+        assert store.store_prices('AAA', make_prices(periods=50)) == {'inserted': 50, 'skipped': 0}
+        # Append the tail, then backfill a few older dates
+        assert store.store_prices('AAA', make_prices(periods=60)) == {'inserted': 10, 'skipped': 50}
+        assert store.store_prices('AAA', make_prices(start="2022-12-26", periods=10)) == {'inserted': 5, 'skipped': 5}
+
+        df = store.load_prices('AAA')
+        assert len(df) == 65
+        assert df.index.is_monotonic_increasing
+        assert store.get_latest_date('AAA') == df.index[-1].date()
+        assert store.load_prices('NONE').empty
+
+        # Same matrix as the SQLite backend after migrating
+        sqlite_store = DataStore(os.path.join(tmp, 'sqlite.db'), backend='sqlite')
+        sqlite_store.store_prices('AAA', make_prices(periods=60))
+        sqlite_store.store_prices('BBB', make_prices(start="2023-01-09", periods=30))
+        totals = migrate(os.path.join(tmp, 'sqlite.db'))
+        assert totals['inserted'] == 90
+        migrated = DataStore(os.path.join(tmp, 'sqlite.db'), backend='columnar')
+        a = sqlite_store.load_price_matrix(['AAA', 'BBB'], 'close', start_date="2023-01-05")
+        b = migrated.load_price_matrix(['AAA', 'BBB'], 'close', start_date="2023-01-05")
+        assert np.array_equal(a.to_numpy(), b.to_numpy(), equal_nan=True)
+        assert (a.index == b.index).all()
+
+    print("Columnar Backend Test Passed!")
+
+def test_coverage_catalog():
+    print("Testing coverage catalog...")
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ['sqlite', 'columnar']:
+            store = DataStore(os.path.join(tmp, f'{backend}.db'), backend=backend)
+            store.store_prices('AAA', make_prices(periods=50))
+            # Appends: one with a three-week hole, one right after
+            store.store_prices('AAA', make_prices(start="2023-04-03", periods=10))
+            store.store_prices('AAA', make_prices(start="2023-04-17", periods=5))
+            # Backfill before the first date forces a recompute
+            store.store_prices('AAA', make_prices(start="2022-12-01", periods=5))
+            store.store_prices('BBB', make_prices(periods=3))
+
+            coverage = store.get_coverage(['AAA', 'BBB', 'NONE'])
+            print(coverage)
+            aaa = coverage.loc['AAA']
+            assert aaa['row_count'] == 70 and aaa['gap_count'] == 2
+            assert str(aaa['first_date']) == "2022-12-01" and str(aaa['last_date']) == "2023-04-21"
+            assert aaa['max_gap_days'] == 26
+            assert coverage.loc['BBB', 'gap_count'] == 0
+            assert pd.isna(coverage.loc['NONE', 'row_count'])
+            assert store.get_data_version('AAA') == (aaa['last_date'], 70)
+
+            # Full rebuild agrees with the incrementally maintained rows
+            before = store.get_coverage()
+            store.rebuild_coverage()
+            assert store.get_coverage().equals(before)
+
+        # Both backends on one database keep their own coverage rows
+        path = os.path.join(tmp, 'shared.db')
+        sqlite_store = DataStore(path, backend='sqlite', cache_bytes=0)
+        columnar_store = DataStore(path, backend='columnar', cache_bytes=0)
+        sqlite_store.store_prices('AAA', make_prices(periods=50))
+        columnar_store.store_prices('AAA', make_prices(periods=10))
+        assert sqlite_store.get_coverage().loc['AAA', 'row_count'] == 50
+        assert columnar_store.get_coverage().loc['AAA', 'row_count'] == 10
+        columnar_store.rebuild_coverage()
+        assert sqlite_store.get_data_version('AAA')[1] == 50
+
+        # Concurrent columnar appends are serialized with their coverage updates
+        import threading
+        chunks = [make_prices(start=start, periods=20) for start in pd.bdate_range("2024-01-01", periods=8, freq='20B')]
+        threads = [threading.Thread(target=columnar_store.store_prices, args=('CCC', chunk)) for chunk in chunks]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        stored = columnar_store.load_prices('CCC')
+        assert len(stored) == 160 and stored.index.is_unique and stored.index.is_monotonic_increasing
+        assert columnar_store.get_coverage().loc['CCC', 'row_count'] == 160
+    print("Coverage Catalog Test Passed!")
+
+def test_concurrent_mode():
+    print("Testing WAL reader/writer mode...")
+    import threading
+    from sqlalchemy import text
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.db')
+        writer = DataStore(path, cache_bytes=0, concurrent=True)
+        reader = DataStore(path, cache_bytes=0, concurrent=True)
+        with writer.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == 'wal'
+        # Queries run on read-only connections
+        try:
+            with reader.read_engine.begin() as conn:
+                conn.execute(text("DELETE FROM price_data"))
+            assert False, "read engine accepted a write"
+        except Exception as e:
+            assert 'readonly' in str(e) or 'read-only' in str(e) or 'query_only' in str(e)
+
+        writer.store_prices('AAA', make_prices(periods=10))
+        errors = []
+        done = threading.Event()
+
+        def read_loop():
+            while not done.is_set():
+                try:
+                    rows = len(reader.load_price_matrix(['AAA']))
+                    assert rows >= 10
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=read_loop) for _ in range(3)]
+        for t in threads:
+            t.start()
+        # Batched commits while the readers keep going
+        items = [(f'T{i}', make_prices(periods=200)) for i in range(20)]
+        results = writer.store_prices_many(items, commit_rows=1000)
+        done.set()
+        for t in threads:
+            t.join()
+        assert not errors, errors
+        assert all(r == {'inserted': 200, 'skipped': 0} for r in results.values())
+        assert reader.get_coverage()['row_count'].sum() == 10 + 20 * 200
+    print("Concurrent Mode Test Passed!")
+
+if __name__ == "__main__":
+    test_store_prices_bulk()
+    test_load_price_matrix()
+    test_price_cache()
+    test_columnar_backend()
+    test_coverage_catalog()
+    test_concurrent_mode()